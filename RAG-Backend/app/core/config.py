@@ -25,10 +25,71 @@ class Settings(BaseSettings):
 
     # Embeddings
     EMBEDDING_MODEL_NAME: str = "jinaai/jina-embeddings-v3"
+    EMBEDDING_BACKEND: str = "torch" # "torch" (fp32), "torch-int8" (dynamic int8 quantization) or "onnx" (ONNX Runtime)
+    EMBEDDING_ONNX_FILE: str = "onnx/model.onnx" # Graph inside the model repo, used by the onnx backend
+    EMBEDDING_ONNX_TASK: str = "text-matching" # jina-v3 LoRA adapter selected by the onnx backend
+    EMBEDDING_ONNX_THREADS: int = 0 # ONNX Runtime intra-op threads; 0 uses the runtime default
+    EMBEDDING_DIMENSION: int = 0 # Matryoshka truncation (e.g. 256); 0 keeps the full dimension. Rebuild with app.scripts.rebuild_collection after changing
+    EMBEDDING_CACHE_MAX_ENTRIES: int = 2048 # LRU cache for query embeddings; 0 disables it
+    EMBEDDING_BATCH_SIZE: int = 32 # Chunks per embedding forward pass / Chroma write during ingestion
+    EMBEDDING_QUERY_BATCH_WINDOW_MS: float = 5.0 # Wait to coalesce concurrent query embeddings; 0 disables micro-batching
+    EMBEDDING_QUERY_MAX_BATCH: int = 32 # Max queries per coalesced forward pass
 
     # Vector Store
     CHROMA_DB_PATH: str = "./chroma_db"
     VECTOR_DB_COLLECTION_NAME: str = "rag_docs"
+    VECTOR_STORE_LAYOUT: str = "single" # "single" (one collection, $in access filter) or "partitioned" (one collection per access target)
+
+    # Retrieval
+    RETRIEVAL_MODE: str = "vector" # "vector" or "hybrid" (BM25 + vector fused with reciprocal rank fusion)
+    RETRIEVAL_K: int = 5 # Chunks passed to the LLM
+    HYBRID_CANDIDATES: int = 20 # Candidates fetched from each side before fusion
+    HYBRID_RRF_K: int = 60 # Reciprocal rank fusion constant
+    LEXICAL_INDEX_PATH: str = "" # SQLite FTS5 index; defaults to <CHROMA_DB_PATH>_lexical.sqlite3
+    LEXICAL_PRUNE_MAX_DF_RATIO: float = 0.0 # >0 drops query terms found in more than this share of chunks (0 = off, bm25() weights them)
+    LEXICAL_PRUNE_MIN_CHUNKS: int = 50000 # Pruning only applies once the index holds this many chunks
+
+    # Reranking (cross-encoder between retrieval and the "stuff" step)
+    RERANK_ENABLED: bool = False
+    RERANK_MODEL_NAME: str = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+    RERANK_CANDIDATES: int = 20 # Over-fetched from the retriever
+    RERANK_TOP_N: int = 3 # Chunks kept for the prompt
+    RERANK_BATCH_SIZE: int = 8 # Pairs per cross-encoder forward pass; the budget is checked between batches
+    RERANK_BUDGET_MS: float = 150.0 # Per request; over budget falls back to the first RETRIEVAL_K in retriever order
+
+    # Model Loading (background at startup, see /health/ready)
+    MODEL_WARMUP_ENABLED: bool = True # Run one embedding and one vector search after loading
+    MODEL_LOAD_WAIT_S: float = 300.0 # How long ingestion waits for models that are still loading
+
+    # Observability
+    METRICS_ENABLED: bool = True # Prometheus exposition at GET /metrics
+    PROFILING_ENABLED: bool = False # Allow admins to profile single requests with an X-Profile header
+    PROFILING_SAMPLE_INTERVAL_MS: float = 5.0 # Stack sampling interval for X-Profile: flame
+    PROFILING_MAX_REPORTS: int = 50 # Recent profiles kept for /admin/profiles
+
+    # Notification Push (GET /notifications/stream)
+    NOTIFICATION_STREAM_QUEUE_SIZE: int = 100 # Events buffered per client; a client further behind is disconnected and resumes via Last-Event-ID
+    NOTIFICATION_STREAM_REPLAY_SIZE: int = 1000 # Recent notifications kept in memory for resuming; older gaps are read from the database
+    NOTIFICATION_STREAM_RESUME_LIMIT: int = 500 # Most notifications replayed on one reconnect
+    NOTIFICATION_STREAM_HEARTBEAT_S: float = 15.0 # Comment frame sent while idle, so proxies keep the connection open
+    NOTIFICATION_STREAM_TOKEN_TTL_S: int = 60 # Lifetime of the ?token= credential a browser EventSource opens the stream with
+
+    # RAG Query Execution
+    RAG_EXECUTOR_MAX_WORKERS: int = 4 # Threads running RAG chains and streaming retrieval; caps queries executing at once
+
+    # Background Ingestion
+    INGESTION_WORKERS: int = 1 # Worker threads running process_and_embed_document
+    PDF_PARSE_WORKERS: int = 4 # Processes for PDF text extraction; 0 or 1 parses in-process
+    PDF_PARALLEL_MIN_PAGES: int = 50 # Smaller PDFs are parsed in-process
+    BULK_MAX_FILES: int = 500 # Per bulk request / zip archive
+    BULK_MAX_TOTAL_MB: int = 512 # Uncompressed size limit for a bulk request / zip archive
+    BULK_PIPELINE_DEPTH: int = 2 # Prepared files buffered ahead of the embedding stage
+
+    # Semantic Answer Cache
+    ANSWER_CACHE_ENABLED: bool = True
+    ANSWER_CACHE_SIMILARITY_THRESHOLD: float = 0.95 # Cosine similarity needed to reuse a cached answer
+    ANSWER_CACHE_TTL_SECONDS: int = 3600
+    ANSWER_CACHE_MAX_ENTRIES: int = 1000
 
     class Config:
         # This makes Pydantic load from the .env file
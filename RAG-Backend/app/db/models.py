@@ -1,5 +1,5 @@
 # app/db/models.py
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Boolean
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Boolean, LargeBinary
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func # For default timestamp
 
@@ -42,6 +42,8 @@ class Notification(Base):
 
 
 # Association Table for User Notification Seen Status
+# Legacy read model (one row per user x notification); superseded by NotificationReadState and
+# NotificationReadException below. Kept as the source of app.scripts.migrate_notification_reads.
 class UserNotificationStatus(Base):
     __tablename__ = "user_notification_status"
 
@@ -56,15 +58,91 @@ class UserNotificationStatus(Base):
     def __repr__(self):
         return f"<UserNotificationStatus(user_id={self.user_id}, notification_id={self.notification_id}, is_seen={self.is_seen})>"
 
-# Placeholder for DocumentSource if you plan to track uploaded documents separately in DB
-# (Not strictly required for RAG if ChromaDB is the primary store for document metadata)
-# class DocumentSource(Base):
-#     __tablename__ = "document_sources"
-#     id = Column(Integer, primary_key=True, index=True)
-#     doc_internal_id = Column(String, unique=True, index=True, nullable=False)
-#     original_filename = Column(String, nullable=False)
-#     upload_time = Column(DateTime(timezone=True), server_default=func.now())
-#     uploader_id = Column(Integer, ForeignKey("users.id"))
-#     doc_access_target = Column(String, nullable=True) # e.g., public, level_1, admin_only
-
-#     uploader = relationship("User")
\ No newline at end of file
+# Per-user Notification Read State
+# Every notification relevant to the user with id <= last_seen_id counts as seen; reads above the
+# watermark are kept as sparse NotificationReadException rows until the watermark catches up.
+class NotificationReadState(Base):
+    __tablename__ = "notification_read_state"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    last_seen_id = Column(Integer, default=0, nullable=False)
+    # Level the counts below were computed for (0 = "all students" only, as for admins)
+    student_level = Column(Integer, default=0, nullable=False)
+    # Relevant notifications seen: those up to the watermark plus the exceptions above it
+    seen_count = Column(Integer, default=0, nullable=False)
+    updated_at = Column(DateTime(timezone=True), nullable=True)
+
+    def __repr__(self):
+        return f"<NotificationReadState(user_id={self.user_id}, last_seen_id={self.last_seen_id}, seen_count={self.seen_count})>"
+
+
+class NotificationReadException(Base):
+    __tablename__ = "notification_read_exceptions"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    notification_id = Column(Integer, ForeignKey("notifications.id"), primary_key=True)
+    seen_at = Column(DateTime(timezone=True), nullable=True)
+
+    def __repr__(self):
+        return f"<NotificationReadException(user_id={self.user_id}, notification_id={self.notification_id})>"
+
+
+# Running number of notifications per target level (0=all students, 1-4=specific level)
+class NotificationCounter(Base):
+    __tablename__ = "notification_counters"
+
+    target_level = Column(Integer, primary_key=True)
+    total = Column(Integer, default=0, nullable=False)
+
+    def __repr__(self):
+        return f"<NotificationCounter(target_level={self.target_level}, total={self.total})>"
+
+# Background Ingestion Job Model
+class IngestionJob(Base):
+    __tablename__ = "ingestion_jobs"
+
+    id = Column(String, primary_key=True, index=True) # UUID string returned to the uploader
+    filename = Column(String, nullable=False)
+    content_type = Column(String, nullable=True)
+    doc_access_target = Column(String, nullable=False)
+    # Shared by the files of one bulk upload, which are ingested together as one pipeline run
+    batch_id = Column(String, nullable=True, index=True)
+    # 'queued' -> 'running' -> 'succeeded' | 'failed'
+    status = Column(String, default="queued", nullable=False, index=True)
+    chunks_total = Column(Integer, nullable=True)
+    chunks_done = Column(Integer, default=0, nullable=False)
+    chunks_embedded = Column(Integer, nullable=True) # Chunks that needed model inference
+    chunks_reused = Column(Integer, nullable=True) # Chunks whose embedding was found by content hash
+    duplicate = Column(Boolean, default=False, nullable=False) # Byte-identical file already indexed
+    error = Column(Text, nullable=True)
+    doc_internal_id = Column(String, nullable=True, index=True)
+    # Raw upload, kept until the job finishes so queued jobs survive a restart
+    file_content = Column(LargeBinary, nullable=True)
+    # Notification to send once the job succeeds (target level: 0=all, 1-4=specific)
+    notification_message = Column(Text, nullable=True)
+    notification_target_level = Column(Integer, nullable=True)
+    notification_sent = Column(Boolean, default=False, nullable=False)
+    created_by = Column(String, nullable=True) # Admin username
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+    def __repr__(self):
+        return f"<IngestionJob(id='{self.id}', filename='{self.filename}', status='{self.status}')>"
+
+# Document Registry Model (one row per indexed document; its chunks live in Chroma)
+class Document(Base):
+    __tablename__ = "documents"
+
+    doc_internal_id = Column(String, primary_key=True, index=True) # Prefix of the document's Chroma chunk IDs
+    filename = Column(String, nullable=False)
+    content_type = Column(String, nullable=True)
+    doc_access_target = Column(String, nullable=False, index=True)
+    chunk_count = Column(Integer, default=0, nullable=False)
+    content_hash = Column(String, nullable=False, index=True) # SHA-256 of the uploaded file
+    created_by = Column(String, nullable=True) # Admin username
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), nullable=True) # Last in-place replace
+
+    def __repr__(self):
+        return f"<Document(doc_internal_id='{self.doc_internal_id}', filename='{self.filename}', chunks={self.chunk_count})>"
@@ -9,6 +9,11 @@ class Token(BaseModel):
     access_token: str
     token_type: str
 
+class StreamToken(BaseModel):
+    """Schema for a short-lived token that opens GET /notifications/stream?token=..."""
+    stream_token: str
+    expires_in: int # Seconds
+
 class TokenData(BaseModel):
     """Schema for data embedded within the JWT token."""
     username: str | None = None
@@ -83,6 +88,68 @@ class UploadResponse(BaseModel):
     doc_internal_id: Optional[str] = None
     error: Optional[str] = None
     notification_sent: Optional[bool] = Field(False, description="Indicates if a notification was processed for this upload")
+    job_id: Optional[str] = Field(None, description="Background ingestion job ID; poll GET /admin/jobs/{job_id} for progress")
+    status: Optional[str] = Field(None, description="Ingestion job status at the time of the response")
+    chunks_embedded: Optional[int] = Field(None, description="Chunks that were newly embedded")
+    chunks_reused: Optional[int] = Field(None, description="Chunks whose existing embedding was reused")
+    duplicate: Optional[bool] = Field(None, description="True if a byte-identical file was already indexed")
+
+class BulkUploadResponse(BaseModel):
+    """Schema for the response of a bulk / archive upload."""
+    message: str
+    batch_id: Optional[str] = Field(None, description="Shared by the batch's ingestion jobs")
+    results: List[UploadResponse] = Field(default_factory=list, description="One queued ingestion job per file")
+
+class IngestionJobStatus(BaseModel):
+    """Schema for reporting the state of a background ingestion job."""
+    id: str
+    filename: str
+    doc_access_target: str
+    batch_id: Optional[str] = None
+    status: str # 'queued', 'running', 'succeeded', 'failed'
+    chunks_total: Optional[int] = None
+    chunks_done: int = 0
+    chunks_embedded: Optional[int] = None
+    chunks_reused: Optional[int] = None
+    duplicate: bool = False
+    error: Optional[str] = None
+    doc_internal_id: Optional[str] = None
+    notification_sent: bool = False
+    created_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+class DocumentInfo(BaseModel):
+    """Schema for an entry of the document registry."""
+    doc_internal_id: str
+    filename: str
+    content_type: Optional[str] = None
+    doc_access_target: str
+    chunk_count: int
+    content_hash: str
+    created_by: Optional[str] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+class DocumentReplaceResponse(BaseModel):
+    """Schema for the response of an in-place document replace."""
+    message: str
+    document: DocumentInfo
+    chunks_changed: int = Field(0, description="Chunks whose text differs from the previous version")
+    chunks_embedded: int = Field(0, description="Chunks that needed model inference")
+    chunks_deleted: int = Field(0, description="Chunks of the previous version that no longer exist")
+
+class DocumentDeleteResponse(BaseModel):
+    """Schema for the response of a document delete."""
+    message: str
+    doc_internal_id: str
+    chunks_deleted: int
 
 
 # --- Notification Schemas ---
@@ -2,7 +2,7 @@
 import logging
 from typing import Optional, Dict, Any
 
-from fastapi import Depends, HTTPException, status, Request
+from fastapi import Depends, HTTPException, status, Request, Query
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from pydantic import BaseModel # <-- ADDED THIS IMPORT
 
@@ -45,6 +45,26 @@ async def get_current_user_data(
     return token_data
 
 
+async def get_stream_user_data(
+    token: Optional[str] = Query(None, description="Stream token from POST /notifications/stream-token, for clients (browser EventSource) that cannot send an Authorization header"),
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_bearer_scheme)
+    ) -> schemas.TokenData:
+    """
+    Like get_current_user_data, but also accepts a short-lived stream token in the `token` query parameter.
+    """
+    if credentials:
+        return await get_current_user_data(credentials)
+    token_data = auth_service.decode_access_token(token, scope=auth_service.STREAM_TOKEN_SCOPE) if token else None
+    if token_data is None or token_data.username is None or token_data.role is None:
+        logger.warning("get_stream_user_data: No valid bearer or stream token provided.")
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return token_data
+
+
 async def get_current_admin_user(
     current_user_data: schemas.TokenData = Depends(get_current_user_data)
     ) -> schemas.TokenData:
@@ -12,13 +12,13 @@ logger = logging.getLogger(__name__)
 
 # --- Imports ---
 from fastapi import FastAPI, HTTPException, Request, status
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 from fastapi.exceptions import RequestValidationError
 
 from .db import database, models
 from .core.config import settings
 # --- MODIFIED: Import the new notifications router ---
-from .routers import auth, admin, query, notifications # Added notifications
+from .routers import auth, admin, query, notifications, health # Added notifications
 from fastapi.middleware.cors import CORSMiddleware
 
 # --- FastAPI Application Instance ---
@@ -46,6 +46,52 @@ app.add_middleware(
 )
 # --- End of CORS Middleware Configuration ---
 
+# --- Per-request Profiling (admin-only, opt-in) ---
+if settings.PROFILING_ENABLED:
+    from .services import profiling
+
+    def _requested_profile_mode(request: Request):
+        """Profiling mode from the X-Profile header ('timing'/'1' or 'flame'), or None unless the caller is an admin."""
+        header = request.headers.get("x-profile", "").strip().lower()
+        mode = {"1": profiling.MODE_TIMING, profiling.MODE_TIMING: profiling.MODE_TIMING, profiling.MODE_FLAME: profiling.MODE_FLAME}.get(header)
+        authorization = request.headers.get("authorization", "")
+        if mode is None or not authorization.lower().startswith("bearer "):
+            return None
+        from .services import auth_service
+        token_data = auth_service.decode_access_token(authorization[7:].strip())
+        if token_data is None or token_data.role != "admin":
+            return None # Non-admins get an ordinary, unprofiled response
+        return mode
+
+    @app.middleware("http")
+    async def profiling_middleware(request: Request, call_next):
+        mode = _requested_profile_mode(request)
+        if mode is None:
+            return await call_next(request)
+        profile = profiling.start(mode, f"{request.method} {request.url.path}")
+        try:
+            response = await call_next(request)
+        except Exception:
+            profiling.finish(profile)
+            raise
+        response.headers["X-Profile-Report"] = profile.id
+        if response.headers.get("content-type", "").startswith("text/event-stream"):
+            # Headers are sent before the stream runs: the stage breakdown is in the stored report.
+            body_iterator = response.body_iterator
+
+            async def profiled_body():
+                try:
+                    async for chunk in body_iterator:
+                        yield chunk
+                finally:
+                    profiling.finish(profile)
+            response.body_iterator = profiled_body()
+            return response
+        profiling.finish(profile)
+        response.headers["Server-Timing"] = profile.server_timing()
+        return response
+
+
 # --- Exception Handlers (Keep as is) ---
 @app.exception_handler(RequestValidationError)
 async def validation_exception_handler(request: Request, exc: RequestValidationError):
@@ -71,24 +117,25 @@ async def startup_event():
         logger.info("Attempting to create database tables...")
         database.Base.metadata.create_all(bind=database.engine) # This will create notifications & user_notification_status tables
         logger.info("Database tables check/creation completed.")
+        from .services import notification_service
+        db = database.SessionLocal()
+        try:
+            notification_service.ensure_notification_counters(db)
+            notification_service.migrate_legacy_read_status(db) # One EXISTS query once every user has a read state
+        finally:
+            db.close()
         logger.info("Initial admin user creation handled via /register endpoint.")
 
         if not settings.GOOGLE_API_KEY: logger.warning("GOOGLE_API_KEY not found.")
         else: logger.info("GOOGLE_API_KEY found.")
         
-        from .services.file_processor import embedding_function, vector_store
-        if embedding_function: logger.info("Embedding function initialized successfully.")
-        else: logger.error("Embedding function FAILED to initialize.")
-        if vector_store: logger.info("Vector store initialized successfully.")
-        else: logger.error("Vector store FAILED to initialize.")
-        
-        try:
-            from .services.rag_service import llm as rag_llm
-            if rag_llm: logger.info("RAG service LLM initialized successfully.")
-            else: logger.warning("RAG service LLM FAILED to initialize.")
-        except ImportError: logger.error("Could not import LLM from RAG service.")
-        except Exception as e_rag_llm: logger.error(f"Error checking RAG service LLM status: {e_rag_llm}")
-        
+        # Embedding model, vector store and LLM load in the background; /health/ready reports progress.
+        from .services import model_lifecycle
+        model_lifecycle.start_background_load()
+
+        from .services import ingestion_jobs
+        ingestion_jobs.start_workers()
+
         logger.info("Agent service components are expected to be running in a separate service (if applicable).")
 
     except Exception as e:
@@ -99,6 +146,27 @@ async def startup_event():
 @app.on_event("shutdown")
 async def shutdown_event():
     logger.info("Application shutdown sequence initiated...")
+    try:
+        from .services.notification_hub import hub as notification_hub
+        notification_hub.close_all() # Open notification streams would otherwise hold the server open
+    except Exception as e_hub:
+        logger.error(f"Error closing notification streams: {e_hub}")
+    try:
+        from .services import ingestion_jobs
+        ingestion_jobs.stop_workers()
+    except Exception as e_workers:
+        logger.error(f"Error stopping ingestion workers: {e_workers}")
+    try:
+        from .services import document_parser
+        document_parser.shutdown_pool()
+    except Exception as e_pool:
+        logger.error(f"Error shutting down PDF parsing pool: {e_pool}")
+    try:
+        from .services.rag_service import shutdown_executor
+        shutdown_executor()
+        logger.info("RAG query executor shut down.")
+    except Exception as e_shutdown:
+        logger.error(f"Error shutting down RAG query executor: {e_shutdown}")
     logger.info("Application shutdown sequence completed.")
 
 
@@ -108,12 +176,23 @@ try:
     app.include_router(admin.router)
     app.include_router(query.router)
     app.include_router(notifications.router) # <-- ADDED notifications router
+    app.include_router(notifications.stream_router)
+    app.include_router(health.router)
     logger.info("API routers included successfully.")
 except Exception as e:
      logger.exception(f"Failed to include API routers during setup: {e}")
      raise RuntimeError(f"Router setup failed: {e}")
 
 
+# --- Prometheus Metrics ---
+if settings.METRICS_ENABLED:
+    @app.get("/metrics", tags=["Observability"], include_in_schema=False)
+    async def prometheus_metrics():
+        from .services import metrics
+        payload, content_type = metrics.render_latest()
+        return Response(content=payload, media_type=content_type)
+
+
 # --- Root Endpoint ---
 @app.get("/", tags=["Root"])
 async def read_root():
@@ -1,15 +1,25 @@
 # app/routers/admin.py
+import json
 import logging
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, status, Form, Body
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse
 from typing_extensions import Annotated
 from sqlalchemy.orm import Session
-from typing import Optional, Dict, Union # Add Union
+from typing import Optional, Dict, List, Union # Add Union
 from pydantic import BaseModel, Field # <-- IMPORT BaseModel and Field HERE
 
-from ..services import file_processor
 from ..services import notification_service
+from ..services import answer_cache
+from ..services import ingestion_jobs
+from ..services import document_registry
+from ..services import model_lifecycle
+# file_processor, reranker and the embedding wrappers pull in the langchain/Chroma stack, so the
+# handlers that need them import them on first use instead of at app import.
+from ..services import bulk_ingestion
 from ..dependencies import get_current_admin_user, get_current_user_data
 from ..db import schemas, database
+from ..core.config import settings
 
 router = APIRouter(
     prefix="/admin",
@@ -25,8 +35,27 @@ ALLOWED_ACCESS_TARGETS = [
 ]
 ALLOWED_NOTIFICATION_TARGET_LEVELS = ["all", "0", "1", "2", "3", "4"]
 
+def _parse_notification_target_level(notification_message: Optional[str], notification_target_level: Optional[str]) -> Optional[int]:
+    """Validates the upload notification form fields; returns the parsed level (0-4) or None if no notification."""
+    if not notification_message:
+        return None
+    if not notification_target_level:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="notification_target_level is required if notification_message is provided.")
+    if notification_target_level not in ALLOWED_NOTIFICATION_TARGET_LEVELS:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=f"Invalid notification_target_level. Allowed: {', '.join(ALLOWED_NOTIFICATION_TARGET_LEVELS)}")
+    try:
+        if isinstance(notification_target_level, str) and notification_target_level.lower() == "all":
+            parsed_target_level = 0
+        else:
+            parsed_target_level = int(notification_target_level)
+        if not (0 <= parsed_target_level <= 4):
+            raise ValueError("Parsed target level out of range 0-4.")
+    except ValueError:
+         raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="Invalid format for notification_target_level. Must be 'all' or an integer 0-4.")
+    return parsed_target_level
+
 # --- Document Upload Endpoint (Existing) ---
-@router.post("/upload", response_model=schemas.UploadResponse, status_code=status.HTTP_201_CREATED)
+@router.post("/upload", response_model=schemas.UploadResponse, status_code=status.HTTP_202_ACCEPTED)
 async def upload_document(
     notification_message: Annotated[Optional[str], Form(description="Optional message for student notification.")] = None,
     notification_target_level: Annotated[Optional[str], Form(description=f"Target level for notification ('all', 0, 1, 2, 3, 4). Required if notification_message is provided.")] = None,
@@ -35,6 +64,11 @@ async def upload_document(
     db: Session = Depends(database.get_db),
     current_admin_user: schemas.TokenData = Depends(get_current_user_data)
 ):
+    """
+    Accepts a document for background ingestion and returns 202 with a job ID.
+    Parsing, chunking and embedding run in an ingestion worker; poll GET /admin/jobs/{job_id}.
+    The optional notification is only sent once the job succeeds and added chunks (not for a duplicate file).
+    """
     filename = file.filename
     content_type = file.content_type
     logger.info(f"Admin '{current_admin_user.username}' initiating upload for file: {filename}, Access: {doc_access_target}")
@@ -42,64 +76,36 @@ async def upload_document(
     if doc_access_target not in ALLOWED_ACCESS_TARGETS:
         raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=f"Invalid doc_access_target. Allowed: {ALLOWED_ACCESS_TARGETS}")
 
-    notification_created_successfully = False
-    parsed_target_level: Optional[int] = None
-
-    if notification_message:
-        if not notification_target_level:
-            raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="notification_target_level is required if notification_message is provided.")
-        if notification_target_level not in ALLOWED_NOTIFICATION_TARGET_LEVELS:
-            raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=f"Invalid notification_target_level. Allowed: {', '.join(ALLOWED_NOTIFICATION_TARGET_LEVELS)}")
-        try:
-            if isinstance(notification_target_level, str) and notification_target_level.lower() == "all":
-                parsed_target_level = 0
-            else:
-                parsed_target_level = int(notification_target_level)
-            if not (0 <= parsed_target_level <= 4):
-                raise ValueError("Parsed target level out of range 0-4.")
-        except ValueError:
-             raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="Invalid format for notification_target_level. Must be 'all' or an integer 0-4.")
+    parsed_target_level = _parse_notification_target_level(notification_message, notification_target_level)
 
-    doc_id = None
     try:
+        # While models are still loading, the job is queued and the worker waits for them.
+        if not model_lifecycle.is_loading() and model_lifecycle.state("vector_store") != model_lifecycle.STATE_READY:
+            raise RuntimeError("System not properly configured for embedding. Check logs.")
+
         file_content = await file.read()
         if not file_content:
              raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Uploaded file is empty.")
-        
-        doc_id = file_processor.process_and_embed_document(
-            file_content, content_type, filename, doc_access_target
-        )
 
-        if not doc_id:
-            logger.warning(f"File '{filename}' was not processed by file_processor.")
-            return schemas.UploadResponse(
-                message="File processing failed or returned no document ID.",
-                filename=filename,
-                doc_internal_id=None,
-                error="File processing error.",
-                notification_sent=False
-            )
-
-        if notification_message and parsed_target_level is not None: 
-            try:
-                notification_service.create_notification(
-                    db=db,
-                    message=notification_message,
-                    target_level_input=parsed_target_level, 
-                    document_internal_id=doc_id
-                )
-                notification_created_successfully = True
-                logger.info(f"Notification created for document {doc_id} targeting level '{notification_target_level}'.")
-            except Exception as e_notif:
-                logger.error(f"Failed to create notification for document {doc_id}: {e_notif}")
-        
-        logger.info(f"File '{filename}' processed successfully. Internal ID: {doc_id}, Access: {doc_access_target}")
+        job = ingestion_jobs.enqueue_job(
+            db=db,
+            file_content=file_content,
+            content_type=content_type,
+            filename=filename,
+            doc_access_target=doc_access_target,
+            notification_message=notification_message,
+            notification_target_level=parsed_target_level if notification_message else None,
+            created_by=current_admin_user.username
+        )
         return schemas.UploadResponse(
-            message="File uploaded and processed successfully.",
+            message="File accepted for processing.",
             filename=filename,
-            doc_internal_id=doc_id,
-            notification_sent=notification_created_successfully
+            job_id=job.id,
+            status=job.status,
+            notification_sent=False
         )
+    except HTTPException:
+        raise
     except RuntimeError as e_runtime: 
         logger.error(f"Configuration error during upload of '{filename}': {e_runtime}", exc_info=True)
         raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e_runtime))
@@ -113,6 +119,201 @@ async def upload_document(
         if file: 
             await file.close()
 
+# --- Bulk / Archive Upload Endpoint ---
+@router.post("/upload/bulk", response_model=schemas.BulkUploadResponse, status_code=status.HTTP_202_ACCEPTED)
+async def upload_documents_bulk(
+    files: List[UploadFile] = File(..., description="Several documents, or a single .zip archive of documents."),
+    doc_access_target: Annotated[str, Form(description=f"Access target shared by all files unless overridden. Allowed values: {', '.join(ALLOWED_ACCESS_TARGETS)}")] = "admin_only",
+    doc_access_targets: Annotated[Optional[str], Form(description='Optional JSON object of per-file access targets, e.g. {"week1.pdf": "level_1"}.')] = None,
+    notification_message: Annotated[Optional[str], Form(description="Optional message for one student notification once the batch is ingested.")] = None,
+    notification_target_level: Annotated[Optional[str], Form(description="Target level for notification ('all', 0, 1, 2, 3, 4). Required if notification_message is provided.")] = None,
+    db: Session = Depends(database.get_db),
+    current_admin_user: schemas.TokenData = Depends(get_current_user_data)
+):
+    """
+    Accepts several files (or one zip archive) for background ingestion and returns 202 with one
+    job ID per file. An ingestion worker runs the batch with parsing, splitting, embedding and Chroma
+    writes as overlapping pipeline stages; poll GET /admin/jobs/{job_id}. The optional notification
+    is sent once for the batch, after it is ingested, unless every file was a duplicate.
+    """
+    if doc_access_target not in ALLOWED_ACCESS_TARGETS:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=f"Invalid doc_access_target. Allowed: {ALLOWED_ACCESS_TARGETS}")
+    per_file_targets: Dict[str, str] = {}
+    if doc_access_targets:
+        try:
+            per_file_targets = json.loads(doc_access_targets)
+            if not isinstance(per_file_targets, dict):
+                raise ValueError("doc_access_targets must be a JSON object")
+        except ValueError as e_json:
+            raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=f"Invalid doc_access_targets: {e_json}")
+        invalid = {name: target for name, target in per_file_targets.items() if target not in ALLOWED_ACCESS_TARGETS}
+        if invalid:
+            raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=f"Invalid doc_access_targets {invalid}. Allowed: {ALLOWED_ACCESS_TARGETS}")
+    parsed_target_level = _parse_notification_target_level(notification_message, notification_target_level)
+
+    logger.info(f"Admin '{current_admin_user.username}' initiating bulk upload of {len(files)} file(s), Access: {doc_access_target}")
+    try:
+        uploads = []
+        for upload in files:
+            content = await upload.read()
+            await upload.close()
+            if bulk_ingestion.is_zip_upload(upload.filename, upload.content_type):
+                uploads.extend(bulk_ingestion.expand_zip(content))
+            else:
+                uploads.append((upload.filename, content, upload.content_type))
+    except ValueError as e_zip:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e_zip))
+
+    if not uploads:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="No files to ingest.")
+    if len(uploads) > settings.BULK_MAX_FILES:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Too many files ({len(uploads)}); the limit is {settings.BULK_MAX_FILES}.")
+    if sum(len(content) for _, content, _ in uploads) > settings.BULK_MAX_TOTAL_MB * 1024 * 1024:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Batch exceeds {settings.BULK_MAX_TOTAL_MB} MB.")
+
+    items = [
+        {
+            "filename": name,
+            "content": content,
+            "content_type": content_type,
+            "doc_access_target": per_file_targets.get(name, doc_access_target),
+        }
+        for name, content, content_type in uploads
+    ]
+
+    try:
+        # While models are still loading, the batch is queued and the worker waits for them.
+        if not model_lifecycle.is_loading() and model_lifecycle.state("vector_store") != model_lifecycle.STATE_READY:
+            raise RuntimeError("System not properly configured for embedding. Check logs.")
+        jobs = ingestion_jobs.enqueue_batch(
+            db, items,
+            notification_message=notification_message,
+            notification_target_level=parsed_target_level if notification_message else None,
+            created_by=current_admin_user.username
+        )
+    except RuntimeError as e_runtime:
+        logger.error(f"Configuration error during bulk upload: {e_runtime}", exc_info=True)
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e_runtime))
+
+    return schemas.BulkUploadResponse(
+        message=f"Accepted {len(jobs)} file(s) for processing.",
+        batch_id=jobs[0].batch_id,
+        results=[
+            schemas.UploadResponse(
+                message="File accepted for processing.",
+                filename=job.filename,
+                job_id=job.id,
+                status=job.status,
+                notification_sent=False
+            )
+            for job in jobs
+        ]
+    )
+
+# --- Ingestion Job Status Endpoint ---
+@router.get("/jobs/{job_id}", response_model=schemas.IngestionJobStatus)
+async def get_ingestion_job_status(
+    job_id: str,
+    db: Session = Depends(database.get_db)
+):
+    """
+    Reports the state, chunk progress and error (if any) of a background ingestion job.
+    """
+    job = ingestion_jobs.get_job(db, job_id)
+    if not job:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Ingestion job '{job_id}' not found.")
+    return job
+
+# --- Document Registry Endpoints ---
+@router.get("/documents", response_model=List[schemas.DocumentInfo])
+async def list_documents(
+    doc_access_target: Optional[str] = None,
+    skip: int = 0,
+    limit: int = 100,
+    db: Session = Depends(database.get_db)
+):
+    """
+    Lists indexed documents (newest first), optionally for one access target.
+    """
+    return document_registry.list_documents(db, doc_access_target=doc_access_target, skip=skip, limit=limit)
+
+@router.get("/documents/{doc_internal_id}", response_model=schemas.DocumentInfo)
+async def get_document(
+    doc_internal_id: str,
+    db: Session = Depends(database.get_db)
+):
+    document = document_registry.get_document(db, doc_internal_id)
+    if not document:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Document '{doc_internal_id}' not found.")
+    return document
+
+@router.delete("/documents/{doc_internal_id}", response_model=schemas.DocumentDeleteResponse)
+async def delete_document(
+    doc_internal_id: str,
+    db: Session = Depends(database.get_db),
+    current_admin_user: schemas.TokenData = Depends(get_current_user_data)
+):
+    """
+    Removes a document's chunks from the vector store and lexical index, then its registry entry.
+    """
+    from ..services import file_processor
+    document = document_registry.get_document(db, doc_internal_id)
+    if not document:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Document '{doc_internal_id}' not found.")
+    try:
+        chunks_deleted = await run_in_threadpool(file_processor.delete_document, doc_internal_id, document.doc_access_target)
+    except RuntimeError as e_runtime:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e_runtime))
+    document_registry.remove_document(db, document)
+    logger.info(f"Admin '{current_admin_user.username}' deleted document {doc_internal_id} ({chunks_deleted} chunks).")
+    return schemas.DocumentDeleteResponse(message="Document deleted.", doc_internal_id=doc_internal_id, chunks_deleted=chunks_deleted)
+
+@router.put("/documents/{doc_internal_id}", response_model=schemas.DocumentReplaceResponse)
+async def replace_document(
+    doc_internal_id: str,
+    file: UploadFile = File(...),
+    db: Session = Depends(database.get_db),
+    current_admin_user: schemas.TokenData = Depends(get_current_user_data)
+):
+    """
+    Replaces a document with a new version, keeping its ID and access target.
+    Only chunks whose text changed are re-embedded; chunks that no longer exist are deleted.
+    """
+    from ..services import file_processor
+    document = document_registry.get_document(db, doc_internal_id)
+    if not document:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Document '{doc_internal_id}' not found.")
+    try:
+        file_content = await file.read()
+    finally:
+        await file.close()
+    if not file_content:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Uploaded file is empty.")
+
+    try:
+        result = await run_in_threadpool(
+            file_processor.replace_document,
+            doc_internal_id, file_content, file.content_type, file.filename, document.doc_access_target
+        )
+    except RuntimeError as e_runtime:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e_runtime))
+    if result is None:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"'{file.filename}' produced no content (unsupported type or no extractable text); the document was left unchanged."
+        )
+    document = document_registry.mark_replaced(
+        db, document, file.filename, file.content_type, chunk_count=result["chunks"], content_hash=result["content_hash"]
+    )
+    logger.info(f"Admin '{current_admin_user.username}' replaced document {doc_internal_id} with '{file.filename}'.")
+    return schemas.DocumentReplaceResponse(
+        message="Document replaced.",
+        document=document,
+        chunks_changed=result["chunks_changed"],
+        chunks_embedded=result["chunks_embedded"],
+        chunks_deleted=result["chunks_deleted"]
+    )
+
 # --- NEW: General Broadcast Message Endpoint ---
 class BroadcastMessageRequest(BaseModel): # BaseModel is now defined due to import
     message: str = Field(..., min_length=1, description="The message content to broadcast.")
@@ -168,3 +369,90 @@ async def broadcast_message_to_students(
             detail="Failed to send broadcast message."
         )
 
+
+# --- Answer Cache Statistics Endpoint ---
+@router.get("/answer-cache/stats", response_model=Dict[str, Union[bool, int, float]])
+async def get_answer_cache_stats():
+    """
+    Returns hit, miss, eviction, expiration and invalidation counters for the semantic answer cache.
+    """
+    if answer_cache.answer_cache is None:
+        return {"enabled": False}
+    return answer_cache.answer_cache.stats()
+
+def _find_embedding_wrapper(embeddings, wrapper_type):
+    """Walks the .base chain of embedding wrappers (instrumentation -> cache -> micro-batching -> model)."""
+    for _ in range(8):
+        if embeddings is None or isinstance(embeddings, wrapper_type):
+            return embeddings
+        embeddings = getattr(embeddings, "base", None)
+    return None
+
+# --- Query Embedding Cache Statistics Endpoint ---
+@router.get("/embedding-cache/stats", response_model=Dict[str, Union[bool, int, float]])
+async def get_embedding_cache_stats():
+    """
+    Returns hit rate and estimated saved inference time for the query embedding cache.
+    """
+    from ..services import file_processor
+    from ..services.embedding_cache import CachedEmbeddings
+    cache = _find_embedding_wrapper(file_processor.embedding_function, CachedEmbeddings)
+    if cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **cache.stats()}
+
+# --- Query Embedding Micro-Batching Statistics Endpoint ---
+@router.get("/embedding-batcher/stats", response_model=Dict[str, Union[bool, int, float]])
+async def get_embedding_batcher_stats():
+    """
+    Returns request/batch counts and average batch size for query embedding micro-batching.
+    """
+    from ..services import file_processor
+    from ..services.embedding_batcher import MicroBatchingEmbeddings
+    batcher = _find_embedding_wrapper(file_processor.embedding_function, MicroBatchingEmbeddings)
+    if batcher is None:
+        return {"enabled": False}
+    return {"enabled": True, **batcher.stats()}
+
+# --- Reranker Statistics Endpoint ---
+@router.get("/reranker/stats", response_model=Dict[str, Union[bool, int, float]])
+async def get_reranker_stats():
+    """
+    Returns call, budget-fallback and latency figures for the cross-encoder reranking stage.
+    """
+    from ..services import reranker
+    if reranker.reranker is None:
+        return {"enabled": False}
+    return {"enabled": True, **reranker.reranker.stats()}
+
+# --- Request Profiles (PROFILING_ENABLED) ---
+@router.get("/profiles", response_model=List[Dict[str, Union[str, float]]])
+async def list_request_profiles():
+    """
+    Lists the most recent profiles taken with an X-Profile header (newest first).
+    """
+    from ..services import profiling
+    return profiling.list_reports()
+
+@router.get("/profiles/{profile_id}")
+async def get_request_profile(profile_id: str):
+    """
+    Returns the stage breakdown of one profiled request or ingestion job (`job-<job_id>`).
+    """
+    from ..services import profiling
+    report = profiling.get_report(profile_id)
+    if report is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Profile '{profile_id}' not found.")
+    return report
+
+@router.get("/profiles/{profile_id}/flamegraph", response_class=PlainTextResponse)
+async def get_request_profile_flamegraph(profile_id: str):
+    """
+    Returns the sampled stacks of an X-Profile: flame request in collapsed format
+    (flamegraph.pl, speedscope, inferno).
+    """
+    from ..services import profiling
+    report = profiling.get_report(profile_id)
+    if report is None or not report.get("flamegraph"):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"No flame graph for profile '{profile_id}'.")
+    return PlainTextResponse(report["flamegraph"])
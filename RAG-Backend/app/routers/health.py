@@ -0,0 +1,32 @@
+# app/routers/health.py
+import logging
+
+from fastapi import APIRouter, status
+from fastapi.responses import JSONResponse
+
+from ..services import model_lifecycle
+
+router = APIRouter(
+    prefix="/health",
+    tags=["Health"]
+)
+logger = logging.getLogger(__name__)
+
+@router.get("/live")
+async def liveness():
+    """The process is up and serving requests (models may still be loading)."""
+    return {"status": "alive"}
+
+@router.get("/ready")
+async def readiness():
+    """
+    200 once the embedding model, vector store, LLM and (if enabled) reranker are loaded and warmed up;
+    503 while loading or if a component failed. Reports per-component state and load times either way.
+    """
+    ready = model_lifecycle.is_ready()
+    body = {
+        "status": "ready" if ready else ("loading" if model_lifecycle.is_loading() else "not_ready"),
+        "components": model_lifecycle.snapshot()
+    }
+    headers = {"Retry-After": str(model_lifecycle.RETRY_AFTER_S)} if body["status"] == "loading" else None
+    return JSONResponse(status_code=status.HTTP_200_OK if ready else status.HTTP_503_SERVICE_UNAVAILABLE, content=body, headers=headers)
@@ -1,21 +1,36 @@
 # app/routers/notifications.py
+import asyncio
+import json
 import logging
-from typing import List, Optional
+from typing import AsyncIterator, Dict, List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, Header, HTTPException, Response, status, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 
 from ..db import database, schemas, models # Import necessary items
 from ..services import notification_service # Import your notification service
-from ..dependencies import get_current_user_data # For authenticated user context
+from ..services import auth_service
+from ..dependencies import get_current_user_data, get_stream_user_data # For authenticated user context
+from ..core.config import settings
 
 router = APIRouter(
     prefix="/notifications",
     tags=["Notifications"],
     dependencies=[Depends(get_current_user_data)] # All notification endpoints require login
 )
+# GET /notifications/stream also accepts a ?token= stream token, so it cannot sit behind the bearer-only dependency.
+stream_router = APIRouter(prefix="/notifications", tags=["Notifications"])
 logger = logging.getLogger(__name__)
 
+def _notification_level(current_user: schemas.TokenData) -> Optional[int]:
+    """Level whose notifications the user sees: their own for students, 0 ("all students") for admins, else None."""
+    if current_user.role == "student" and current_user.level is not None:
+        return current_user.level
+    if current_user.role == "admin":
+        return 0
+    return None
+
 @router.get("/", response_model=List[schemas.NotificationDisplay])
 async def get_my_notifications(
     fetch_all: Optional[bool] = Query(False, description="Set to true to fetch all notifications including seen ones, otherwise only unseen are returned."),
@@ -73,14 +88,16 @@ async def mark_notifications_seen(
     if not user_db:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found in database.")
 
-    if not request.notification_ids:
-        # No IDs provided, nothing to do, but not an error.
+    student_level = _notification_level(current_user)
+    if not request.notification_ids or student_level is None:
+        # No IDs provided (or no notifications for this user), nothing to do, but not an error.
         return
 
     success = notification_service.mark_notifications_as_seen(
         db=db,
         user_id=user_db.id,
-        notification_ids=request.notification_ids
+        notification_ids=request.notification_ids,
+        student_level=student_level
     )
 
     if not success:
@@ -92,3 +109,145 @@ async def mark_notifications_seen(
     # Return 204 No Content on success
     return
 
+
+@router.post("/mark-all-seen", response_model=Dict[str, int])
+async def mark_all_notifications_seen(
+    current_user: schemas.TokenData = Depends(get_current_user_data),
+    db: Session = Depends(database.get_db)
+):
+    """
+    Marks every notification visible to the currently logged-in user as seen, without an ID list.
+    Returns how many were newly marked.
+    """
+    user_db = db.query(models.User).filter(models.User.username == current_user.username).first()
+    if not user_db:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found in database.")
+
+    student_level = _notification_level(current_user)
+    if student_level is None:
+        return {"marked": 0}
+
+    marked = notification_service.mark_all_notifications_as_seen(db=db, user_id=user_db.id, student_level=student_level)
+    if marked is None:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to mark notifications as seen."
+        )
+    return {"marked": marked}
+
+@router.get("/unread-count", response_model=Dict[str, int])
+async def get_unread_notification_count(
+    current_user: schemas.TokenData = Depends(get_current_user_data),
+    db: Session = Depends(database.get_db)
+):
+    """
+    Returns how many notifications the currently logged-in user has not seen yet.
+    Cheap enough to poll: it reads two counters and the user's read state.
+    """
+    student_level = _notification_level(current_user)
+    if student_level is None:
+        return {"unread": 0}
+    user_db = db.query(models.User).filter(models.User.username == current_user.username).first()
+    if not user_db:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found in database.")
+    return {"unread": notification_service.get_unread_count(db=db, user_id=user_db.id, student_level=student_level)}
+
+
+# --- Push Channel (server-sent events) ---
+STREAM_RETRY_MS = 3000 # Reconnect delay suggested to EventSource clients
+
+def _format_notification_event(event: Dict) -> str:
+    return f"id: {event['id']}\nevent: notification\ndata: {json.dumps(event)}\n\n"
+
+@router.post("/stream-token", response_model=schemas.StreamToken)
+async def create_notification_stream_token(
+    current_user: schemas.TokenData = Depends(get_current_user_data)
+):
+    """
+    Issues a short-lived token for opening GET /notifications/stream?token=... from a browser
+    EventSource, which cannot send an Authorization header. It only works for the stream.
+    """
+    return schemas.StreamToken(
+        stream_token=auth_service.create_stream_token(current_user),
+        expires_in=settings.NOTIFICATION_STREAM_TOKEN_TTL_S
+    )
+
+@stream_router.get("/stream")
+async def stream_notifications(
+    last_event_id: Optional[str] = Header(None, alias="Last-Event-ID", description="Sent by EventSource on reconnect"),
+    since_id: Optional[int] = Query(None, description="Resume after this notification ID (for clients that cannot set Last-Event-ID)"),
+    current_user: schemas.TokenData = Depends(get_stream_user_data)
+):
+    """
+    Pushes new notifications for the currently logged-in user as server-sent events
+    ('notification' events whose id is the notification ID), so clients need not poll GET /notifications/.
+    Authenticate with a bearer header (fetch-based clients) or, from a browser EventSource, with
+    ?token= from POST /notifications/stream-token. The token is only checked when the stream opens; once
+    it has expired, EventSource's automatic reconnect gets 401, so the client fetches a new token and
+    reopens with since_id set to the last event ID it received.
+    On reconnect, notifications created after Last-Event-ID are sent first. If more were missed than
+    can be replayed, a 'resync' event asks the client to reload GET /notifications/.
+    A client too slow to keep up is disconnected and resumes the same way.
+    """
+    from ..services.notification_hub import hub
+
+    student_level = _notification_level(current_user)
+    if student_level is None:
+        return Response(status_code=status.HTTP_204_NO_CONTENT) # Tells EventSource not to reconnect
+
+    resume_after = since_id
+    if last_event_id and last_event_id.strip().isdigit():
+        resume_after = int(last_event_id.strip())
+
+    # No request-scoped session: it would hold a pooled connection for as long as the stream is open.
+    db = database.SessionLocal()
+    subscription = None
+    try:
+        user_db = db.query(models.User).filter(models.User.username == current_user.username).first()
+        if not user_db:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found in database.")
+        # Subscribe before reading the backlog, so nothing created in between is missed.
+        subscription = hub.subscribe(user_db.id, student_level)
+        backlog: List[Dict] = []
+        resync = False
+        if resume_after is not None:
+            replay = hub.replay_since(resume_after, student_level)
+            if replay is None:
+                replay = notification_service.get_notifications_since(db, resume_after, student_level, settings.NOTIFICATION_STREAM_RESUME_LIMIT)
+                resync = len(replay) >= settings.NOTIFICATION_STREAM_RESUME_LIMIT
+            backlog = replay[-settings.NOTIFICATION_STREAM_RESUME_LIMIT:]
+    except Exception:
+        if subscription is not None:
+            hub.unsubscribe(subscription)
+        raise
+    finally:
+        db.close()
+    logger.info(f"User '{current_user.username}' opened a notification stream (Level {student_level}, resume after {resume_after}, {len(backlog)} to replay).")
+
+    async def event_stream() -> AsyncIterator[str]:
+        replayed_ids = set()
+        try:
+            yield f"retry: {STREAM_RETRY_MS}\n\n"
+            if resync:
+                yield "event: resync\ndata: {}\n\n"
+            for event in backlog:
+                replayed_ids.add(event["id"])
+                yield _format_notification_event(event)
+            while True:
+                try:
+                    event = await asyncio.wait_for(subscription.get(), timeout=settings.NOTIFICATION_STREAM_HEARTBEAT_S)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                if event is None: # Fell behind or shutting down; the client reconnects with Last-Event-ID
+                    return
+                if event["id"] not in replayed_ids:
+                    yield _format_notification_event(event)
+        finally:
+            hub.unsubscribe(subscription)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
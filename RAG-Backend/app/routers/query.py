@@ -1,11 +1,15 @@
 # app/routers/query.py
+import json
 import logging
+from typing import Any, AsyncIterator, Dict
+
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import StreamingResponse
 
-from ..services import rag_service
 # --- MODIFIED: Import the new dependency ---
 from ..dependencies import get_user_query_context, UserQueryContext
 from ..db import schemas # Import request/response schemas
+from ..services import model_lifecycle
 
 router = APIRouter(
     prefix="/query",
@@ -35,25 +39,76 @@ async def handle_query(
     try:
         logger.info(f"Received query: '{request.query}' from user with context: Role='{user_context.role}', Level='{user_context.level}'")
         
-        # --- MODIFIED: Pass user_context to the RAG service ---
-        answer, sources = rag_service.get_rag_answer(request.query, user_context)
+        from ..services import rag_service # Deferred so importing the app does not load the langchain stack
+        # --- MODIFIED: Pass user_context to the RAG service (async, keeps the event loop free) ---
+        answer, sources = await rag_service.aget_rag_answer(request.query, user_context)
 
         if answer.startswith("Error:"): # Check for specific error from rag_service
              # Determine appropriate status code based on error type
-             if "not available" in answer or "configuration issue" in answer:
+             headers = None
+             if "still starting up" in answer:
+                 status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+                 headers = {"Retry-After": str(model_lifecycle.RETRY_AFTER_S)} # Same back-off /health/ready reports
+             elif "not available" in answer or "configuration issue" in answer:
                  status_code = status.HTTP_503_SERVICE_UNAVAILABLE
              else:
                  status_code = status.HTTP_400_BAD_REQUEST # Or other relevant error
              raise HTTPException(
                 status_code=status_code,
-                detail=answer
+                detail=answer,
+                headers=headers
             )
 
         return schemas.RagQueryResponse(answer=answer, sources=sources)
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.exception(f"Unexpected error processing query '{request.query}': {e}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="An unexpected error occurred while processing your query."
         )
+
+
+def _format_sse(event: Dict[str, Any]) -> str:
+    """Encodes a rag_service stream event as a server-sent event frame."""
+    return f"event: {event['event']}\ndata: {json.dumps(event['data'])}\n\n"
+
+
+@router.post("/stream")
+async def handle_query_stream(
+    request: schemas.RagQueryRequest,
+    user_context: UserQueryContext = Depends(get_user_query_context)
+):
+    """
+    Same as POST /query/ but streams the answer as server-sent events while the LLM generates.
+    Emits a 'sources' event first, then 'token' events, then 'done' (or 'error').
+    Access control is identical to /query/.
+    """
+    if not request.query or not request.query.strip():
+         raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Query cannot be empty."
+         )
+
+    if model_lifecycle.is_loading(): # Refuse before the 200 stream starts, as /query/ does
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Error: The question answering system is still starting up. Please try again shortly.",
+            headers={"Retry-After": str(model_lifecycle.RETRY_AFTER_S)}
+        )
+
+    logger.info(f"Received streaming query: '{request.query}' from user with context: Role='{user_context.role}', Level='{user_context.level}'")
+
+    from ..services import rag_service
+
+    async def event_stream() -> AsyncIterator[str]:
+        async for event in rag_service.astream_rag_answer(request.query, user_context):
+            yield _format_sse(event)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -0,0 +1,78 @@
+# app/scripts/backfill_document_registry.py
+"""
+Registers documents that were ingested before the `documents` table existed, so they can be
+listed, deleted and replaced through /admin/documents. Reads chunk metadata from the Chroma
+collection (and its access-target partitions); no embedding model is loaded. Documents already
+in the registry are left untouched.
+
+Run:  python -m app.scripts.backfill_document_registry
+"""
+import argparse
+import logging
+from typing import Any, Dict
+
+import chromadb
+
+from ..core.config import settings
+from ..db import database, models
+from ..services import chunk_store
+from ..services.partitioned_store import stored_collection_names
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+PAGE_SIZE = 1000
+
+
+def backfill_document_registry(collection_name: str = None) -> int:
+    """Adds a registry row for every unregistered doc_internal_id found in Chroma. Returns the number added."""
+    client = chromadb.PersistentClient(path=settings.CHROMA_DB_PATH)
+    names = [collection_name] if collection_name else stored_collection_names(client, settings.VECTOR_DB_COLLECTION_NAME)
+
+    found: Dict[str, Dict[str, Any]] = {}
+    for name in names:
+        collection = client.get_collection(name, embedding_function=None)
+        total = collection.count()
+        for offset in range(0, total, PAGE_SIZE):
+            page = collection.get(limit=PAGE_SIZE, offset=offset, include=["metadatas"])
+            if not page["ids"]:
+                break
+            for metadata in page["metadatas"]:
+                metadata = metadata or {}
+                doc_id = metadata.get("doc_internal_id")
+                if not doc_id:
+                    continue
+                entry = found.setdefault(doc_id, {
+                    "filename": metadata.get("source_filename") or doc_id,
+                    "doc_access_target": metadata.get("doc_access_target") or "admin_only",
+                    "content_hash": metadata.get(chunk_store.FILE_HASH_KEY) or "",
+                    "chunk_count": 0,
+                })
+                entry["chunk_count"] += 1
+
+    database.Base.metadata.create_all(bind=database.engine)
+    db = database.SessionLocal()
+    try:
+        registered = {row[0] for row in db.query(models.Document.doc_internal_id).all()}
+        added = 0
+        for doc_id, entry in found.items():
+            if doc_id in registered:
+                continue
+            db.add(models.Document(doc_internal_id=doc_id, **entry))
+            added += 1
+        db.commit()
+    finally:
+        db.close()
+    logger.info(f"Found {len(found)} documents in Chroma; registered {added} new ones.")
+    return added
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--collection", default=None, help="Default: the configured collection and all of its access-target partitions")
+    args = parser.parse_args()
+    backfill_document_registry(args.collection)
+
+
+if __name__ == "__main__":
+    main()
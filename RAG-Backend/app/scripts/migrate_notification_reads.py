@@ -0,0 +1,33 @@
+# app/scripts/migrate_notification_reads.py
+"""
+Converts the legacy per-notification read rows (user_notification_status) into per-user read
+watermarks with sparse exceptions, and seeds the per-level notification counters used by
+GET /notifications/unread-count. The API also runs this at startup; users that already have a
+read state are skipped, so it is safe to run more than once. The legacy table is left in place.
+
+Run:  python -m app.scripts.migrate_notification_reads
+"""
+import argparse
+import logging
+
+from ..db import database
+from ..services import notification_service
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.parse_args()
+    database.Base.metadata.create_all(bind=database.engine)
+    db = database.SessionLocal()
+    try:
+        migrated = notification_service.migrate_legacy_read_status(db)
+    finally:
+        db.close()
+    logger.info(f"Migrated {migrated} users.")
+
+
+if __name__ == "__main__":
+    main()
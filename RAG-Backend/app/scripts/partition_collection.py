@@ -0,0 +1,84 @@
+# app/scripts/partition_collection.py
+"""
+Migrates the single collection (VECTOR_DB_COLLECTION_NAME, e.g. rag_docs) to the partitioned
+layout: one collection per doc_access_target, named <collection>__<target>. Stored vectors are
+copied as-is, so no model is loaded. Chunks stored without a doc_access_target are stamped
+admin_only, the only scope that could read them. The source collection is kept unless
+--drop-source is given, so VECTOR_STORE_LAYOUT can be switched back if needed.
+
+Stop the API, run:  python -m app.scripts.partition_collection
+then set VECTOR_STORE_LAYOUT=partitioned.
+"""
+import argparse
+import logging
+import time
+from typing import Dict, List
+
+import chromadb
+
+from ..core.config import settings
+from ..services.partitioned_store import ACCESS_TARGET_KEY, partition_name
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+PAGE_SIZE = 500
+UNASSIGNED_TARGET = "admin_only" # For legacy chunks stored without a doc_access_target
+
+
+def partition_collection(collection_name: str = None, drop_source: bool = False) -> Dict[str, int]:
+    """Copies every chunk into its access target's partition. Returns chunk counts per target."""
+    collection_name = collection_name or settings.VECTOR_DB_COLLECTION_NAME
+    client = chromadb.PersistentClient(path=settings.CHROMA_DB_PATH)
+    source = client.get_collection(collection_name, embedding_function=None)
+    total = source.count()
+    logger.info(f"Partitioning '{collection_name}' ({total} chunks) by {ACCESS_TARGET_KEY}.")
+
+    start = time.perf_counter()
+    partitions = {}
+    counts: Dict[str, int] = {}
+    copied = 0
+    for offset in range(0, total, PAGE_SIZE):
+        page = source.get(limit=PAGE_SIZE, offset=offset, include=["embeddings", "documents", "metadatas"])
+        if not page["ids"]:
+            break
+        grouped: Dict[str, List[int]] = {}
+        metadatas = [dict(metadata or {}) for metadata in page["metadatas"]]
+        for i, metadata in enumerate(metadatas):
+            # Chunks without a target only matched the unfiltered admin search; stamping them admin_only
+            # keeps them admin-visible, since partitions are discovered by their chunks' target.
+            if not metadata.get(ACCESS_TARGET_KEY):
+                metadata[ACCESS_TARGET_KEY] = UNASSIGNED_TARGET
+            grouped.setdefault(metadata[ACCESS_TARGET_KEY], []).append(i)
+        for target, idx in grouped.items():
+            if target not in partitions:
+                partitions[target] = client.get_or_create_collection(
+                    partition_name(collection_name, target), metadata=source.metadata, embedding_function=None
+                )
+            partitions[target].upsert( # Upsert makes re-running after an interruption safe
+                ids=[page["ids"][i] for i in idx],
+                embeddings=[page["embeddings"][i] for i in idx],
+                documents=[page["documents"][i] for i in idx],
+                metadatas=[metadatas[i] for i in idx]
+            )
+            counts[target] = counts.get(target, 0) + len(idx)
+        copied += len(page["ids"])
+        logger.info(f"Partitioned {copied}/{total} chunks.")
+
+    logger.info(f"Partitioned '{collection_name}' in {time.perf_counter() - start:.1f}s: {counts}")
+    if drop_source:
+        client.delete_collection(collection_name)
+        logger.info(f"Dropped source collection '{collection_name}'.")
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--collection", default=settings.VECTOR_DB_COLLECTION_NAME)
+    parser.add_argument("--drop-source", action="store_true", help="Delete the single collection after copying")
+    args = parser.parse_args()
+    partition_collection(args.collection, drop_source=args.drop_source)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+# app/scripts/rebuild_collection.py
+"""
+Rebuilds the Chroma collection at a new embedding dimension (EMBEDDING_DIMENSION by default).
+
+If the stored vectors are at least as long as the target, they are truncated and re-normalized
+(Matryoshka), so no model is loaded. Otherwise, or with --reembed, every chunk is re-embedded
+from its stored text with the configured backend. The new vectors go into a temporary collection
+that replaces the original only once the copy is complete.
+
+Stop the API before running:  python -m app.scripts.rebuild_collection --dimension 256
+"""
+import argparse
+import logging
+import time
+
+import chromadb
+import numpy as np
+
+from ..core.config import settings
+from ..services import embedding_backends
+from ..services.partitioned_store import stored_collection_names
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+PAGE_SIZE = 500
+
+
+def _truncate(vectors: np.ndarray, dimension: int) -> np.ndarray:
+    truncated = vectors[:, :dimension]
+    return truncated / np.clip(np.linalg.norm(truncated, axis=1, keepdims=True), 1e-12, None)
+
+
+def rebuild_collection(dimension: int, reembed: bool = False, collection_name: str = None) -> int:
+    """Rebuilds the collection in place at `dimension` (0 = the model's full dimension). Returns the number of chunks copied."""
+    collection_name = collection_name or settings.VECTOR_DB_COLLECTION_NAME
+    client = chromadb.PersistentClient(path=settings.CHROMA_DB_PATH)
+    source = client.get_collection(collection_name, embedding_function=None)
+    current_dim = embedding_backends.stored_dimension(source)
+    total = source.count()
+    if current_dim is None:
+        logger.info(f"Collection '{collection_name}' is empty; nothing to rebuild.")
+        return 0
+    if dimension > 0 and current_dim == dimension and not reembed:
+        logger.info(f"Collection '{collection_name}' is already {dimension}-d; nothing to do.")
+        return 0
+
+    needs_model = reembed or dimension <= 0 or current_dim < dimension
+    embeddings = embedding_backends.create_embeddings(dimension=dimension) if needs_model else None
+    logger.info(
+        f"Rebuilding '{collection_name}': {total} chunks, {current_dim}-d -> "
+        f"{dimension if dimension > 0 else 'full'}-d ({'re-embedding' if needs_model else 'truncating stored vectors'})."
+    )
+
+    temp_name = f"rebuild_tmp.{collection_name}" # Must not look like an access-target partition
+    try:
+        client.delete_collection(temp_name) # Left over from an interrupted run
+    except Exception:
+        pass
+    target = client.create_collection(temp_name, metadata=source.metadata, embedding_function=None)
+
+    start = time.perf_counter()
+    copied = 0
+    for offset in range(0, total, PAGE_SIZE):
+        page = source.get(limit=PAGE_SIZE, offset=offset, include=["embeddings", "documents", "metadatas"])
+        if not page["ids"]:
+            break
+        if needs_model:
+            vectors = np.asarray(embeddings.embed_documents(page["documents"]), dtype=np.float32)
+        else:
+            vectors = _truncate(np.asarray(page["embeddings"], dtype=np.float32), dimension)
+        target.add(ids=page["ids"], embeddings=vectors.tolist(), documents=page["documents"], metadatas=page["metadatas"])
+        copied += len(page["ids"])
+        logger.info(f"Rebuilt {copied}/{total} chunks.")
+
+    client.delete_collection(collection_name)
+    target.modify(name=collection_name)
+    logger.info(f"Rebuilt '{collection_name}' with {copied} chunks in {time.perf_counter() - start:.1f}s.")
+    return copied
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dimension", type=int, default=settings.EMBEDDING_DIMENSION,
+                        help="Target dimension; 0 re-embeds at the model's full dimension (default: EMBEDDING_DIMENSION)")
+    parser.add_argument("--reembed", action="store_true", help="Re-embed from stored text even if truncation would do")
+    parser.add_argument("--collection", default=None, help="Default: the configured collection and all of its access-target partitions")
+    args = parser.parse_args()
+    if args.collection:
+        names = [args.collection]
+    else:
+        names = stored_collection_names(chromadb.PersistentClient(path=settings.CHROMA_DB_PATH), settings.VECTOR_DB_COLLECTION_NAME)
+    for name in names:
+        rebuild_collection(args.dimension, reembed=args.reembed, collection_name=name)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+# app/scripts/rebuild_lexical_index.py
+"""
+Rebuilds the BM25 lexical index from the chunks already stored in the Chroma collection.
+New uploads are indexed as they are ingested; run this once for documents ingested before
+hybrid retrieval existed, or if the index file was lost. No embedding model is loaded.
+
+Run:  python -m app.scripts.rebuild_lexical_index
+"""
+import argparse
+import logging
+import time
+
+import chromadb
+
+from ..core.config import settings
+from ..services.lexical_index import LexicalIndex, default_index_path
+from ..services.partitioned_store import stored_collection_names
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+PAGE_SIZE = 1000
+
+
+def rebuild_lexical_index(collection_name: str = None, index_path: str = None) -> int:
+    """
+    Replaces the index contents with every chunk in the collection (or, by default, the configured
+    collection and all of its access-target partitions). Returns the number of chunks indexed.
+    """
+    index = LexicalIndex(index_path or default_index_path())
+    client = chromadb.PersistentClient(path=settings.CHROMA_DB_PATH)
+    names = [collection_name] if collection_name else stored_collection_names(client, settings.VECTOR_DB_COLLECTION_NAME)
+
+    start = time.perf_counter()
+    index.clear()
+    indexed = 0
+    for name in names:
+        collection = client.get_collection(name, embedding_function=None)
+        total = collection.count()
+        for offset in range(0, total, PAGE_SIZE):
+            page = collection.get(limit=PAGE_SIZE, offset=offset, include=["documents", "metadatas"])
+            if not page["ids"]:
+                break
+            index.add_chunks(page["ids"], page["documents"], [metadata or {} for metadata in page["metadatas"]])
+            indexed += len(page["ids"])
+        logger.info(f"Indexed {total} chunks from '{name}'.")
+    logger.info(f"Lexical index at {index.path} rebuilt with {indexed} chunks in {time.perf_counter() - start:.1f}s.")
+    return indexed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--collection", default=None, help="Default: the configured collection and all of its access-target partitions")
+    parser.add_argument("--index-path", default=None, help="Defaults to LEXICAL_INDEX_PATH / <CHROMA_DB_PATH>_lexical.sqlite3")
+    args = parser.parse_args()
+    rebuild_lexical_index(args.collection, args.index_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+# app/services/answer_cache.py
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from ..core.config import settings
+from ..db import schemas
+
+logger = logging.getLogger(__name__)
+
+# An access scope is the frozen set of doc_access_target values a caller may read.
+# None means unrestricted (admin), which overlaps every access target.
+AccessScope = Optional[FrozenSet[str]]
+
+
+def make_access_scope(allowed_access_targets: Optional[Iterable[str]]) -> AccessScope:
+    """Normalizes a list of allowed targets (or None for unrestricted) into a hashable scope."""
+    if allowed_access_targets is None:
+        return None
+    return frozenset(allowed_access_targets)
+
+
+@dataclass
+class _CacheEntry:
+    scope: AccessScope
+    query: str
+    vector: np.ndarray # float32, L2-normalized
+    answer: str
+    sources: List[schemas.SourceDocumentInfo]
+    created_at: float
+
+
+class SemanticAnswerCache:
+    """
+    Caches RAG answers and matches new queries to past ones by embedding similarity.
+    - Entries only match callers with exactly the same access scope, so a guest can never
+      be served an answer that was built from level-specific or admin-only chunks.
+    - Entries expire after ttl_seconds and the least recently used entry is evicted once
+      max_entries is reached.
+    - invalidate_access_target drops every entry whose scope could see a newly added document.
+    """
+
+    def __init__(self, similarity_threshold: float, ttl_seconds: float, max_entries: int):
+        self.similarity_threshold = similarity_threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max(1, max_entries)
+        self._entries: "OrderedDict[int, _CacheEntry]" = OrderedDict() # LRU order, oldest first
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def _normalize(vector: Sequence[float]) -> np.ndarray:
+        arr = np.asarray(vector, dtype=np.float32)
+        norm = float(np.linalg.norm(arr))
+        return arr / norm if norm > 0 else arr
+
+    def _is_expired(self, entry: _CacheEntry, now: float) -> bool:
+        return self.ttl_seconds > 0 and now - entry.created_at > self.ttl_seconds
+
+    def lookup(self, scope: AccessScope, query_vector: Sequence[float]) -> Optional[Tuple[str, List[schemas.SourceDocumentInfo]]]:
+        """Returns (answer, sources) of the most similar cached query in the same scope, if above threshold."""
+        vector = self._normalize(query_vector)
+        now = time.monotonic()
+        with self._lock:
+            best_id, best_score = None, -1.0
+            for entry_id, entry in list(self._entries.items()):
+                if self._is_expired(entry, now):
+                    del self._entries[entry_id]
+                    self.expirations += 1
+                    continue
+                if entry.scope != scope or entry.vector.shape != vector.shape:
+                    continue
+                score = float(np.dot(entry.vector, vector))
+                if score > best_score:
+                    best_id, best_score = entry_id, score
+
+            if best_id is None or best_score < self.similarity_threshold:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(best_id)
+            self.hits += 1
+            entry = self._entries[best_id]
+            logger.info(f"Answer cache hit (similarity={best_score:.3f}) for cached query: '{entry.query[:80]}'")
+            return entry.answer, list(entry.sources)
+
+    def store(self, scope: AccessScope, query: str, query_vector: Sequence[float],
+              answer: str, sources: List[schemas.SourceDocumentInfo]) -> None:
+        entry = _CacheEntry(
+            scope=scope,
+            query=query,
+            vector=self._normalize(query_vector),
+            answer=answer,
+            sources=list(sources),
+            created_at=time.monotonic()
+        )
+        with self._lock:
+            self._entries[self._next_id] = entry
+            self._next_id += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate_access_target(self, doc_access_target: str) -> int:
+        """Drops entries whose scope includes doc_access_target (or is unrestricted). Returns the count removed."""
+        with self._lock:
+            stale_ids = [
+                entry_id for entry_id, entry in self._entries.items()
+                if entry.scope is None or doc_access_target in entry.scope
+            ]
+            for entry_id in stale_ids:
+                del self._entries[entry_id]
+            self.invalidations += len(stale_ids)
+        if stale_ids:
+            logger.info(f"Answer cache: invalidated {len(stale_ids)} entries for access target '{doc_access_target}'.")
+        return len(stale_ids)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": True,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
+
+
+answer_cache: Optional[SemanticAnswerCache] = None
+if settings.ANSWER_CACHE_ENABLED:
+    answer_cache = SemanticAnswerCache(
+        similarity_threshold=settings.ANSWER_CACHE_SIMILARITY_THRESHOLD,
+        ttl_seconds=settings.ANSWER_CACHE_TTL_SECONDS,
+        max_entries=settings.ANSWER_CACHE_MAX_ENTRIES
+    )
+    logger.info(f"Answer cache enabled (threshold={settings.ANSWER_CACHE_SIMILARITY_THRESHOLD}, ttl={settings.ANSWER_CACHE_TTL_SECONDS}s, max_entries={settings.ANSWER_CACHE_MAX_ENTRIES}).")
+
+
+def invalidate_access_target(doc_access_target: str) -> int:
+    """Module-level helper so ingestion code doesn't need to check whether the cache is enabled."""
+    if answer_cache is None:
+        return 0
+    return answer_cache.invalidate_access_target(doc_access_target)
@@ -13,6 +13,7 @@ from ..db import models, schemas
 # from ..db.database import SessionLocal
 
 logger = logging.getLogger(__name__)
+STREAM_TOKEN_SCOPE = "notification_stream" # Scope claim of tokens that may only open GET /notifications/stream
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
@@ -59,6 +60,16 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     encoded_jwt = jwt.encode(to_encode, settings.JWT_SECRET_KEY, algorithm=settings.JWT_ALGORITHM)
     return encoded_jwt
 
+def create_stream_token(token_data: schemas.TokenData) -> str:
+    """
+    Short-lived token for GET /notifications/stream?token=..., since a browser EventSource cannot send an
+    Authorization header. It carries a scope claim, so it is not accepted as a regular access token.
+    """
+    data = {"sub": token_data.username, "role": token_data.role, "scope": STREAM_TOKEN_SCOPE}
+    if token_data.level is not None:
+        data["level"] = token_data.level
+    return create_access_token(data, expires_delta=timedelta(seconds=settings.NOTIFICATION_STREAM_TOKEN_TTL_S))
+
 def authenticate_user(db: Session, username: str, password: str) -> Optional[models.User]:
     logger.info(f"Attempting authentication for user: {username}")
     db_user = get_user_by_username(db, username=username)
@@ -74,9 +85,13 @@ def authenticate_user(db: Session, username: str, password: str) -> Optional[mod
     logger.info(f"User '{username}' authenticated successfully (Role: {db_user.role}, Level: {db_user.level}).")
     return db_user
 
-def decode_access_token(token: str) -> Optional[schemas.TokenData]:
+def decode_access_token(token: str, scope: Optional[str] = None) -> Optional[schemas.TokenData]:
+    """Decodes a token whose scope claim equals `scope` (None for regular access tokens)."""
     try:
         payload = jwt.decode(token, settings.JWT_SECRET_KEY, algorithms=[settings.JWT_ALGORITHM])
+        if payload.get("scope") != scope:
+            logger.warning(f"Token scope '{payload.get('scope')}' is not valid here.")
+            return None
         username: str | None = payload.get("sub")
         role: str | None = payload.get("role")
         level: int | None = payload.get("level") # <-- Decode level from token
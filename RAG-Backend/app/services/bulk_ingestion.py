@@ -0,0 +1,242 @@
+# app/services/bulk_ingestion.py
+import io
+import logging
+import mimetypes
+import os
+import queue
+import threading
+import time
+import zipfile
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from ..core.config import settings
+from . import answer_cache
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+ZIP_TYPES = {"application/zip", "application/x-zip-compressed", "application/x-zip"}
+
+# mimetypes doesn't know .md/.docx on every platform
+_EXTENSION_TYPES = {
+    ".pdf": "application/pdf",
+    ".txt": "text/plain",
+    ".md": "text/markdown",
+    ".csv": "text/csv",
+    ".docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+}
+
+_STOP = object() # Pipeline sentinel
+
+
+def guess_content_type(filename: str) -> Optional[str]:
+    ext = os.path.splitext(filename)[1].lower()
+    return _EXTENSION_TYPES.get(ext) or mimetypes.guess_type(filename)[0]
+
+
+def is_zip_upload(filename: Optional[str], content_type: Optional[str]) -> bool:
+    return content_type in ZIP_TYPES or (filename or "").lower().endswith(".zip")
+
+
+def expand_zip(archive_bytes: bytes) -> List[Tuple[str, bytes, Optional[str]]]:
+    """
+    Returns (filename, content, content_type) for each regular file in the archive.
+    Enforces BULK_MAX_FILES and BULK_MAX_TOTAL_MB on the uncompressed size before extracting.
+    Raises ValueError for invalid or oversized archives.
+    """
+    try:
+        archive = zipfile.ZipFile(io.BytesIO(archive_bytes))
+    except zipfile.BadZipFile as e:
+        raise ValueError(f"Invalid zip archive: {e}")
+
+    entries = [
+        info for info in archive.infolist()
+        if not info.is_dir() and not info.filename.startswith("__MACOSX/") and not os.path.basename(info.filename).startswith(".")
+    ]
+    if len(entries) > settings.BULK_MAX_FILES:
+        raise ValueError(f"Archive contains {len(entries)} files; the limit is {settings.BULK_MAX_FILES}.")
+    total_size = sum(info.file_size for info in entries)
+    if total_size > settings.BULK_MAX_TOTAL_MB * 1024 * 1024:
+        raise ValueError(f"Archive expands to {total_size / 1e6:.1f} MB; the limit is {settings.BULK_MAX_TOTAL_MB} MB.")
+
+    return [(info.filename, archive.read(info), guess_content_type(info.filename)) for info in entries]
+
+
+def run_bulk_ingestion(
+    items: List[Dict[str, Any]],
+    on_prepared: Optional[Callable[[int, str], None]] = None # Called on the calling thread with (item index, doc_internal_id) before the file's first write
+) -> Tuple[List[Dict[str, Any]], Dict[str, float]]:
+    """
+    Ingests several files as a three-stage pipeline connected by bounded queues:
+      prepare (parse + split + hash lookups) -> embed (length-sorted batches) -> write (Chroma upserts)
+    so parsing file N+1 overlaps embedding file N, which overlaps writing earlier batches.
+    Each item is {"filename", "content", "content_type", "doc_access_target"}. Byte-identical items
+    with the same access target are processed once and the copies reported as duplicates; a file that
+    fails after some of its batches were written has those chunks deleted again.
+    Returns per-file results (in input order) and per-stage timings for the whole batch.
+    """
+    from . import chunk_store, file_processor, ingestion_embedder # Deferred: pulls in the langchain/Chroma stack
+    file_processor._check_ingestion_ready()
+    vector_store = file_processor.vector_store
+    embedding_function = file_processor.embedding_function
+
+    first_of_content: Dict[Tuple[str, str], int] = {}
+    copy_of: Dict[int, int] = {} # Item index -> index of the identical item that is actually ingested
+    for idx, item in enumerate(items):
+        key = (chunk_store.hash_file_content(item["content"]), item["doc_access_target"])
+        if key in first_of_content:
+            copy_of[idx] = first_of_content[key]
+        else:
+            first_of_content[key] = idx
+
+    depth = max(1, settings.BULK_PIPELINE_DEPTH)
+    prepared_q: "queue.Queue[Any]" = queue.Queue(maxsize=depth)
+    write_q: "queue.Queue[Any]" = queue.Queue(maxsize=depth * 4)
+    timings = {"prepare_s": 0.0, "embed_s": 0.0, "write_s": 0.0}
+    results: List[Dict[str, Any]] = [
+        {"filename": item["filename"], "doc_internal_id": None, "error": None, "content_hash": None,
+         "duplicate": False, "chunks": 0, "chunks_embedded": 0, "chunks_reused": 0}
+        for item in items
+    ]
+
+    def prepare_stage() -> None:
+        try:
+            for idx, item in enumerate(items):
+                if idx in copy_of:
+                    continue
+                t0 = time.perf_counter()
+                try:
+                    prepared = file_processor.prepare_document(
+                        item["content"], item["content_type"], item["filename"], item["doc_access_target"]
+                    )
+                    prepared_q.put((idx, prepared, None))
+                except Exception as e:
+                    logger.exception(f"Bulk ingestion: failed to prepare '{item['filename']}': {e}")
+                    prepared_q.put((idx, None, str(e) or e.__class__.__name__))
+                finally:
+                    timings["prepare_s"] += time.perf_counter() - t0
+                    metrics.observe_ingestion_stage("prepare", time.perf_counter() - t0)
+        finally:
+            prepared_q.put(_STOP)
+
+    def embed_stage() -> None:
+        try:
+            while True:
+                message = prepared_q.get()
+                if message is _STOP:
+                    return
+                idx, prepared, error = message
+                if error or prepared is None or prepared["duplicate"]:
+                    write_q.put(("final", idx, prepared, error, None))
+                    continue
+                stats: Dict[str, Any] = {"write_s": 0.0}
+                write_q.put(("start", idx, prepared["doc_internal_id"], None, None))
+                try:
+                    for batch in ingestion_embedder.iter_embedded_batches(
+                        embedding_function, prepared["texts"], prepared["metadatas"], prepared["ids"],
+                        settings.EMBEDDING_BATCH_SIZE, stats,
+                        chunk_hashes=prepared["chunk_hashes"], known_embeddings=prepared["known_embeddings"]
+                    ):
+                        write_q.put(("batch", idx, batch, None, None))
+                    write_q.put(("final", idx, prepared, None, stats))
+                except Exception as e:
+                    logger.exception(f"Bulk ingestion: failed to embed '{items[idx]['filename']}': {e}")
+                    write_q.put(("final", idx, prepared, str(e) or e.__class__.__name__, stats))
+                finally:
+                    timings["embed_s"] += stats.get("embed_s", 0.0)
+        finally:
+            write_q.put(_STOP)
+
+    start = time.perf_counter()
+    threads = [
+        threading.Thread(target=prepare_stage, name="bulk-prepare", daemon=True),
+        threading.Thread(target=embed_stage, name="bulk-embed", daemon=True),
+    ]
+    for thread in threads:
+        thread.start()
+
+    # Write stage runs on the calling thread.
+    failed_writes: Dict[int, str] = {}
+    written_ids: Dict[int, List[str]] = {} # Chunks stored so far per file, removed again if the file fails
+    while True:
+        message = write_q.get()
+        if message is _STOP:
+            break
+        kind, idx, payload, error, stats = message
+        result = results[idx]
+        if kind == "start":
+            if on_prepared:
+                try:
+                    on_prepared(idx, payload)
+                except Exception as e:
+                    logger.error(f"Bulk ingestion: on_prepared callback failed for '{items[idx]['filename']}': {e}")
+            continue
+        if kind == "batch":
+            if idx in failed_writes:
+                continue
+            t0 = time.perf_counter()
+            try:
+                ingestion_embedder.write_embedded_batch(vector_store, **payload)
+                written_ids.setdefault(idx, []).extend(payload["ids"])
+            except Exception as e:
+                logger.exception(f"Bulk ingestion: failed to write batch for '{items[idx]['filename']}': {e}")
+                failed_writes[idx] = str(e) or e.__class__.__name__
+            timings["write_s"] += time.perf_counter() - t0
+            continue
+
+        # kind == "final"
+        prepared = payload
+        if error or idx in failed_writes:
+            result["error"] = error or failed_writes[idx]
+            metrics.INGESTION_DOCUMENTS.labels("failed").inc()
+            partial_ids = written_ids.pop(idx, None)
+            if partial_ids:
+                try:
+                    chunk_store.collection_for(vector_store, items[idx]["doc_access_target"]).delete(ids=partial_ids)
+                    logger.info(f"Bulk ingestion: removed {len(partial_ids)} partially written chunks of '{items[idx]['filename']}'.")
+                except Exception as e:
+                    logger.error(f"Bulk ingestion: failed to remove partially written chunks of '{items[idx]['filename']}': {e}")
+        elif prepared is None:
+            result["error"] = "File processing returned no content (unsupported type or no extractable text)."
+            metrics.INGESTION_DOCUMENTS.labels("empty").inc()
+        else:
+            result["doc_internal_id"] = prepared["doc_internal_id"]
+            result["duplicate"] = prepared["duplicate"]
+            result["content_hash"] = prepared["file_hash"]
+            if stats:
+                result["chunks"] = stats["chunks"]
+                result["chunks_embedded"] = stats["chunks_embedded"]
+                result["chunks_reused"] = stats["chunks_reused"]
+            if prepared["duplicate"]:
+                metrics.INGESTION_DOCUMENTS.labels("duplicate").inc()
+            else:
+                with metrics.ingestion_stage("lexical_index"):
+                    file_processor.index_chunks_lexically(prepared)
+                answer_cache.invalidate_access_target(items[idx]["doc_access_target"])
+                if stats:
+                    metrics.record_ingested_document(stats["chunks"], stats["chunks_embedded"], stats["chunks_reused"])
+
+    for thread in threads:
+        thread.join()
+
+    for idx, source_idx in copy_of.items():
+        source = results[source_idx]
+        results[idx]["error"] = source["error"]
+        if source["doc_internal_id"]:
+            results[idx].update(doc_internal_id=source["doc_internal_id"], content_hash=source["content_hash"], duplicate=True)
+            metrics.INGESTION_DOCUMENTS.labels("duplicate").inc()
+
+    wall_s = time.perf_counter() - start
+    busy_s = timings["prepare_s"] + timings["embed_s"] + timings["write_s"]
+    batch_timings = {
+        "files": float(len(items)),
+        "batch_duplicates": float(len(copy_of)),
+        "prepare_s": round(timings["prepare_s"], 4),
+        "embed_s": round(timings["embed_s"], 4),
+        "write_s": round(timings["write_s"], 4),
+        "wall_s": round(wall_s, 4),
+        # > 1.0 means stages overlapped; 1.0 would be a fully serial run
+        "overlap_factor": round(busy_s / wall_s, 3) if wall_s > 0 else 0.0,
+    }
+    logger.info(f"Bulk ingestion finished: {batch_timings}")
+    return results, batch_timings
@@ -0,0 +1,85 @@
+# app/services/chunk_store.py
+import hashlib
+import logging
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Chroma metadata keys used for content addressing
+FILE_HASH_KEY = "file_hash"
+CHUNK_HASH_KEY = "chunk_hash"
+CHUNK_COUNT_KEY = "doc_chunk_count" # Chunks the whole document has, so a partly written one can be told apart
+
+_LOOKUP_PAGE_SIZE = 500 # Keeps each `$in` filter to a reasonable size
+
+
+def hash_file_content(file_content: bytes) -> str:
+    return hashlib.sha256(file_content).hexdigest()
+
+
+def hash_chunk_text(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def find_document_by_file_hash(vector_store: Any, file_hash: str, doc_access_target: str) -> Optional[str]:
+    """
+    Returns the doc_internal_id of an already indexed, byte-identical file with the same access target.
+    A file re-uploaded under a different access target is a new document (its chunks are reused instead).
+    Only complete documents count: one with fewer stored chunks than its doc_chunk_count (an interrupted
+    ingest) is not a duplicate. Chunks written before the count was recorded are trusted.
+    """
+    result = vector_store.get(
+        where={"$and": [{FILE_HASH_KEY: file_hash}, {"doc_access_target": doc_access_target}]},
+        include=["metadatas"]
+    )
+    stored: Dict[str, int] = {}
+    expected: Dict[str, Optional[int]] = {}
+    for metadata in result.get("metadatas") or []:
+        doc_id = (metadata or {}).get("doc_internal_id")
+        if doc_id:
+            stored[doc_id] = stored.get(doc_id, 0) + 1
+            expected.setdefault(doc_id, metadata.get(CHUNK_COUNT_KEY))
+    for doc_id, count in stored.items():
+        if expected[doc_id] is None or count >= expected[doc_id]:
+            return doc_id
+        logger.warning(f"Chunk store: document {doc_id} has {count} of {expected[doc_id]} chunks stored; not treating it as a duplicate.")
+    return None
+
+
+def lookup_embeddings(vector_store: Any, chunk_hashes: List[str]) -> Dict[str, List[float]]:
+    """
+    Maps chunk text hashes to embeddings already stored in the collection.
+    The collection itself is the content-hash store: every chunk carries its chunk_hash in metadata,
+    so any earlier upload (of any document or access target) can supply vectors for unchanged text.
+    """
+    found: Dict[str, List[float]] = {}
+    unique_hashes = list(dict.fromkeys(chunk_hashes))
+    for start in range(0, len(unique_hashes), _LOOKUP_PAGE_SIZE):
+        page = unique_hashes[start:start + _LOOKUP_PAGE_SIZE]
+        result = vector_store.get(
+            where={CHUNK_HASH_KEY: {"$in": page}},
+            include=["embeddings", "metadatas"]
+        )
+        embeddings = result.get("embeddings")
+        metadatas = result.get("metadatas") or []
+        if embeddings is None:
+            continue
+        for metadata, embedding in zip(metadatas, embeddings):
+            chunk_hash = (metadata or {}).get(CHUNK_HASH_KEY)
+            if chunk_hash and chunk_hash not in found:
+                found[chunk_hash] = embedding.tolist() if hasattr(embedding, "tolist") else list(embedding)
+    logger.info(f"Chunk store: {len(found)}/{len(unique_hashes)} unique chunk hashes already embedded.")
+    return found
+
+
+def collection_for(vector_store: Any, doc_access_target: str) -> Any:
+    """The raw Chroma collection holding a document's chunks (its access target's partition in the partitioned layout)."""
+    if hasattr(vector_store, "partition"): # PartitionedVectorStore
+        return vector_store.partition(doc_access_target)._collection
+    return vector_store._collection
+
+
+def get_document_chunks(collection: Any, doc_internal_id: str) -> Dict[str, Dict[str, Any]]:
+    """Maps each stored chunk ID of a document to its metadata."""
+    result = collection.get(where={"doc_internal_id": doc_internal_id}, include=["metadatas"])
+    return {chunk_id: metadata or {} for chunk_id, metadata in zip(result["ids"], result.get("metadatas") or [])}
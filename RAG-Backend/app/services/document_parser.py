@@ -0,0 +1,97 @@
+# app/services/document_parser.py
+import io
+import logging
+import math
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, List, Optional, Tuple
+
+from langchain_core.documents import Document
+
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+PDF_TYPES = {"application/pdf"}
+TEXT_TYPES = {"text/plain", "text/markdown", "text/csv"}
+DOCX_TYPES = {"application/vnd.openxmlformats-officedocument.wordprocessingml.document"}
+
+_pdf_pool: Optional[ProcessPoolExecutor] = None
+_pdf_pool_lock = threading.Lock()
+
+
+def is_supported(file_type: str) -> bool:
+    return file_type in PDF_TYPES or file_type in TEXT_TYPES or file_type in DOCX_TYPES
+
+
+def _effective_workers() -> int:
+    return max(1, min(settings.PDF_PARSE_WORKERS, os.cpu_count() or 1))
+
+
+def _get_pdf_pool() -> ProcessPoolExecutor:
+    global _pdf_pool
+    with _pdf_pool_lock:
+        if _pdf_pool is None:
+            # 'spawn' avoids forking a process that holds the embedding model and its threads.
+            _pdf_pool = ProcessPoolExecutor(
+                max_workers=_effective_workers(),
+                mp_context=multiprocessing.get_context("spawn")
+            )
+            logger.info(f"Started PDF parsing process pool with {_effective_workers()} workers.")
+        return _pdf_pool
+
+
+def shutdown_pool() -> None:
+    global _pdf_pool
+    with _pdf_pool_lock:
+        if _pdf_pool is not None:
+            _pdf_pool.shutdown(wait=False, cancel_futures=True)
+            _pdf_pool = None
+
+
+def _extract_pdf_page_range(file_content: bytes, start: int, end: int) -> List[Tuple[int, str]]:
+    """Runs in a worker process: extracts text for pages [start, end)."""
+    from pypdf import PdfReader
+    reader = PdfReader(io.BytesIO(file_content))
+    return [(page_no, reader.pages[page_no].extract_text() or "") for page_no in range(start, end)]
+
+
+def _iter_pdf_pages(file_content: bytes) -> Iterator[Tuple[int, str]]:
+    from pypdf import PdfReader
+    reader = PdfReader(io.BytesIO(file_content))
+    num_pages = len(reader.pages)
+    workers = _effective_workers()
+
+    if workers <= 1 or num_pages < settings.PDF_PARALLEL_MIN_PAGES:
+        for page_no in range(num_pages):
+            yield page_no, reader.pages[page_no].extract_text() or ""
+        return
+
+    # Two tasks per worker balances uneven pages without re-sending the file too many times.
+    pages_per_task = max(1, math.ceil(num_pages / (workers * 2)))
+    ranges = [(start, min(start + pages_per_task, num_pages)) for start in range(0, num_pages, pages_per_task)]
+    logger.info(f"Parsing {num_pages} PDF pages across {workers} processes in {len(ranges)} tasks.")
+    pool = _get_pdf_pool()
+    futures = [pool.submit(_extract_pdf_page_range, file_content, start, end) for start, end in ranges]
+    for future in futures: # In page order; later ranges keep parsing while earlier pages are consumed
+        yield from future.result()
+
+
+def iter_pages(file_content: bytes, file_type: str, original_filename: str) -> Iterator[Document]:
+    """
+    Parses an in-memory upload into page-level Documents, yielding each page as soon as it is available.
+    Large PDFs are parsed in a process pool. Raises ValueError for unsupported types.
+    """
+    if file_type in PDF_TYPES:
+        for page_no, text in _iter_pdf_pages(file_content):
+            yield Document(page_content=text, metadata={"source_filename": original_filename, "page": page_no})
+    elif file_type in TEXT_TYPES:
+        yield Document(page_content=file_content.decode("utf-8"), metadata={"source_filename": original_filename})
+    elif file_type in DOCX_TYPES:
+        import docx2txt
+        text = docx2txt.process(io.BytesIO(file_content))
+        yield Document(page_content=text, metadata={"source_filename": original_filename})
+    else:
+        raise ValueError(f"Unsupported file type: {file_type}")
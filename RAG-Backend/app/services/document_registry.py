@@ -0,0 +1,77 @@
+# app/services/document_registry.py
+import logging
+from datetime import datetime, timezone
+from typing import List, Optional
+
+from sqlalchemy.orm import Session
+
+from ..db import models
+
+logger = logging.getLogger(__name__)
+
+
+def get_document(db: Session, doc_internal_id: str) -> Optional[models.Document]:
+    return db.query(models.Document).filter(models.Document.doc_internal_id == doc_internal_id).first()
+
+
+def list_documents(db: Session, doc_access_target: Optional[str] = None, skip: int = 0, limit: int = 100) -> List[models.Document]:
+    query = db.query(models.Document)
+    if doc_access_target:
+        query = query.filter(models.Document.doc_access_target == doc_access_target)
+    return query.order_by(models.Document.created_at.desc()).offset(skip).limit(limit).all()
+
+
+def register_document(
+    db: Session,
+    doc_internal_id: str,
+    filename: str,
+    content_type: Optional[str],
+    doc_access_target: str,
+    chunk_count: int,
+    content_hash: str,
+    created_by: Optional[str] = None
+) -> models.Document:
+    """
+    Records a newly ingested document; called only by the ingest that wrote its chunks.
+    A document that is already registered is left as it is.
+    """
+    document = get_document(db, doc_internal_id)
+    if document is not None:
+        return document
+    document = models.Document(
+        doc_internal_id=doc_internal_id,
+        filename=filename,
+        content_type=content_type,
+        doc_access_target=doc_access_target,
+        chunk_count=chunk_count,
+        content_hash=content_hash,
+        created_by=created_by
+    )
+    db.add(document)
+    db.commit()
+    db.refresh(document)
+    logger.info(f"Registered document {doc_internal_id} ('{filename}', {chunk_count} chunks, Access: {doc_access_target}).")
+    return document
+
+
+def mark_replaced(
+    db: Session,
+    document: models.Document,
+    filename: str,
+    content_type: Optional[str],
+    chunk_count: int,
+    content_hash: str
+) -> models.Document:
+    document.filename = filename
+    document.content_type = content_type
+    document.chunk_count = chunk_count
+    document.content_hash = content_hash
+    document.updated_at = datetime.now(timezone.utc)
+    db.commit()
+    db.refresh(document)
+    return document
+
+
+def remove_document(db: Session, document: models.Document) -> None:
+    db.delete(document)
+    db.commit()
@@ -0,0 +1,158 @@
+# app/services/embedding_backends.py
+import logging
+from typing import Any, List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+BACKEND_TORCH = "torch" # fp32 SentenceTransformer (previous behaviour)
+BACKEND_TORCH_INT8 = "torch-int8" # fp32 model with nn.Linear layers dynamically quantized to int8
+BACKEND_ONNX = "onnx" # ONNX Runtime session over the model's exported graph
+BACKENDS = (BACKEND_TORCH, BACKEND_TORCH_INT8, BACKEND_ONNX)
+
+
+def _load_torch_embeddings(model_name: str) -> Embeddings:
+    from langchain_huggingface import HuggingFaceEmbeddings
+    return HuggingFaceEmbeddings(
+        model_name=model_name,
+        model_kwargs={'device': 'cpu', 'trust_remote_code': True},
+        encode_kwargs={'normalize_embeddings': True}
+    )
+
+
+def _quantize_int8(embeddings: Embeddings) -> Embeddings:
+    """Dynamically quantizes the Linear layers of the SentenceTransformer behind HuggingFaceEmbeddings in place."""
+    import torch
+    model = getattr(embeddings, "_client", None)
+    if model is None:
+        logger.warning("torch-int8 backend: no SentenceTransformer found on the embeddings object; using fp32.")
+        return embeddings
+    linear_before = sum(1 for m in model.modules() if type(m) is torch.nn.Linear)
+    torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+    linear_after = sum(1 for m in model.modules() if type(m) is torch.nn.Linear)
+    logger.info(f"torch-int8 backend: quantized {linear_before - linear_after} of {linear_before} Linear layers.")
+    return embeddings
+
+
+class OnnxEmbeddings(Embeddings):
+    """
+    Runs an exported ONNX graph of the embedding model with ONNX Runtime (CPU).
+    Token embeddings are mean-pooled over the attention mask and L2-normalized, matching
+    SentenceTransformer with normalize_embeddings=True, so vectors fit the existing collection.
+    For jina-embeddings-v3 the graph takes a task_id selecting the LoRA adapter; task picks it by name.
+    """
+
+    def __init__(self, model_name: str, file_name: str = "onnx/model.onnx", task: Optional[str] = None,
+                 batch_size: int = 32, intra_op_threads: int = 0):
+        import onnxruntime
+        from huggingface_hub import hf_hub_download
+        from transformers import AutoConfig, AutoTokenizer
+
+        self.model_name = model_name
+        self.batch_size = max(1, batch_size)
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name, trust_remote_code=True)
+
+        model_path = hf_hub_download(repo_id=model_name, filename=file_name)
+        try: # Large graphs keep weights in a side file next to the .onnx
+            hf_hub_download(repo_id=model_name, filename=f"{file_name}_data")
+        except Exception:
+            pass
+        options = onnxruntime.SessionOptions()
+        if intra_op_threads > 0:
+            options.intra_op_num_threads = intra_op_threads
+        self.session = onnxruntime.InferenceSession(model_path, sess_options=options, providers=["CPUExecutionProvider"])
+        self._input_names = {i.name for i in self.session.get_inputs()}
+
+        self._task_id: Optional[np.ndarray] = None
+        if "task_id" in self._input_names:
+            adaptations: List[str] = getattr(AutoConfig.from_pretrained(model_name, trust_remote_code=True), "lora_adaptations", None) or []
+            if task not in adaptations:
+                raise ValueError(f"ONNX model {model_name} needs a task; EMBEDDING_ONNX_TASK must be one of {adaptations}")
+            self._task_id = np.array(adaptations.index(task), dtype=np.int64)
+
+    def _embed_batch(self, texts: List[str]) -> np.ndarray:
+        encoded = self.tokenizer(texts, padding=True, truncation=True, return_tensors="np")
+        inputs = {name: encoded[name].astype(np.int64) for name in ("input_ids", "attention_mask", "token_type_ids")
+                  if name in self._input_names and name in encoded}
+        if self._task_id is not None:
+            inputs["task_id"] = self._task_id
+        token_embeddings = self.session.run(None, inputs)[0]
+        mask = encoded["attention_mask"][..., None].astype(np.float32)
+        pooled = (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        return pooled / np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        vectors: List[List[float]] = []
+        for start in range(0, len(texts), self.batch_size):
+            vectors.extend(self._embed_batch(texts[start:start + self.batch_size]).tolist())
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed_batch([text])[0].tolist()
+
+
+class MatryoshkaEmbeddings(Embeddings):
+    """
+    Keeps the first `dimension` components of each vector and re-normalizes them to unit length.
+    Valid for Matryoshka-trained models such as jina-embeddings-v3, whose leading dimensions carry
+    most of the signal. Used for both documents and queries so the collection stays consistent.
+    """
+
+    def __init__(self, base: Embeddings, dimension: int):
+        self.base = base
+        self.dimension = dimension
+
+    def _truncate(self, vectors: List[List[float]]) -> List[List[float]]:
+        if not vectors:
+            return []
+        truncated = np.asarray(vectors, dtype=np.float32)[:, :self.dimension]
+        truncated /= np.clip(np.linalg.norm(truncated, axis=1, keepdims=True), 1e-12, None)
+        return truncated.tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._truncate(self.base.embed_documents(texts))
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._truncate([self.base.embed_query(text)])[0]
+
+
+def create_embeddings(backend: Optional[str] = None, model_name: Optional[str] = None,
+                      dimension: Optional[int] = None) -> Any:
+    """
+    Builds the base (uncached, unbatched) embedding model for the configured EMBEDDING_BACKEND,
+    truncated to EMBEDDING_DIMENSION when that is set.
+    """
+    backend = (backend or settings.EMBEDDING_BACKEND).lower()
+    model_name = model_name or settings.EMBEDDING_MODEL_NAME
+    dimension = settings.EMBEDDING_DIMENSION if dimension is None else dimension
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown EMBEDDING_BACKEND '{backend}'; expected one of {BACKENDS}")
+
+    if backend == BACKEND_ONNX:
+        embeddings = OnnxEmbeddings(
+            model_name,
+            file_name=settings.EMBEDDING_ONNX_FILE,
+            task=settings.EMBEDDING_ONNX_TASK,
+            batch_size=settings.EMBEDDING_BATCH_SIZE,
+            intra_op_threads=settings.EMBEDDING_ONNX_THREADS
+        )
+    else:
+        embeddings = _load_torch_embeddings(model_name)
+        if backend == BACKEND_TORCH_INT8:
+            embeddings = _quantize_int8(embeddings)
+    if dimension and dimension > 0:
+        embeddings = MatryoshkaEmbeddings(embeddings, dimension)
+    return embeddings
+
+
+def stored_dimension(collection: Any) -> Optional[int]:
+    """Dimension of the vectors already in a Chroma collection, or None if it is empty."""
+    sample = collection.peek(limit=1)
+    embeddings = sample.get("embeddings") if sample else None
+    if embeddings is None or len(embeddings) == 0:
+        return None
+    return len(embeddings[0])
@@ -0,0 +1,97 @@
+# app/services/embedding_batcher.py
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from langchain_core.embeddings import Embeddings
+
+logger = logging.getLogger(__name__)
+
+
+class MicroBatchingEmbeddings(Embeddings):
+    """
+    Coalesces concurrent embed_query calls into one batched forward pass.
+    A dispatcher thread takes the first waiting query, gathers any others that arrive within
+    window_ms (up to max_batch_size), embeds them together and resolves each caller's future.
+    When the previous batch held a single query and nothing else is waiting, the window is skipped,
+    so an idle server does not pay window_ms on every query.
+    embed_documents is passed straight through; ingestion already batches.
+
+    batch_fn embeds a list of query texts; it defaults to base.embed_documents, which matches
+    embed_query for the backends built by embedding_backends (no query-specific kwargs).
+    """
+
+    def __init__(self, base: Embeddings, window_ms: float = 5.0, max_batch_size: int = 32,
+                 batch_fn: Optional[Callable[[List[str]], List[List[float]]]] = None):
+        self.base = base
+        self.window_s = max(0.0, window_ms) / 1000.0
+        self.max_batch_size = max(1, max_batch_size)
+        self._batch_fn = batch_fn or base.embed_documents
+        self._queue: "queue.Queue[Tuple[str, Future]]" = queue.Queue()
+        self._dispatcher: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.requests = 0
+        self.batches = 0
+        self.max_observed_batch = 0
+        self._last_batch_size = 0
+
+    def _ensure_dispatcher(self) -> None:
+        if self._dispatcher is not None:
+            return
+        with self._start_lock:
+            if self._dispatcher is None:
+                self._dispatcher = threading.Thread(target=self._dispatch_loop, name="embedding-batcher", daemon=True)
+                self._dispatcher.start()
+
+    def _dispatch_loop(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            idle = self._last_batch_size <= 1 and self._queue.empty()
+            deadline = time.monotonic() + (0.0 if idle else self.window_s)
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            self._last_batch_size = len(batch)
+            texts = [text for text, _ in batch]
+            try:
+                vectors = self._batch_fn(texts)
+            except Exception as e:
+                logger.error(f"Embedding batcher: batch of {len(batch)} failed: {e}")
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            for (_, future), vector in zip(batch, vectors):
+                future.set_result(vector)
+
+            with self._stats_lock:
+                self.batches += 1
+                self.requests += len(batch)
+                self.max_observed_batch = max(self.max_observed_batch, len(batch))
+
+    def embed_query(self, text: str) -> List[float]:
+        self._ensure_dispatcher()
+        future: Future = Future()
+        self._queue.put((text, future))
+        return future.result()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.base.embed_documents(texts)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            return {
+                "window_ms": self.window_s * 1000.0,
+                "max_batch_size": self.max_batch_size,
+                "requests": self.requests,
+                "batches": self.batches,
+                "avg_batch_size": round(self.requests / self.batches, 3) if self.batches else 0.0,
+                "max_observed_batch": self.max_observed_batch,
+            }
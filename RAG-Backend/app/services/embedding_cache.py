@@ -0,0 +1,88 @@
+# app/services/embedding_cache.py
+import logging
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, List
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_query_text(text: str) -> str:
+    """Cache key for a query: NFKC-normalized, case-folded, with whitespace collapsed."""
+    text = unicodedata.normalize("NFKC", text)
+    return _WHITESPACE_RE.sub(" ", text).strip().casefold()
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Wraps an Embeddings implementation with an LRU cache for embed_query.
+    - Keys are normalize_query_text(query), so trivially different strings share a vector.
+    - Vectors are stored as float32 numpy arrays; at most max_entries are kept.
+    - embed_documents is passed through uncached (ingestion text is rarely repeated verbatim).
+    Any code holding an Embeddings (Chroma retriever, answer cache, search helpers) can use it directly.
+    """
+
+    def __init__(self, base: Embeddings, max_entries: int = 2048):
+        self.base = base
+        self.max_entries = max(1, max_entries)
+        self._cache: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._miss_inference_seconds = 0.0
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.base.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        key = normalize_query_text(text)
+        with self._lock:
+            vector = self._cache.get(key)
+            if vector is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return vector.tolist()
+
+        start = time.perf_counter()
+        vector = np.asarray(self.base.embed_query(text), dtype=np.float32)
+        elapsed = time.perf_counter() - start
+
+        with self._lock:
+            self.misses += 1
+            self._miss_inference_seconds += elapsed
+            self._cache[key] = vector
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+                self.evictions += 1
+        return vector.tolist()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cache.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            avg_inference_s = self._miss_inference_seconds / self.misses if self.misses else 0.0
+            cached_bytes = sum(v.nbytes for v in self._cache.values())
+            return {
+                "entries": len(self._cache),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "avg_inference_ms": round(avg_inference_s * 1000, 3),
+                "estimated_saved_inference_s": round(avg_inference_s * self.hits, 3),
+                "cached_vector_bytes": cached_bytes,
+            }
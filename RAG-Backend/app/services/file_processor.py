@@ -1,144 +1,430 @@
 # app/services/file_processor.py
 import io
 import logging
+import time
 import uuid
 import os
-from typing import List, Dict, Any
+from typing import Any, Callable, Dict, List, Optional
 
 from langchain_chroma import Chroma
-from langchain_community.document_loaders import PyPDFLoader, TextLoader, Docx2txtLoader
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_huggingface import HuggingFaceEmbeddings
 
 from ..core.config import settings
+from . import answer_cache
+from . import embedding_backends
+from .embedding_cache import CachedEmbeddings
+from .embedding_batcher import MicroBatchingEmbeddings
+from .instrumentation import InstrumentedEmbeddings
+from .partitioned_store import PartitionedVectorStore
+from . import ingestion_embedder
+from . import chunk_store
+from . import document_parser
+from . import lexical_index as lexical_index_module
+from . import model_lifecycle
+from . import metrics
+from . import profiling
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# --- Embedding Function and Vector Store Initialization (Keep as is) ---
+# --- Embedding Function and Vector Store ---
+# Loaded by model_lifecycle in the background at startup rather than at import time.
 embedding_function = None
-try:
-    embedding_function = HuggingFaceEmbeddings(
-        model_name=settings.EMBEDDING_MODEL_NAME,
-        model_kwargs={'device': 'cpu', 'trust_remote_code': True},
-        encode_kwargs={'normalize_embeddings': True}
-    )
-    logger.info(f"Initialized HuggingFaceEmbeddings with model: {settings.EMBEDDING_MODEL_NAME}")
-except Exception as e:
-    logger.exception(f"Failed to initialize embedding model {settings.EMBEDDING_MODEL_NAME}: {e}")
-
 vector_store = None
-if embedding_function:
-    try:
-        os.makedirs(settings.CHROMA_DB_PATH, exist_ok=True)
-        vector_store = Chroma(
+
+def init_embedding_function() -> Any:
+    """Loads the embedding model with its micro-batching and cache wrappers. Raises on failure."""
+    global embedding_function
+    function = embedding_backends.create_embeddings()
+    logger.info(f"Initialized embeddings with model: {settings.EMBEDDING_MODEL_NAME} (backend: {settings.EMBEDDING_BACKEND})")
+    if settings.EMBEDDING_QUERY_BATCH_WINDOW_MS > 0:
+        # Below the cache, so only cache misses wait for a batch.
+        function = MicroBatchingEmbeddings(
+            function,
+            window_ms=settings.EMBEDDING_QUERY_BATCH_WINDOW_MS,
+            max_batch_size=settings.EMBEDDING_QUERY_MAX_BATCH
+        )
+        logger.info(f"Query embedding micro-batching enabled (window={settings.EMBEDDING_QUERY_BATCH_WINDOW_MS}ms, max_batch={settings.EMBEDDING_QUERY_MAX_BATCH}).")
+    if settings.EMBEDDING_CACHE_MAX_ENTRIES > 0:
+        function = CachedEmbeddings(function, max_entries=settings.EMBEDDING_CACHE_MAX_ENTRIES)
+        logger.info(f"Query embedding LRU cache enabled (max_entries={settings.EMBEDDING_CACHE_MAX_ENTRIES}).")
+    embedding_function = InstrumentedEmbeddings(function) # Outermost, so cache hits are timed too
+    return embedding_function
+
+def init_vector_store() -> Any:
+    """Opens the Chroma collection (or its partitions) and checks it against the configuration. Raises on failure."""
+    global vector_store
+    if embedding_function is None:
+        raise RuntimeError("Embedding function not available, ChromaDB vector store not initialized.")
+    os.makedirs(settings.CHROMA_DB_PATH, exist_ok=True)
+    if settings.VECTOR_STORE_LAYOUT == "partitioned":
+        store = PartitionedVectorStore(
+            base_name=settings.VECTOR_DB_COLLECTION_NAME,
+            embedding_function=embedding_function,
+            persist_directory=settings.CHROMA_DB_PATH
+        )
+        collection = store # Exposes count()/peek() across partitions
+    else:
+        store = Chroma(
             collection_name=settings.VECTOR_DB_COLLECTION_NAME,
             embedding_function=embedding_function,
             persist_directory=settings.CHROMA_DB_PATH
         )
-        logger.info(f"Initialized ChromaDB client. Data path: {settings.CHROMA_DB_PATH}, Collection: {settings.VECTOR_DB_COLLECTION_NAME}")
-    except Exception as e:
-        logger.exception(f"Failed to initialize ChromaDB vector store: {e}")
-        vector_store = None
-else:
-    logger.warning("Embedding function not available, ChromaDB vector store not initialized.")
+        collection = store._collection
+    logger.info(f"Initialized ChromaDB client. Data path: {settings.CHROMA_DB_PATH}, Collection: {settings.VECTOR_DB_COLLECTION_NAME} (layout: {settings.VECTOR_STORE_LAYOUT})")
+    existing_dim = embedding_backends.stored_dimension(collection)
+    if settings.EMBEDDING_DIMENSION > 0 and existing_dim is not None and existing_dim != settings.EMBEDDING_DIMENSION:
+        logger.error(
+            f"Collection '{settings.VECTOR_DB_COLLECTION_NAME}' holds {existing_dim}-d vectors but EMBEDDING_DIMENSION is "
+            f"{settings.EMBEDDING_DIMENSION}. Run 'python -m app.scripts.rebuild_collection' before serving queries."
+        )
+    index = lexical_index_module.lexical_index
+    if settings.RETRIEVAL_MODE == "hybrid" and index is not None and index.count() == 0 and collection.count() > 0:
+        logger.warning("Hybrid retrieval is enabled but the lexical index is empty. Run 'python -m app.scripts.rebuild_lexical_index'.")
+    vector_store = store
+    return vector_store
 
-# --- Document Loading and Splitting (Keep load_document and split_documents as is) ---
+# --- Document Loading and Splitting (parsed from memory, no temp files) ---
 def load_document(file_content: bytes, file_type: str, original_filename: str) -> List[Any]:
-    # ... (your existing load_document code)
-    docs = []
-    temp_file_path = f"./temp_{uuid.uuid4()}" # Base temp name
+    if not document_parser.is_supported(file_type):
+        logger.warning(f"Unsupported file type: {file_type} for file: {original_filename}")
+        return []
     try:
-        if file_type == "application/pdf":
-            temp_file_path += ".pdf"
-            with open(temp_file_path, "wb") as f_out: f_out.write(file_content)
-            loader = PyPDFLoader(temp_file_path)
-            docs = loader.load()
-        elif file_type in ["text/plain", "text/markdown", "text/csv"]:
-            temp_file_path += ".txt"
-            with open(temp_file_path, "wb") as f_out: f_out.write(file_content)
-            loader = TextLoader(temp_file_path, encoding='utf-8')
-            docs = loader.load()
-        elif file_type == "application/vnd.openxmlformats-officedocument.wordprocessingml.document":
-            temp_file_path += ".docx"
-            with open(temp_file_path, "wb") as f_out: f_out.write(file_content)
-            loader = Docx2txtLoader(temp_file_path)
-            docs = loader.load()
-        else:
-            logger.warning(f"Unsupported file type: {file_type} for file: {original_filename}")
-            return []
-
-        for doc in docs:
-            doc.metadata = doc.metadata or {}
-            doc.metadata["source_filename"] = original_filename
+        docs = list(document_parser.iter_pages(file_content, file_type, original_filename))
         logger.info(f"Loaded {len(docs)} pages/documents from {original_filename}")
         return docs
     except Exception as e:
         logger.error(f"Error loading file {original_filename} (type: {file_type}): {e}", exc_info=True)
         return []
-    finally:
-        if os.path.exists(temp_file_path):
-            try:
-                os.remove(temp_file_path)
-            except OSError as e:
-                 logger.error(f"Error removing temporary file {temp_file_path}: {e}")
 
-def split_documents(docs: List[Any]) -> List[Any]:
-    # ... (your existing split_documents code)
-    text_splitter = RecursiveCharacterTextSplitter(
+def _make_text_splitter() -> RecursiveCharacterTextSplitter:
+    return RecursiveCharacterTextSplitter(
         chunk_size=800,
         chunk_overlap=150,
         length_function=len,
         add_start_index=True,
     )
+
+def split_documents(docs: List[Any]) -> List[Any]:
+    text_splitter = _make_text_splitter()
     split_docs = text_splitter.split_documents(docs)
     logger.info(f"Split {len(docs)} documents into {len(split_docs)} chunks.")
     return split_docs
 
-# --- MODIFIED: process_and_embed_document to include doc_access_target ---
-def process_and_embed_document(
-    file_content: bytes,
-    file_type: str,
-    original_filename: str,
-    doc_access_target: str # <-- New parameter
-) -> str | None:
+def load_and_split_document(file_content: bytes, file_type: str, original_filename: str) -> List[Any]:
+    """
+    Splits pages as the parser yields them, so chunking overlaps with parsing of later pages.
+    Produces the same chunks as split_documents(load_document(...)); returns [] on load errors.
+    """
+    if not document_parser.is_supported(file_type):
+        logger.warning(f"Unsupported file type: {file_type} for file: {original_filename}")
+        return []
+    text_splitter = _make_text_splitter()
+    split_docs: List[Any] = []
+    page_count = 0
+    try:
+        for page in document_parser.iter_pages(file_content, file_type, original_filename):
+            page_count += 1
+            split_docs.extend(text_splitter.split_documents([page]))
+    except Exception as e:
+        logger.error(f"Error loading file {original_filename} (type: {file_type}): {e}", exc_info=True)
+        return []
+    logger.info(f"Loaded {page_count} pages/documents from {original_filename} and split them into {len(split_docs)} chunks.")
+    return split_docs
+
+# --- Document Ingestion (content-addressed: identical files and chunks are not re-embedded) ---
+def index_chunks_lexically(prepared: Dict[str, Any]) -> None:
+    """Adds a prepared document's chunks to the BM25 index. Failures are logged, not raised: the chunks are already in Chroma."""
+    index = lexical_index_module.lexical_index
+    if index is None:
+        return
+    try:
+        index.add_chunks(prepared["ids"], prepared["texts"], prepared["metadatas"])
+    except Exception as e:
+        logger.error(f"Failed to add document {prepared['doc_internal_id']} to the lexical index: {e}")
+
+def _check_ingestion_ready() -> None:
+    if vector_store is None or embedding_function is None:
+        model_lifecycle.ensure_loaded(timeout=settings.MODEL_LOAD_WAIT_S) # Loads in-process for scripts; waits during startup
     if vector_store is None or embedding_function is None:
         logger.error("Vector store or embedding function not initialized. Cannot process document.")
         raise RuntimeError("System not properly configured for embedding. Check logs.")
 
-    doc_internal_id = f"doc_{uuid.uuid4()}"
+def prepare_document(
+    file_content: bytes,
+    file_type: str,
+    original_filename: str,
+    doc_access_target: str,
+    doc_internal_id: Optional[str] = None # Set when replacing an existing document; skips the duplicate-file check
+) -> Dict[str, Any] | None:
+    """
+    CPU stage of ingestion: duplicate-file check, parsing, splitting, chunk metadata and
+    lookup of already-known chunk embeddings. Nothing is embedded or written here.
+    Returns None if the file produced no content; a dict with duplicate=True for a byte-identical
+    file already indexed under the same access target; otherwise the prepared chunks
+    (texts, metadatas, ids, chunk_hashes, known_embeddings).
+    """
+    _check_ingestion_ready()
+
+    file_hash = chunk_store.hash_file_content(file_content)
+    if doc_internal_id is None:
+        try:
+            existing_doc_id = chunk_store.find_document_by_file_hash(vector_store, file_hash, doc_access_target)
+        except Exception as e_lookup:
+            logger.error(f"File hash lookup failed for {original_filename}, processing normally: {e_lookup}")
+            existing_doc_id = None
+        if existing_doc_id:
+            logger.info(f"Byte-identical file already indexed as {existing_doc_id} (Access Target: {doc_access_target}); skipping {original_filename}.")
+            return {"doc_internal_id": existing_doc_id, "duplicate": True, "file_hash": file_hash}
+        doc_internal_id = f"doc_{uuid.uuid4()}"
+
     logger.info(f"Processing document: {original_filename} (Internal ID: {doc_internal_id}), Access Target: {doc_access_target}")
 
+    split_docs = load_and_split_document(file_content, file_type, original_filename)
+    if not split_docs:
+        logger.warning(f"No chunks generated after splitting document: {original_filename}")
+        return None
+
+    for i, doc_chunk in enumerate(split_docs):
+        doc_chunk.metadata = doc_chunk.metadata or {}
+        doc_chunk.metadata["source_filename"] = doc_chunk.metadata.get("source_filename", original_filename)
+        doc_chunk.metadata["page_number"] = doc_chunk.metadata.get("page", None)
+        doc_chunk.metadata["doc_internal_id"] = doc_internal_id
+        doc_chunk.metadata["chunk_index"] = i
+        # --- NEW: Add access target to metadata ---
+        doc_chunk.metadata["doc_access_target"] = doc_access_target
+        doc_chunk.metadata[chunk_store.FILE_HASH_KEY] = file_hash
+        doc_chunk.metadata[chunk_store.CHUNK_HASH_KEY] = chunk_store.hash_chunk_text(doc_chunk.page_content)
+        doc_chunk.metadata[chunk_store.CHUNK_COUNT_KEY] = len(split_docs)
+        doc_chunk.metadata.pop('source', None) # Remove temp file path if it exists
+
+    metadatas = [doc.metadata for doc in split_docs]
+    chunk_hashes = [metadata[chunk_store.CHUNK_HASH_KEY] for metadata in metadatas]
     try:
-        loaded_docs = load_document(file_content, file_type, original_filename)
-        if not loaded_docs:
-            logger.warning(f"Loading returned no documents for: {original_filename}")
-            return None
+        known_embeddings = chunk_store.lookup_embeddings(vector_store, chunk_hashes)
+    except Exception as e_lookup:
+        logger.error(f"Chunk hash lookup failed for {original_filename}, embedding all chunks: {e_lookup}")
+        known_embeddings = {}
 
-        split_docs = split_documents(loaded_docs)
-        if not split_docs:
-            logger.warning(f"No chunks generated after splitting document: {original_filename}")
+    return {
+        "doc_internal_id": doc_internal_id,
+        "duplicate": False,
+        "file_hash": file_hash,
+        "texts": [doc.page_content for doc in split_docs],
+        "metadatas": metadatas,
+        "ids": [f"{doc_internal_id}_chunk_{i}" for i in range(len(split_docs))],
+        "chunk_hashes": chunk_hashes,
+        "known_embeddings": known_embeddings,
+    }
+
+@profiling.profiled("ingest_document")
+def ingest_document(
+    file_content: bytes,
+    file_type: str,
+    original_filename: str,
+    doc_access_target: str,
+    progress_callback: Optional[Callable[[int, int], None]] = None, # Called with (chunks_done, chunks_total)
+    on_prepared: Optional[Callable[[str], None]] = None # Called with the new doc_internal_id before anything is written
+) -> Dict[str, Any] | None:
+    """
+    Parses, splits, embeds and stores a document.
+    Returns a dict with doc_internal_id, chunks, chunks_embedded, chunks_reused and duplicate,
+    or None if the file produced no content.
+    """
+    _check_ingestion_ready()
+    started = time.perf_counter()
+    prepared = None
+    try:
+        with metrics.ingestion_stage("prepare"):
+            prepared = prepare_document(file_content, file_type, original_filename, doc_access_target)
+        if prepared is None:
+            metrics.INGESTION_DOCUMENTS.labels("empty").inc()
             return None
+        if prepared["duplicate"]:
+            metrics.INGESTION_DOCUMENTS.labels("duplicate").inc()
+            if progress_callback:
+                progress_callback(0, 0)
+            return {
+                "doc_internal_id": prepared["doc_internal_id"],
+                "duplicate": True,
+                "content_hash": prepared["file_hash"],
+                "chunks": 0,
+                "chunks_embedded": 0,
+                "chunks_reused": 0,
+            }
+
+        doc_internal_id = prepared["doc_internal_id"]
+        if on_prepared:
+            on_prepared(doc_internal_id)
+        if progress_callback:
+            progress_callback(0, len(prepared["ids"]))
 
-        for i, doc_chunk in enumerate(split_docs):
-            doc_chunk.metadata = doc_chunk.metadata or {}
-            doc_chunk.metadata["source_filename"] = doc_chunk.metadata.get("source_filename", original_filename)
-            doc_chunk.metadata["page_number"] = doc_chunk.metadata.get("page", None)
-            doc_chunk.metadata["doc_internal_id"] = doc_internal_id
-            doc_chunk.metadata["chunk_index"] = i
-            # --- NEW: Add access target to metadata ---
-            doc_chunk.metadata["doc_access_target"] = doc_access_target
-            doc_chunk.metadata.pop('source', None) # Remove temp file path if it exists
-
-        texts = [doc.page_content for doc in split_docs]
-        metadatas = [doc.metadata for doc in split_docs]
-        ids = [f"{doc_internal_id}_chunk_{i}" for i in range(len(split_docs))]
-
-        logger.info(f"Adding {len(split_docs)} chunks to Chroma for document ID: {doc_internal_id}")
-        vector_store.add_texts(texts=texts, metadatas=metadatas, ids=ids)
+        logger.info(f"Adding {len(prepared['ids'])} chunks to Chroma for document ID: {doc_internal_id} (batch size {settings.EMBEDDING_BATCH_SIZE})")
+        stats = ingestion_embedder.embed_and_store(
+            vector_store, embedding_function,
+            prepared["texts"], prepared["metadatas"], prepared["ids"],
+            batch_size=settings.EMBEDDING_BATCH_SIZE,
+            progress_callback=progress_callback,
+            log_label=original_filename,
+            chunk_hashes=prepared["chunk_hashes"],
+            known_embeddings=prepared["known_embeddings"]
+        )
         logger.info(f"Successfully added chunks for document {original_filename} (ID: {doc_internal_id}).")
-        return doc_internal_id
+        metrics.observe_ingestion_stage("embed", stats["embed_s"])
+        metrics.observe_ingestion_stage("write", stats["write_s"])
+        with metrics.ingestion_stage("lexical_index"):
+            index_chunks_lexically(prepared)
+        # Cached answers for scopes that can see this document may now be stale.
+        answer_cache.invalidate_access_target(doc_access_target)
+        metrics.record_ingested_document(stats["chunks"], stats["chunks_embedded"], stats["chunks_reused"])
+        metrics.observe_ingestion_stage("total", time.perf_counter() - started)
+        return {
+            "doc_internal_id": doc_internal_id,
+            "duplicate": False,
+            "content_hash": prepared["file_hash"],
+            "chunks": stats["chunks"],
+            "chunks_embedded": stats["chunks_embedded"],
+            "chunks_reused": stats["chunks_reused"],
+        }
 
     except Exception as e:
         logger.exception(f"Failed during processing/embedding of {original_filename}: {e}")
+        metrics.INGESTION_DOCUMENTS.labels("failed").inc()
+        if prepared is not None and not prepared["duplicate"]:
+            discard_partial_document(prepared["doc_internal_id"], prepared["ids"], doc_access_target)
         raise
+
+def discard_partial_document(doc_internal_id: str, chunk_ids: List[str], doc_access_target: str) -> None:
+    """Removes the chunks a failed ingest may already have written to Chroma and the lexical index."""
+    try:
+        chunk_store.collection_for(vector_store, doc_access_target).delete(ids=chunk_ids)
+    except Exception as e:
+        logger.error(f"Failed to remove partially written chunks of document {doc_internal_id}: {e}")
+    index = lexical_index_module.lexical_index
+    if index is not None:
+        try:
+            index.delete_chunks(chunk_ids)
+        except Exception as e:
+            logger.error(f"Failed to remove document {doc_internal_id} from the lexical index: {e}")
+    logger.info(f"Discarded partially written document {doc_internal_id} ({len(chunk_ids)} chunk IDs).")
+
+# --- MODIFIED: process_and_embed_document to include doc_access_target ---
+@profiling.profiled("process_and_embed_document")
+def process_and_embed_document(
+    file_content: bytes,
+    file_type: str,
+    original_filename: str,
+    doc_access_target: str, # <-- New parameter
+    progress_callback: Optional[Callable[[int, int], None]] = None # Called with (chunks_done, chunks_total)
+) -> str | None:
+    result = ingest_document(file_content, file_type, original_filename, doc_access_target, progress_callback)
+    return result["doc_internal_id"] if result else None
+
+
+# --- Document Removal and In-place Replacement ---
+_MAX_WRITE_BATCH = 5000 # Below Chroma's default max batch size (5461)
+
+def delete_document(doc_internal_id: str, doc_access_target: str) -> int:
+    """Removes a document's chunks from Chroma and the lexical index. Returns the number of chunks deleted."""
+    _check_ingestion_ready()
+    collection = chunk_store.collection_for(vector_store, doc_access_target)
+    chunk_ids = list(chunk_store.get_document_chunks(collection, doc_internal_id))
+    if chunk_ids:
+        collection.delete(ids=chunk_ids)
+    index = lexical_index_module.lexical_index
+    if index is not None:
+        try:
+            index.delete_document(doc_internal_id)
+        except Exception as e:
+            logger.error(f"Failed to remove document {doc_internal_id} from the lexical index: {e}")
+    answer_cache.invalidate_access_target(doc_access_target)
+    logger.info(f"Deleted {len(chunk_ids)} chunks of document {doc_internal_id} (Access Target: {doc_access_target}).")
+    return len(chunk_ids)
+
+@profiling.profiled("replace_document")
+def replace_document(
+    doc_internal_id: str,
+    file_content: bytes,
+    file_type: str,
+    original_filename: str,
+    doc_access_target: str
+) -> Dict[str, Any] | None:
+    """
+    Re-indexes a new version of a document under the same doc_internal_id.
+    Chunks are matched by position and text hash against the stored version: changed chunks
+    are upserted in one batch (embedding only text the collection has not seen), unchanged
+    ones only get their metadata refreshed, and chunks past the new end are deleted.
+    Returns chunk counts, or None if the new file produced no content.
+    """
+    _check_ingestion_ready()
+    started = time.perf_counter()
+    with metrics.ingestion_stage("prepare"):
+        prepared = prepare_document(file_content, file_type, original_filename, doc_access_target, doc_internal_id=doc_internal_id)
+    if prepared is None:
+        return None
+
+    collection = chunk_store.collection_for(vector_store, doc_access_target)
+    existing = chunk_store.get_document_chunks(collection, doc_internal_id)
+    ids, texts, metadatas, chunk_hashes = prepared["ids"], prepared["texts"], prepared["metadatas"], prepared["chunk_hashes"]
+    changed_idx = [i for i, chunk_id in enumerate(ids) if existing.get(chunk_id, {}).get(chunk_store.CHUNK_HASH_KEY) != chunk_hashes[i]]
+    changed = set(changed_idx)
+    refresh_idx = [ # Chroma drops None-valued keys, so compare without them
+        i for i in range(len(ids))
+        if i not in changed and existing[ids[i]] != {key: value for key, value in metadatas[i].items() if value is not None}
+    ]
+    new_ids = set(ids)
+    removed_ids = [chunk_id for chunk_id in existing if chunk_id not in new_ids]
+
+    stats: Dict[str, Any] = {"write_s": 0.0}
+    upsert: Dict[str, List[Any]] = {"ids": [], "texts": [], "metadatas": [], "embeddings": []}
+    for batch in ingestion_embedder.iter_embedded_batches(
+        embedding_function,
+        [texts[i] for i in changed_idx], [metadatas[i] for i in changed_idx], [ids[i] for i in changed_idx],
+        settings.EMBEDDING_BATCH_SIZE, stats,
+        chunk_hashes=[chunk_hashes[i] for i in changed_idx],
+        known_embeddings=prepared["known_embeddings"]
+    ):
+        for key in upsert:
+            upsert[key].extend(batch[key])
+
+    t0 = time.perf_counter()
+    # New chunks are written before stale ones are removed, so the document never drops out of search.
+    for start in range(0, len(upsert["ids"]), _MAX_WRITE_BATCH):
+        collection.upsert(
+            ids=upsert["ids"][start:start + _MAX_WRITE_BATCH],
+            embeddings=upsert["embeddings"][start:start + _MAX_WRITE_BATCH],
+            metadatas=upsert["metadatas"][start:start + _MAX_WRITE_BATCH],
+            documents=upsert["texts"][start:start + _MAX_WRITE_BATCH]
+        )
+    for start in range(0, len(refresh_idx), _MAX_WRITE_BATCH): # Metadata only (file hash, offsets); vectors untouched
+        page = refresh_idx[start:start + _MAX_WRITE_BATCH]
+        collection.update(ids=[ids[i] for i in page], metadatas=[metadatas[i] for i in page])
+    for start in range(0, len(removed_ids), _MAX_WRITE_BATCH):
+        collection.delete(ids=removed_ids[start:start + _MAX_WRITE_BATCH])
+    write_s = time.perf_counter() - t0
+
+    index = lexical_index_module.lexical_index
+    if index is not None:
+        with metrics.ingestion_stage("lexical_index"):
+            try:
+                index.add_chunks(ids, texts, metadatas)
+                index.delete_chunks(removed_ids)
+            except Exception as e:
+                logger.error(f"Failed to update document {doc_internal_id} in the lexical index: {e}")
+    answer_cache.invalidate_access_target(doc_access_target)
+    metrics.observe_ingestion_stage("embed", stats.get("embed_s", 0.0))
+    metrics.observe_ingestion_stage("write", write_s)
+    metrics.observe_ingestion_stage("total", time.perf_counter() - started)
+    logger.info(
+        f"Replaced document {doc_internal_id} with {original_filename}: {len(ids)} chunks "
+        f"({len(changed_idx)} changed, {stats.get('chunks_embedded', 0)} embedded, {len(removed_ids)} removed)."
+    )
+    return {
+        "doc_internal_id": doc_internal_id,
+        "content_hash": prepared["file_hash"],
+        "chunks": len(ids),
+        "chunks_changed": len(changed_idx),
+        "chunks_embedded": stats.get("chunks_embedded", 0),
+        "chunks_reused": len(ids) - stats.get("chunks_embedded", 0),
+        "chunks_deleted": len(removed_ids),
+    }
@@ -0,0 +1,67 @@
+# app/services/hybrid_retriever.py
+import logging
+from typing import Any, Dict, List, Optional
+
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+logger = logging.getLogger(__name__)
+
+
+def chunk_key(doc: Document) -> str:
+    """Chroma chunk id of a retrieved Document (ids are f"{doc_internal_id}_chunk_{chunk_index}")."""
+    if getattr(doc, "id", None):
+        return doc.id
+    metadata = doc.metadata or {}
+    return f"{metadata.get('doc_internal_id')}_chunk_{metadata.get('chunk_index')}"
+
+
+def reciprocal_rank_fusion(rankings: List[List[str]], rrf_k: int = 60) -> List[str]:
+    """Fuses ranked id lists: score(id) = sum over lists of 1 / (rrf_k + rank). Returns ids best-first."""
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, key in enumerate(ranking, start=1):
+            scores[key] = scores.get(key, 0.0) + 1.0 / (rrf_k + rank)
+    return sorted(scores, key=lambda key: scores[key], reverse=True)
+
+
+class HybridRetriever(BaseRetriever):
+    """
+    Retrieves fetch_k candidates from the vector store and from the BM25 lexical index, both
+    restricted to allowed_access_targets (None = unrestricted), and returns the top k by
+    reciprocal rank fusion. Exact tokens such as course codes and room numbers that dense
+    search misses still surface through the lexical side.
+    """
+    vector_store: Any
+    lexical_index: Any
+    allowed_access_targets: Optional[List[str]] = None
+    k: int = 5
+    fetch_k: int = 20
+    rrf_k: int = 60
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        search_filter = None
+        if self.allowed_access_targets is not None:
+            search_filter = {"doc_access_target": {"$in": self.allowed_access_targets}}
+        vector_docs = self.vector_store.similarity_search(query, k=self.fetch_k, filter=search_filter)
+
+        try:
+            lexical_hits = self.lexical_index.search(query, self.allowed_access_targets, self.fetch_k)
+        except Exception as e:
+            logger.error(f"Hybrid retriever: lexical search failed, using vector results only: {e}")
+            lexical_hits = []
+
+        docs_by_key: Dict[str, Document] = {}
+        vector_ranking = []
+        for doc in vector_docs:
+            key = chunk_key(doc)
+            docs_by_key[key] = doc
+            vector_ranking.append(key)
+        lexical_ranking = []
+        for key, _, doc in lexical_hits:
+            docs_by_key.setdefault(key, doc)
+            lexical_ranking.append(key)
+
+        fused = reciprocal_rank_fusion([vector_ranking, lexical_ranking], self.rrf_k)[:self.k]
+        return [docs_by_key[key] for key in fused]
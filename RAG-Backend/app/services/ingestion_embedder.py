@@ -0,0 +1,176 @@
+# app/services/ingestion_embedder.py
+import logging
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from langchain_core.embeddings import Embeddings
+
+logger = logging.getLogger(__name__)
+
+
+def _find_tokenizer(embeddings: Embeddings) -> Optional[Any]:
+    """Best-effort lookup of the HuggingFace tokenizer behind an Embeddings wrapper."""
+    current = embeddings
+    for _ in range(8): # Instrumented -> Cached -> MicroBatching -> Matryoshka -> HuggingFaceEmbeddings/OnnxEmbeddings -> SentenceTransformer
+        tokenizer = getattr(current, "tokenizer", None)
+        if tokenizer is not None:
+            return tokenizer
+        current = getattr(current, "base", None) or getattr(current, "_client", None) or getattr(current, "client", None)
+        if current is None:
+            break
+    return None
+
+
+def count_tokens(texts: List[str], embeddings: Embeddings) -> List[int]:
+    """Token counts per text using the model tokenizer if reachable, otherwise a whitespace estimate."""
+    tokenizer = _find_tokenizer(embeddings)
+    if tokenizer is not None:
+        try:
+            encoded = tokenizer(texts, add_special_tokens=False)["input_ids"]
+            return [len(ids) for ids in encoded]
+        except Exception as e:
+            logger.warning(f"Tokenizer-based length estimate failed, falling back to whitespace counts: {e}")
+    return [len(text.split()) for text in texts]
+
+
+def write_embedded_batch(vector_store: Any, ids: List[str], texts: List[str],
+                         metadatas: List[Dict[str, Any]], embeddings: List[List[float]]) -> None:
+    """Writes pre-computed embeddings straight to the Chroma collection (no second embedding pass)."""
+    if hasattr(vector_store, "upsert_embeddings"): # PartitionedVectorStore routes by access target
+        vector_store.upsert_embeddings(ids=ids, texts=texts, metadatas=metadatas, embeddings=embeddings)
+        return
+    vector_store._collection.upsert(ids=ids, embeddings=embeddings, metadatas=metadatas, documents=texts)
+
+
+def iter_embedded_batches(
+    embedding_function: Embeddings,
+    texts: List[str],
+    metadatas: List[Dict[str, Any]],
+    ids: List[str],
+    batch_size: int,
+    stats: Dict[str, Any],
+    chunk_hashes: Optional[List[str]] = None,
+    known_embeddings: Optional[Dict[str, List[float]]] = None
+) -> Iterator[Dict[str, Any]]:
+    """
+    Yields write-ready batches ({"ids", "texts", "metadatas", "embeddings"}) for a document.
+    Chunks whose hash is in known_embeddings (or repeats earlier in the same document) reuse that
+    vector; the rest are embedded in token-length-sorted batches of batch_size.
+    Fills stats with chunks, chunks_embedded, chunks_reused, tokens, batches and embed_s.
+    """
+    total = len(texts)
+    batch_size = max(1, batch_size)
+    known_embeddings = known_embeddings or {}
+
+    # Partition: reusable from the store, first occurrence of new text, repeat of new text.
+    reuse_idx: List[int] = []
+    embed_idx: List[int] = []
+    repeat_idx: List[int] = []
+    first_seen: Dict[str, int] = {}
+    for i in range(total):
+        chunk_hash = chunk_hashes[i] if chunk_hashes else None
+        if chunk_hash is not None and chunk_hash in known_embeddings:
+            reuse_idx.append(i)
+        elif chunk_hash is not None and chunk_hash in first_seen:
+            repeat_idx.append(i)
+        else:
+            if chunk_hash is not None:
+                first_seen[chunk_hash] = i
+            embed_idx.append(i)
+
+    def make_batch(batch_idx: List[int], vectors: List[List[float]]) -> Dict[str, Any]:
+        return {
+            "ids": [ids[i] for i in batch_idx],
+            "texts": [texts[i] for i in batch_idx],
+            "metadatas": [metadatas[i] for i in batch_idx],
+            "embeddings": vectors,
+        }
+
+    embed_texts = [texts[i] for i in embed_idx]
+    token_counts = count_tokens(embed_texts, embedding_function) if embed_texts else []
+    stats.update({
+        "chunks": total,
+        "chunks_embedded": len(embed_idx),
+        "chunks_reused": len(reuse_idx) + len(repeat_idx),
+        "tokens": sum(token_counts),
+        "batches": (len(embed_idx) + batch_size - 1) // batch_size,
+        "batch_size": batch_size,
+        "embed_s": 0.0,
+    })
+
+    for batch_start in range(0, len(reuse_idx), batch_size):
+        batch_idx = reuse_idx[batch_start:batch_start + batch_size]
+        yield make_batch(batch_idx, [known_embeddings[chunk_hashes[i]] for i in batch_idx])
+
+    order = sorted(range(len(embed_idx)), key=lambda j: token_counts[j])
+    repeated_hashes = {chunk_hashes[i] for i in repeat_idx} if chunk_hashes else set()
+    vectors_for_repeats: Dict[str, List[float]] = {}
+
+    for batch_start in range(0, len(order), batch_size):
+        batch_idx = [embed_idx[j] for j in order[batch_start:batch_start + batch_size]]
+        t0 = time.perf_counter()
+        batch_vectors = embedding_function.embed_documents([texts[i] for i in batch_idx])
+        stats["embed_s"] += time.perf_counter() - t0
+        for i, vector in zip(batch_idx, batch_vectors):
+            if chunk_hashes and chunk_hashes[i] in repeated_hashes:
+                vectors_for_repeats[chunk_hashes[i]] = vector
+        yield make_batch(batch_idx, batch_vectors)
+
+    for batch_start in range(0, len(repeat_idx), batch_size):
+        batch_idx = repeat_idx[batch_start:batch_start + batch_size]
+        yield make_batch(batch_idx, [vectors_for_repeats[chunk_hashes[i]] for i in batch_idx])
+
+
+def log_throughput(stats: Dict[str, Any], log_label: str = "") -> None:
+    logger.info(
+        f"Ingestion throughput{f' for {log_label}' if log_label else ''}: {stats['chunks']} chunks "
+        f"({stats['chunks_embedded']} embedded, {stats['chunks_reused']} reused) / {stats['tokens']} tokens embedded "
+        f"in {stats['total_s']:.2f}s ({stats['chunks_per_s']} chunks/s, {stats['tokens_per_s']} tokens/s; "
+        f"embed {stats['embed_s']:.2f}s, write {stats['write_s']:.2f}s, batch_size={stats['batch_size']})"
+    )
+
+
+def finalize_stats(stats: Dict[str, Any], elapsed: float) -> Dict[str, Any]:
+    stats["embed_s"] = round(stats.get("embed_s", 0.0), 4)
+    stats["write_s"] = round(stats.get("write_s", 0.0), 4)
+    stats["total_s"] = round(elapsed, 4)
+    stats["chunks_per_s"] = round(stats["chunks"] / elapsed, 2) if elapsed > 0 else 0.0
+    stats["tokens_per_s"] = round(stats["tokens"] / elapsed, 2) if elapsed > 0 else 0.0
+    return stats
+
+
+def embed_and_store(
+    vector_store: Any,
+    embedding_function: Embeddings,
+    texts: List[str],
+    metadatas: List[Dict[str, Any]],
+    ids: List[str],
+    batch_size: int,
+    progress_callback: Optional[Callable[[int, int], None]] = None,
+    log_label: str = "",
+    chunk_hashes: Optional[List[str]] = None,
+    known_embeddings: Optional[Dict[str, List[float]]] = None
+) -> Dict[str, Any]:
+    """
+    Embeds chunks in length-sorted batches and writes each batch to Chroma as soon as it is ready.
+    Sorting by token length keeps similar-length chunks together, so each forward pass pads less;
+    writing per batch keeps peak memory bounded by batch_size rather than by document size.
+    Returns throughput and reuse stats for the document.
+    """
+    start = time.perf_counter()
+    stats: Dict[str, Any] = {"write_s": 0.0}
+    done = 0
+    for batch in iter_embedded_batches(
+        embedding_function, texts, metadatas, ids, batch_size, stats,
+        chunk_hashes=chunk_hashes, known_embeddings=known_embeddings
+    ):
+        t0 = time.perf_counter()
+        write_embedded_batch(vector_store, **batch)
+        stats["write_s"] += time.perf_counter() - t0
+        done += len(batch["ids"])
+        if progress_callback:
+            progress_callback(done, len(texts))
+
+    finalize_stats(stats, time.perf_counter() - start)
+    log_throughput(stats, log_label)
+    return stats
@@ -0,0 +1,348 @@
+# app/services/ingestion_jobs.py
+import logging
+import queue
+import threading
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from ..core.config import settings
+from ..db import models
+from ..db.database import SessionLocal
+from . import document_registry
+from . import notification_service
+from . import profiling
+
+logger = logging.getLogger(__name__)
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+
+# In-process queue of job IDs. The ingestion_jobs table is the source of truth,
+# so anything still queued/running when the process stops is re-enqueued at startup.
+_job_queue: "queue.Queue[Optional[str]]" = queue.Queue()
+_workers: List[threading.Thread] = []
+
+
+def enqueue_job(
+    db: Session,
+    file_content: bytes,
+    content_type: Optional[str],
+    filename: str,
+    doc_access_target: str,
+    notification_message: Optional[str] = None,
+    notification_target_level: Optional[int] = None,
+    created_by: Optional[str] = None
+) -> models.IngestionJob:
+    """Persists a new ingestion job and hands it to the background workers."""
+    job = models.IngestionJob(
+        id=str(uuid.uuid4()),
+        filename=filename,
+        content_type=content_type,
+        doc_access_target=doc_access_target,
+        status=JOB_QUEUED,
+        file_content=file_content,
+        notification_message=notification_message,
+        notification_target_level=notification_target_level,
+        created_by=created_by
+    )
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    if profiling.defer(f"job-{job.id}"): # Queued by a profiled admin request: profile the job when it runs
+        logger.info(f"Ingestion job {job.id} will be profiled; report id job-{job.id}.")
+    _job_queue.put(job.id)
+    logger.info(f"Ingestion job {job.id} queued for file '{filename}' (Access: {doc_access_target}).")
+    return job
+
+
+def enqueue_batch(
+    db: Session,
+    items: List[Dict[str, Any]],
+    notification_message: Optional[str] = None,
+    notification_target_level: Optional[int] = None,
+    created_by: Optional[str] = None
+) -> List[models.IngestionJob]:
+    """
+    Persists one job per file of a bulk upload ({"filename", "content", "content_type", "doc_access_target"})
+    under a shared batch_id. A single worker runs the whole batch through the bulk pipeline and sends
+    at most one notification for it.
+    """
+    batch_id = str(uuid.uuid4())
+    jobs = [
+        models.IngestionJob(
+            id=str(uuid.uuid4()),
+            batch_id=batch_id,
+            filename=item["filename"],
+            content_type=item["content_type"],
+            doc_access_target=item["doc_access_target"],
+            status=JOB_QUEUED,
+            file_content=item["content"],
+            notification_message=notification_message,
+            notification_target_level=notification_target_level,
+            created_by=created_by
+        )
+        for item in items
+    ]
+    db.add_all(jobs)
+    db.commit()
+    for job in jobs:
+        db.refresh(job)
+    if profiling.defer(f"job-{jobs[0].id}"):
+        logger.info(f"Ingestion batch {batch_id} will be profiled; report id job-{jobs[0].id}.")
+    _job_queue.put(jobs[0].id) # The other jobs of the batch are claimed with it
+    logger.info(f"Ingestion batch {batch_id} queued with {len(jobs)} file(s).")
+    return jobs
+
+
+def get_job(db: Session, job_id: str) -> Optional[models.IngestionJob]:
+    return db.query(models.IngestionJob).filter(models.IngestionJob.id == job_id).first()
+
+
+def _run_job(job_id: str) -> None:
+    db = SessionLocal()
+    try:
+        job = get_job(db, job_id)
+        if job is None or job.status != JOB_QUEUED:
+            logger.info(f"Ingestion job {job_id} skipped (missing or not queued).")
+            return
+        if job.batch_id:
+            _run_batch(db, job.batch_id)
+            return
+
+        _discard_partial_document(db, job)
+        job.status = JOB_RUNNING
+        job.started_at = datetime.now(timezone.utc)
+        db.commit()
+        logger.info(f"Ingestion job {job_id} started for file '{job.filename}'.")
+
+        def on_progress(chunks_done: int, chunks_total: int) -> None:
+            job.chunks_done = chunks_done
+            job.chunks_total = chunks_total
+            db.commit()
+
+        def on_prepared(doc_internal_id: str) -> None:
+            job.doc_internal_id = doc_internal_id # Lets a restart find and remove a partly written document
+            db.commit()
+
+        try:
+            from . import file_processor # Deferred: pulls in the langchain/Chroma stack
+            result = file_processor.ingest_document(
+                job.file_content, job.content_type, job.filename, job.doc_access_target,
+                progress_callback=on_progress, on_prepared=on_prepared
+            )
+        except Exception as e_process:
+            db.rollback()
+            logger.exception(f"Ingestion job {job_id} failed while processing '{job.filename}': {e_process}")
+            job.doc_internal_id = None # ingest_document already removed what it wrote
+            job.status = JOB_FAILED
+            job.error = str(e_process) or e_process.__class__.__name__
+        else:
+            doc_id = result["doc_internal_id"] if result else None
+            if not doc_id:
+                job.status = JOB_FAILED
+                job.error = "File processing returned no document ID (unsupported type or no extractable text)."
+                logger.warning(f"Ingestion job {job_id}: file '{job.filename}' was not processed.")
+            else:
+                _record_success(db, job, result)
+                # Only notify students once new content is actually searchable; a duplicate added nothing.
+                if _added_chunks(result) and job.notification_message and job.notification_target_level is not None:
+                    try:
+                        notification_service.create_notification(
+                            db=db,
+                            message=job.notification_message,
+                            target_level_input=job.notification_target_level,
+                            document_internal_id=doc_id
+                        )
+                        job.notification_sent = True
+                    except Exception as e_notif:
+                        db.rollback()
+                        logger.error(f"Ingestion job {job_id}: failed to create notification for document {doc_id}: {e_notif}")
+                logger.info(f"Ingestion job {job_id} succeeded. Internal ID: {doc_id}")
+
+        job.file_content = None # Free the stored upload once the job is finished
+        job.finished_at = datetime.now(timezone.utc)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.exception(f"Ingestion job {job_id}: unexpected worker error: {e}")
+    finally:
+        db.close()
+
+
+def _discard_partial_document(db: Session, job: models.IngestionJob) -> None:
+    """
+    Removes the chunks of a job's partly written document, e.g. a queued job interrupted mid-ingest
+    by a previous process, so a re-run starts clean instead of matching them as a duplicate.
+    """
+    if not job.doc_internal_id:
+        return
+    try:
+        from . import file_processor # Deferred: pulls in the langchain/Chroma stack
+        deleted = file_processor.delete_document(job.doc_internal_id, job.doc_access_target)
+        logger.info(f"Ingestion job {job.id}: removed {deleted} partly written chunks of document {job.doc_internal_id}.")
+    except Exception as e_delete:
+        logger.error(f"Ingestion job {job.id}: failed to remove partly written chunks of document {job.doc_internal_id}: {e_delete}")
+    job.doc_internal_id = None
+    db.commit()
+
+
+def _added_chunks(result: Dict[str, Any]) -> bool:
+    return not result["duplicate"] and result["chunks"] > 0
+
+
+def _record_success(db: Session, job: models.IngestionJob, result: Dict[str, Any]) -> None:
+    """Stores an ingest result on a job and registers the document it wrote."""
+    doc_id = result["doc_internal_id"]
+    job.doc_internal_id = doc_id
+    job.chunks_embedded = result["chunks_embedded"]
+    job.chunks_reused = result["chunks_reused"]
+    job.duplicate = result["duplicate"]
+    job.status = JOB_SUCCEEDED
+    db.commit()
+    if result["duplicate"]:
+        # The ingest that wrote the document registered it; documents indexed before the registry
+        # existed are added by app.scripts.backfill_document_registry with their real chunk counts.
+        return
+    try:
+        document_registry.register_document(
+            db, doc_id, job.filename, job.content_type, job.doc_access_target,
+            chunk_count=result["chunks"], content_hash=result["content_hash"], created_by=job.created_by
+        )
+    except Exception as e_register:
+        db.rollback()
+        logger.error(f"Ingestion job {job.id}: failed to register document {doc_id}: {e_register}")
+
+
+def _run_batch(db: Session, batch_id: str) -> None:
+    """Runs every queued job of a bulk upload through bulk_ingestion's pipeline and records each file's result."""
+    jobs = db.query(models.IngestionJob).filter(
+        models.IngestionJob.batch_id == batch_id, models.IngestionJob.status == JOB_QUEUED
+    ).order_by(models.IngestionJob.created_at).all()
+    started_at = datetime.now(timezone.utc)
+    for job in jobs:
+        _discard_partial_document(db, job)
+        job.status = JOB_RUNNING
+        job.started_at = started_at
+    db.commit()
+    logger.info(f"Ingestion batch {batch_id} started with {len(jobs)} file(s).")
+
+    items = [
+        {"filename": job.filename, "content": job.file_content, "content_type": job.content_type, "doc_access_target": job.doc_access_target}
+        for job in jobs
+    ]
+
+    def on_prepared(idx: int, doc_internal_id: str) -> None:
+        jobs[idx].doc_internal_id = doc_internal_id # Lets a restart find and remove a partly written document
+        db.commit()
+
+    try:
+        from . import bulk_ingestion # Deferred: pulls in the langchain/Chroma stack
+        results, _ = bulk_ingestion.run_bulk_ingestion(items, on_prepared=on_prepared)
+    except Exception as e_process:
+        db.rollback()
+        logger.exception(f"Ingestion batch {batch_id} failed: {e_process}")
+        results = [{"doc_internal_id": None, "error": str(e_process) or e_process.__class__.__name__} for _ in jobs]
+        for job in jobs:
+            _discard_partial_document(db, job)
+
+    succeeded = []
+    added = [] # Jobs whose file put new chunks in the store (not duplicates)
+    for job, result in zip(jobs, results):
+        if result["doc_internal_id"]:
+            _record_success(db, job, result)
+            succeeded.append(job)
+            if _added_chunks(result):
+                added.append(job)
+        else:
+            job.doc_internal_id = None # bulk_ingestion already removed what it wrote
+            job.status = JOB_FAILED
+            job.error = result["error"] or "File processing returned no content (unsupported type or no extractable text)."
+    # One notification for the whole batch, and only if it made new content searchable.
+    if added and added[0].notification_message and added[0].notification_target_level is not None:
+        try:
+            notification_service.create_notification(
+                db=db,
+                message=added[0].notification_message,
+                target_level_input=added[0].notification_target_level,
+                document_internal_id=added[0].doc_internal_id if len(added) == 1 else None
+            )
+            for job in added:
+                job.notification_sent = True
+        except Exception as e_notif:
+            db.rollback()
+            logger.error(f"Ingestion batch {batch_id}: failed to create notification: {e_notif}")
+
+    finished_at = datetime.now(timezone.utc)
+    for job in jobs:
+        job.file_content = None
+        job.finished_at = finished_at
+    db.commit()
+    logger.info(f"Ingestion batch {batch_id} finished: {len(succeeded)} of {len(jobs)} file(s) ingested.")
+
+
+def _worker_loop() -> None:
+    while True:
+        job_id = _job_queue.get()
+        try:
+            if job_id is None: # Shutdown sentinel
+                return
+            profile_mode = profiling.take_deferred(f"job-{job_id}")
+            if profile_mode is None:
+                _run_job(job_id)
+            else:
+                profile = profiling.start(profile_mode, f"ingestion job {job_id}", profile_id=f"job-{job_id}")
+                try:
+                    _run_job(job_id)
+                finally:
+                    profiling.finish(profile)
+        finally:
+            _job_queue.task_done()
+
+
+def recover_pending_jobs() -> int:
+    """Re-enqueues jobs left queued or running by a previous process. Returns the number recovered."""
+    db = SessionLocal()
+    try:
+        pending = db.query(models.IngestionJob).filter(
+            models.IngestionJob.status.in_([JOB_QUEUED, JOB_RUNNING])
+        ).order_by(models.IngestionJob.created_at).all()
+        for job in pending:
+            job.status = JOB_QUEUED # A 'running' job was interrupted mid-way; start it over (its partial chunks are removed first)
+        db.commit()
+        queued_batches = set()
+        for job in pending:
+            if job.batch_id: # One queue entry per batch; the worker claims the rest of it
+                if job.batch_id in queued_batches:
+                    continue
+                queued_batches.add(job.batch_id)
+            _job_queue.put(job.id)
+        if pending:
+            logger.info(f"Recovered {len(pending)} pending ingestion job(s) from the database.")
+        return len(pending)
+    finally:
+        db.close()
+
+
+def start_workers() -> None:
+    if _workers:
+        return
+    recover_pending_jobs()
+    for i in range(max(1, settings.INGESTION_WORKERS)):
+        worker = threading.Thread(target=_worker_loop, name=f"ingestion-worker-{i}", daemon=True)
+        worker.start()
+        _workers.append(worker)
+    logger.info(f"Started {len(_workers)} ingestion worker thread(s).")
+
+
+def stop_workers(timeout: float = 5.0) -> None:
+    for _ in _workers:
+        _job_queue.put(None)
+    for worker in _workers:
+        worker.join(timeout=timeout)
+    _workers.clear()
+    logger.info("Ingestion workers stopped.")
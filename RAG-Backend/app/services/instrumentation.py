@@ -0,0 +1,95 @@
+# app/services/instrumentation.py
+"""
+Langchain-side hooks that feed app.services.metrics: timing wrappers for the query
+embedding and the retriever, and a callback handler for LLM calls made inside chains.
+"""
+import contextvars
+import threading
+import time
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler, CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.retrievers import BaseRetriever
+
+from . import metrics
+from . import profiling
+
+# Query-embedding time spent inside the current retriever call, so vector search can be reported net of it.
+_retrieval_embedding_s: contextvars.ContextVar[Optional[List[float]]] = contextvars.ContextVar("retrieval_embedding_s", default=None)
+
+
+class InstrumentedEmbeddings(Embeddings):
+    """Outermost embedding wrapper: times embed_query as the 'embedding' stage. embed_documents passes through."""
+
+    def __init__(self, base: Embeddings):
+        self.base = base
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.base.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        start = time.perf_counter()
+        try:
+            with profiling.span():
+                return self.base.embed_query(text)
+        finally:
+            elapsed = time.perf_counter() - start
+            metrics.observe_rag_stage("embedding", elapsed)
+            accumulator = _retrieval_embedding_s.get()
+            if accumulator is not None:
+                accumulator[0] += elapsed
+
+
+class InstrumentedRetriever(BaseRetriever):
+    """Times the wrapped retriever as the 'vector_search' stage, excluding the query embedding it triggers."""
+    base_retriever: BaseRetriever
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        accumulator = [0.0]
+        token = _retrieval_embedding_s.set(accumulator)
+        start = time.perf_counter()
+        try:
+            with profiling.span():
+                return self.base_retriever.invoke(query, config={"callbacks": run_manager.get_child()})
+        finally:
+            metrics.observe_rag_stage("vector_search", max(0.0, time.perf_counter() - start - accumulator[0]))
+            _retrieval_embedding_s.reset(token)
+
+
+class LLMMetricsCallback(BaseCallbackHandler):
+    """Tracks in-flight LLM calls and observes their duration as the 'llm' stage."""
+    run_inline = True # Called directly, not via an executor, on the async path
+
+    def __init__(self):
+        self._started: Dict[UUID, float] = {}
+        self._lock = threading.Lock()
+
+    def _start(self, run_id: UUID) -> None:
+        with self._lock:
+            self._started[run_id] = time.perf_counter()
+        metrics.LLM_IN_FLIGHT.inc()
+
+    def _finish(self, run_id: UUID) -> None:
+        with self._lock:
+            started = self._started.pop(run_id, None)
+        if started is not None:
+            metrics.LLM_IN_FLIGHT.dec()
+            metrics.observe_rag_stage("llm", time.perf_counter() - started)
+
+    def on_llm_start(self, serialized: Dict[str, Any], prompts: List[str], *, run_id: UUID, **kwargs: Any) -> None:
+        self._start(run_id)
+
+    def on_chat_model_start(self, serialized: Dict[str, Any], messages: List[List[Any]], *, run_id: UUID, **kwargs: Any) -> None:
+        self._start(run_id)
+
+    def on_llm_end(self, response: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self._finish(run_id)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._finish(run_id)
+
+
+llm_metrics_callback = LLMMetricsCallback()
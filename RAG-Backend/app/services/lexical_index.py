@@ -0,0 +1,198 @@
+# app/services/lexical_index.py
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from langchain_core.documents import Document
+
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+_MAX_QUERY_TERMS = 32
+_ROW_COUNT_TTL_S = 30.0
+
+# chunk_rows holds one row per Chroma chunk (same id); chunk_fts is an external-content FTS5
+# index over its text, kept in sync by triggers. FTS5 ranks with BM25 natively.
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS chunk_rows (
+    id INTEGER PRIMARY KEY,
+    chunk_id TEXT NOT NULL UNIQUE,
+    doc_internal_id TEXT,
+    doc_access_target TEXT,
+    text TEXT NOT NULL,
+    metadata TEXT
+);
+CREATE INDEX IF NOT EXISTS ix_chunk_rows_doc ON chunk_rows(doc_internal_id);
+CREATE INDEX IF NOT EXISTS ix_chunk_rows_target ON chunk_rows(doc_access_target);
+CREATE VIRTUAL TABLE IF NOT EXISTS chunk_fts USING fts5(
+    text, content='chunk_rows', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS chunk_vocab USING fts5vocab(chunk_fts, 'row');
+CREATE TRIGGER IF NOT EXISTS chunk_rows_ai AFTER INSERT ON chunk_rows BEGIN
+    INSERT INTO chunk_fts(rowid, text) VALUES (new.id, new.text);
+END;
+CREATE TRIGGER IF NOT EXISTS chunk_rows_ad AFTER DELETE ON chunk_rows BEGIN
+    INSERT INTO chunk_fts(chunk_fts, rowid, text) VALUES ('delete', old.id, old.text);
+END;
+CREATE TRIGGER IF NOT EXISTS chunk_rows_au AFTER UPDATE ON chunk_rows BEGIN
+    INSERT INTO chunk_fts(chunk_fts, rowid, text) VALUES ('delete', old.id, old.text);
+    INSERT INTO chunk_fts(rowid, text) VALUES (new.id, new.text);
+END;
+"""
+
+
+def default_index_path() -> str:
+    """Stored next to the Chroma directory, e.g. ./chroma_db -> ./chroma_db_lexical.sqlite3."""
+    return settings.LEXICAL_INDEX_PATH or f"{os.path.normpath(settings.CHROMA_DB_PATH)}_lexical.sqlite3"
+
+
+def query_terms(query: str) -> List[str]:
+    return list(dict.fromkeys(token.lower() for token in _TOKEN_RE.findall(query)))[:_MAX_QUERY_TERMS]
+
+
+def build_match_query(terms: List[str]) -> Optional[str]:
+    """FTS5 OR-query of quoted terms (so punctuation in user text can't break the syntax)."""
+    if not terms:
+        return None
+    return " OR ".join(f'"{term}"' for term in terms)
+
+
+class LexicalIndex:
+    """
+    Persistent BM25 inverted index over ingested chunks (SQLite FTS5).
+    Updated incrementally as documents are ingested; search needs no model inference.
+    """
+
+    def __init__(self, path: str, prune_max_df_ratio: float = 0.0, prune_min_chunks: int = 0):
+        """
+        prune_max_df_ratio > 0 drops query terms present in more than that share of chunks, but only once the
+        index holds prune_min_chunks chunks. On large corpora such terms barely change the BM25 ranking yet make
+        FTS5 score most of the index; on small ones they still discriminate, so pruning is off by default.
+        """
+        self.path = path
+        self.prune_max_df_ratio = prune_max_df_ratio
+        self.prune_min_chunks = prune_min_chunks
+        self._write_lock = threading.Lock() # SQLite allows one writer; serialize ours instead of retrying
+        self._row_count: Optional[Tuple[float, int]] = None # (checked_at, count), shared across searches
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn: # Commits on success, rolls back on error
+                yield conn
+        finally:
+            conn.close()
+
+    def add_chunks(self, ids: List[str], texts: List[str], metadatas: List[Dict[str, Any]]) -> None:
+        rows = [
+            (chunk_id, metadata.get("doc_internal_id"), metadata.get("doc_access_target"), text, json.dumps(metadata))
+            for chunk_id, text, metadata in zip(ids, texts, metadatas)
+        ]
+        with self._write_lock, self._connect() as conn:
+            conn.executemany(
+                "INSERT INTO chunk_rows (chunk_id, doc_internal_id, doc_access_target, text, metadata) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(chunk_id) DO UPDATE SET doc_internal_id=excluded.doc_internal_id, "
+                "doc_access_target=excluded.doc_access_target, text=excluded.text, metadata=excluded.metadata",
+                rows
+            )
+
+    def delete_document(self, doc_internal_id: str) -> int:
+        with self._write_lock, self._connect() as conn:
+            return conn.execute("DELETE FROM chunk_rows WHERE doc_internal_id = ?", (doc_internal_id,)).rowcount
+
+    def delete_chunks(self, ids: List[str]) -> int:
+        with self._write_lock, self._connect() as conn:
+            return conn.executemany("DELETE FROM chunk_rows WHERE chunk_id = ?", [(chunk_id,) for chunk_id in ids]).rowcount
+
+    def clear(self) -> None:
+        with self._write_lock, self._connect() as conn:
+            conn.execute("DELETE FROM chunk_rows")
+
+    def count(self) -> int:
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM chunk_rows").fetchone()[0]
+
+    def _approx_count(self, conn: sqlite3.Connection) -> int:
+        now = time.monotonic()
+        if self._row_count is None or now - self._row_count[0] > _ROW_COUNT_TTL_S:
+            self._row_count = (now, conn.execute("SELECT COUNT(*) FROM chunk_rows").fetchone()[0])
+        return self._row_count[1]
+
+    def _selective_terms(self, conn: sqlite3.Connection, terms: List[str]) -> List[str]:
+        """Applies the opt-in common-term pruning (see __init__), keeping at least the rarest term."""
+        if not terms or self.prune_max_df_ratio <= 0:
+            return terms
+        total = self._approx_count(conn)
+        if total < self.prune_min_chunks:
+            return terms
+        doc_freq = dict(conn.execute(
+            f"SELECT term, doc FROM chunk_vocab WHERE term IN ({','.join('?' * len(terms))})", terms
+        ).fetchall())
+        present = [term for term in terms if term in doc_freq]
+        if not present:
+            return []
+        max_df = max(1, int(total * self.prune_max_df_ratio))
+        selective = [term for term in present if doc_freq[term] <= max_df]
+        return selective or [min(present, key=lambda term: doc_freq[term])]
+
+    def search(self, query: str, allowed_access_targets: Optional[List[str]], k: int) -> List[Tuple[str, float, Document]]:
+        """
+        Returns up to k (chunk_id, bm25_score, Document) best matches, restricted to allowed_access_targets
+        (None means unrestricted). Higher scores are better.
+        """
+        terms = query_terms(query)
+        if not terms or k <= 0:
+            return []
+        if allowed_access_targets is not None and not allowed_access_targets:
+            return []
+        sql = (
+            "SELECT r.chunk_id, r.text, r.metadata, bm25(chunk_fts) AS score "
+            "FROM chunk_fts JOIN chunk_rows r ON r.id = chunk_fts.rowid WHERE chunk_fts MATCH ?"
+        )
+        params: List[Any] = []
+        if allowed_access_targets is not None:
+            sql += f" AND r.doc_access_target IN ({','.join('?' * len(allowed_access_targets))})"
+            params.extend(allowed_access_targets)
+        sql += " ORDER BY score LIMIT ?"
+        params.append(k)
+
+        with self._connect() as conn:
+            match_query = build_match_query(self._selective_terms(conn, terms))
+            if match_query is None:
+                return []
+            rows = conn.execute(sql, [match_query] + params).fetchall()
+        # FTS5's bm25() is negative (more negative = better); flip it so larger is better.
+        return [
+            (chunk_id, -score, Document(page_content=text, metadata=json.loads(metadata) if metadata else {}, id=chunk_id))
+            for chunk_id, text, metadata, score in rows
+        ]
+
+
+# Opened by model_lifecycle at startup (next to the vector store) rather than at import time.
+lexical_index: Optional[LexicalIndex] = None
+
+
+def init_lexical_index() -> LexicalIndex:
+    """Opens (creating if needed) the index at default_index_path(). Raises on failure."""
+    global lexical_index
+    lexical_index = LexicalIndex(
+        default_index_path(),
+        prune_max_df_ratio=settings.LEXICAL_PRUNE_MAX_DF_RATIO,
+        prune_min_chunks=settings.LEXICAL_PRUNE_MIN_CHUNKS
+    )
+    logger.info(f"Lexical (BM25) index ready at {lexical_index.path}")
+    return lexical_index
@@ -0,0 +1,107 @@
+# app/services/metrics.py
+"""
+Prometheus metrics for the RAG query and ingestion paths, exported at /metrics.
+Observations are a histogram bucket increment under a lock, cheap enough to leave on.
+This module only depends on prometheus_client; the langchain-side hooks that feed it
+live in instrumentation.py.
+"""
+import os
+import time
+from contextlib import contextmanager
+from typing import Iterator, Tuple
+
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+
+from . import profiling
+
+RAG_STAGES = ("embedding", "vector_search", "rerank", "llm", "postprocess", "total")
+INGESTION_STAGES = ("prepare", "embed", "write", "lexical_index", "total")
+
+RAG_STAGE_SECONDS = Histogram(
+    "rag_stage_seconds", "Time spent in each stage of a RAG query", ["stage"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+)
+RAG_QUERIES = Counter("rag_queries_total", "RAG queries by user role and outcome", ["role", "outcome"])
+RERANK_OUTCOMES = Counter(
+    "rag_rerank_total", "Cross-encoder rerank attempts: reranked, or fell back to retriever order on budget or error", ["outcome"]
+)
+LLM_IN_FLIGHT = Gauge("rag_llm_in_flight", "LLM calls currently in progress", multiprocess_mode="livesum")
+
+INGESTION_STAGE_SECONDS = Histogram(
+    "ingestion_stage_seconds", "Time spent in each stage of ingesting one document", ["stage"],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+)
+INGESTION_DOCUMENTS = Counter("ingestion_documents_total", "Documents processed by ingestion, by outcome", ["outcome"])
+INGESTION_CHUNKS = Counter("ingestion_chunks_total", "Chunks written by ingestion, embedded or reused from the store", ["kind"])
+INGESTION_DOCUMENT_CHUNKS = Histogram(
+    "ingestion_document_chunks", "Chunks per ingested document",
+    buckets=(1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+)
+
+NOTIFICATION_STREAM_CLIENTS = Gauge(
+    "notification_stream_clients", "Open GET /notifications/stream connections", multiprocess_mode="livesum"
+)
+NOTIFICATION_STREAM_EVENTS = Counter(
+    "notification_stream_events_total", "Notification events handed to stream clients, or dropped by disconnecting a slow client", ["outcome"]
+)
+
+for _stage in RAG_STAGES:
+    RAG_STAGE_SECONDS.labels(_stage) # Export every stage from the first scrape, not the first query
+for _stage in INGESTION_STAGES:
+    INGESTION_STAGE_SECONDS.labels(_stage)
+for _outcome in ("reranked", "budget_fallback", "error"):
+    RERANK_OUTCOMES.labels(_outcome)
+
+
+def observe_rag_stage(stage: str, seconds: float) -> None:
+    RAG_STAGE_SECONDS.labels(stage).observe(seconds)
+    profiling.record(stage, seconds)
+
+
+def observe_ingestion_stage(stage: str, seconds: float) -> None:
+    INGESTION_STAGE_SECONDS.labels(stage).observe(seconds)
+    profiling.record(f"ingest_{stage}", seconds)
+
+
+@contextmanager
+def rag_stage(stage: str) -> Iterator[None]:
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_rag_stage(stage, time.perf_counter() - start)
+
+
+@contextmanager
+def ingestion_stage(stage: str) -> Iterator[None]:
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_ingestion_stage(stage, time.perf_counter() - start)
+
+
+def record_query(role: str, outcome: str, started: float) -> None:
+    """Counts a finished query and observes its total time. outcome: answered, cached, unavailable or error."""
+    RAG_QUERIES.labels(role, outcome).inc()
+    observe_rag_stage("total", time.perf_counter() - started)
+
+
+def record_ingested_document(chunks: int, chunks_embedded: int, chunks_reused: int) -> None:
+    INGESTION_DOCUMENTS.labels("ingested").inc()
+    INGESTION_CHUNKS.labels("embedded").inc(chunks_embedded)
+    INGESTION_CHUNKS.labels("reused").inc(chunks_reused)
+    INGESTION_DOCUMENT_CHUNKS.observe(chunks)
+
+
+def render_latest() -> Tuple[bytes, str]:
+    """
+    Exposition payload and content type. With several worker processes, set PROMETHEUS_MULTIPROC_DIR
+    so every worker's samples are aggregated instead of only the one serving the scrape.
+    """
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -0,0 +1,134 @@
+# app/services/model_lifecycle.py
+"""
+Loads the embedding model, vector store, lexical index, LLM and (optionally) the reranker in a background
+thread at startup instead of at import time, then runs a warm-up embedding and vector search
+so the first real query does not pay for lazy initialization. Per-component state and load
+times back the /health/ready endpoint.
+"""
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+STATE_PENDING = "pending"
+STATE_LOADING = "loading"
+STATE_READY = "ready"
+STATE_FAILED = "failed"
+STATE_DISABLED = "disabled"
+
+COMPONENTS = ("embeddings", "lexical_index", "vector_store", "llm", "reranker", "warmup")
+
+RETRY_AFTER_S = 5 # Retry-After suggested to clients on 503s while models are still loading
+
+_lock = threading.Lock()
+_status: Dict[str, Dict[str, Any]] = {name: {"state": STATE_PENDING, "load_ms": None, "error": None} for name in COMPONENTS}
+_started = False
+_finished = threading.Event()
+_thread: Optional[threading.Thread] = None
+
+
+def _set(name: str, state: str, load_ms: Optional[float] = None, error: Optional[str] = None) -> None:
+    with _lock:
+        _status[name] = {"state": state, "load_ms": round(load_ms, 1) if load_ms is not None else None, "error": error}
+
+
+def _load(name: str, loader: Callable[[], Any]) -> bool:
+    _set(name, STATE_LOADING)
+    start = time.perf_counter()
+    try:
+        loader()
+    except Exception as e:
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        logger.exception(f"Model lifecycle: failed to load {name} after {elapsed_ms:.0f}ms: {e}")
+        _set(name, STATE_FAILED, elapsed_ms, str(e) or e.__class__.__name__)
+        return False
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    _set(name, STATE_READY, elapsed_ms)
+    logger.info(f"Model lifecycle: {name} ready in {elapsed_ms:.0f}ms.")
+    return True
+
+
+def _warm_up() -> None:
+    from . import rag_service
+    rag_service.embedding_function.embed_query("warm-up query")
+    rag_service.vector_store.similarity_search("warm-up query", k=1)
+
+
+def load_components() -> bool:
+    """Loads every component in the calling thread, recording state as it goes. Returns is_ready()."""
+    from . import file_processor, rag_service
+    from . import lexical_index as lexical_index_module
+    from . import reranker as reranker_module
+
+    store_loaded = False
+    _load("lexical_index", lexical_index_module.init_lexical_index) # Before the store, which checks it is in sync
+    if _load("embeddings", file_processor.init_embedding_function):
+        store_loaded = _load("vector_store", file_processor.init_vector_store)
+    else:
+        _set("vector_store", STATE_FAILED, error="embeddings not loaded")
+    _load("llm", rag_service.init_llm)
+    if settings.RERANK_ENABLED:
+        _load("reranker", reranker_module.init_reranker)
+    else:
+        _set("reranker", STATE_DISABLED)
+    rag_service.bind_components()
+
+    if not settings.MODEL_WARMUP_ENABLED:
+        _set("warmup", STATE_DISABLED)
+    elif store_loaded:
+        _load("warmup", _warm_up)
+    else:
+        _set("warmup", STATE_FAILED, error="vector store not loaded")
+    _finished.set()
+    logger.info(f"Model lifecycle: loading finished, ready={is_ready()}.")
+    return is_ready()
+
+
+def start_background_load() -> None:
+    """Starts load_components in a daemon thread; later calls are no-ops."""
+    global _started, _thread
+    with _lock:
+        if _started:
+            return
+        _started = True
+    _thread = threading.Thread(target=load_components, name="model-loader", daemon=True)
+    _thread.start()
+
+
+def ensure_loaded(timeout: Optional[float] = None) -> bool:
+    """
+    Loads in the calling thread if nothing has started loading yet (scripts, benchmarks);
+    otherwise waits up to `timeout` seconds for the background load. Returns is_ready().
+    """
+    global _started
+    with _lock:
+        started = _started
+        _started = True
+    if started:
+        _finished.wait(timeout)
+        return is_ready()
+    return load_components()
+
+
+def is_loading() -> bool:
+    return _started and not _finished.is_set()
+
+
+def state(name: str) -> str:
+    with _lock:
+        return _status[name]["state"]
+
+
+def is_ready() -> bool:
+    """True once every enabled component has loaded successfully."""
+    with _lock:
+        return all(status["state"] in (STATE_READY, STATE_DISABLED) for status in _status.values())
+
+
+def snapshot() -> Dict[str, Dict[str, Any]]:
+    with _lock:
+        return {name: dict(status) for name, status in _status.items()}
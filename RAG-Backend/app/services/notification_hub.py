@@ -0,0 +1,143 @@
+# app/services/notification_hub.py
+"""
+In-process pub/sub for GET /notifications/stream. create_notification publishes each new
+notification once; the hub hands it only to connected users whose level the notification targets
+(target_level 0 reaches every student level and admins).
+
+Every subscriber has a bounded queue. A client that falls behind is disconnected instead of
+buffering without limit, and its EventSource reconnects with Last-Event-ID. Event IDs are
+notification IDs, so a reconnect resumes from the in-memory replay buffer or, for longer gaps,
+from the notifications table.
+
+Publishers may run on any thread (ingestion workers, threadpool handlers); delivery happens on
+each subscriber's event loop. The hub is per process: with several API workers, a client only
+receives notifications created by the worker it is connected to.
+"""
+import asyncio
+import logging
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Set
+
+from ..core.config import settings
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+_CLOSED = None # Queue sentinel: the stream should end (overflow or shutdown)
+
+
+def _reaches_level(target_level: int, student_level: int) -> bool:
+    return target_level == 0 or target_level == student_level
+
+
+class Subscription:
+    def __init__(self, user_id: int, student_level: int, loop: asyncio.AbstractEventLoop, max_queue: int):
+        self.user_id = user_id
+        self.student_level = student_level
+        self.loop = loop
+        self.queue: "asyncio.Queue[Optional[Dict[str, Any]]]" = asyncio.Queue(maxsize=max(1, max_queue))
+        self.overflowed = False
+        self.closed = False
+
+    def _offer(self, event: Optional[Dict[str, Any]]) -> None:
+        """Runs on the subscriber's loop. A full queue ends the stream; the client resumes from its last event ID."""
+        if self.closed:
+            return
+        if event is _CLOSED:
+            self._close()
+            return
+        try:
+            self.queue.put_nowait(event)
+            metrics.NOTIFICATION_STREAM_EVENTS.labels("delivered").inc()
+        except asyncio.QueueFull:
+            self.overflowed = True
+            metrics.NOTIFICATION_STREAM_EVENTS.labels("overflow").inc()
+            logger.warning(f"Notification stream for user ID {self.user_id} fell {self.queue.qsize()} events behind; disconnecting it.")
+            self._close()
+
+    def _close(self) -> None:
+        self.closed = True
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(_CLOSED)
+
+    async def get(self) -> Optional[Dict[str, Any]]:
+        return await self.queue.get()
+
+
+class NotificationHub:
+    def __init__(self, replay_size: int):
+        self._lock = threading.Lock()
+        self._subscribers: Dict[int, Set[Subscription]] = {} # student level -> subscriptions
+        self._recent: Deque[Dict[str, Any]] = deque(maxlen=max(1, replay_size))
+
+    def subscribe(self, user_id: int, student_level: int) -> Subscription:
+        """Must be called from the event loop that will consume the subscription."""
+        subscription = Subscription(user_id, student_level, asyncio.get_running_loop(), settings.NOTIFICATION_STREAM_QUEUE_SIZE)
+        with self._lock:
+            self._subscribers.setdefault(student_level, set()).add(subscription)
+        metrics.NOTIFICATION_STREAM_CLIENTS.inc()
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            level_subscribers = self._subscribers.get(subscription.student_level)
+            if level_subscribers is None or subscription not in level_subscribers:
+                return
+            level_subscribers.discard(subscription)
+        subscription.closed = True
+        metrics.NOTIFICATION_STREAM_CLIENTS.dec()
+
+    def publish(self, event: Dict[str, Any]) -> int:
+        """
+        Fans a notification event ({"id", "target_level", ...}) out to matching subscribers and keeps it
+        for replay. Thread-safe and non-blocking. Returns the number of subscribers it was handed to.
+        """
+        target_level = event["target_level"]
+        with self._lock:
+            self._recent.append(event)
+            recipients = [
+                subscription
+                for level, level_subscribers in self._subscribers.items() if _reaches_level(target_level, level)
+                for subscription in level_subscribers
+            ]
+        for subscription in recipients:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription._offer, event)
+            except RuntimeError: # Loop already closed; the stream is gone
+                self.unsubscribe(subscription)
+        return len(recipients)
+
+    def replay_since(self, last_event_id: int, student_level: int) -> Optional[List[Dict[str, Any]]]:
+        """
+        Buffered events after last_event_id for the level, oldest first, or None if the buffer cannot prove
+        it holds every notification since then (the caller then reads the gap from the database).
+        """
+        with self._lock:
+            recent = sorted(self._recent, key=lambda event: event["id"])
+        if not recent or recent[0]["id"] > last_event_id + 1:
+            return None
+        missed = [event for event in recent if event["id"] > last_event_id]
+        # The buffer can skip IDs (created by another worker process, a rolled-back insert, or publishes
+        # racing out of ID order), so only an unbroken run of IDs after last_event_id is trusted.
+        if any(event["id"] != last_event_id + 1 + offset for offset, event in enumerate(missed)):
+            return None
+        return [event for event in missed if _reaches_level(event["target_level"], student_level)]
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return sum(len(level_subscribers) for level_subscribers in self._subscribers.values())
+
+    def close_all(self) -> None:
+        """Ends every open stream (application shutdown)."""
+        with self._lock:
+            subscriptions = [subscription for level_subscribers in self._subscribers.values() for subscription in level_subscribers]
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription._offer, _CLOSED)
+            except RuntimeError:
+                pass
+
+
+hub = NotificationHub(replay_size=settings.NOTIFICATION_STREAM_REPLAY_SIZE)
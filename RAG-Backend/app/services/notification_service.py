@@ -3,14 +3,18 @@ import logging
 from typing import List, Optional, Union
 from datetime import datetime, timezone # <-- IMPORT timezone HERE
 
+from sqlalchemy import DateTime, and_, exists, func, insert, literal, select, update
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.orm import Session
-# from sqlalchemy.sql import func # func is not used in the latest version of this file
 
 from ..db import models, schemas # Import your DB models and Pydantic schemas
 from ..core.config import settings # If needed for any settings
+from . import profiling
+from .notification_hub import hub as notification_hub
 
 logger = logging.getLogger(__name__)
 
+@profiling.profiled("notifications_create")
 def create_notification(
     db: Session,
     message: str,
@@ -39,11 +43,111 @@ def create_notification(
         # timestamp is handled by server_default=func.now() in the model
     )
     db.add(db_notification)
+    _increment_counter(db, target_level_db)
     db.commit()
     db.refresh(db_notification)
     logger.info(f"Notification created: ID={db_notification.id}, TargetLevel={db_notification.target_level}, DocID={db_notification.document_internal_id}")
+    try:
+        notification_hub.publish(to_stream_event(db_notification))
+    except Exception as e_publish: # Push is best effort; the notification is stored and pollable
+        logger.error(f"Failed to publish notification {db_notification.id} to stream clients: {e_publish}")
     return db_notification
 
+
+def to_stream_event(notification: models.Notification) -> dict:
+    """JSON-ready NotificationDisplay fields for the push stream (new notifications are unseen by definition)."""
+    return schemas.NotificationDisplay(
+        id=notification.id,
+        message=notification.message,
+        target_level=notification.target_level,
+        document_internal_id=notification.document_internal_id,
+        timestamp=notification.timestamp,
+        is_seen=False
+    ).model_dump(mode="json")
+
+
+def get_notifications_since(db: Session, last_event_id: int, student_level: int, limit: int) -> List[dict]:
+    """Stream events for notifications after last_event_id relevant to the level, oldest first (stream resume)."""
+    notifications = db.query(models.Notification).filter(
+        models.Notification.id > last_event_id, _relevant_to_level(student_level)
+    ).order_by(models.Notification.id).limit(limit).all()
+    return [to_stream_event(notification) for notification in notifications]
+
+
+# --- Read Model ---
+# Each user has a watermark (NotificationReadState.last_seen_id): every relevant notification with
+# id <= watermark is seen. Notifications read out of order above it are NotificationReadException rows,
+# folded into the watermark once everything below them is read. Per-level NotificationCounter totals
+# minus the user's seen_count give the unread count without touching the notifications table.
+
+def _relevant_to_level(student_level: int):
+    """Filter on notifications visible to a student level (level 0: only those for all students)."""
+    return (models.Notification.target_level == 0) | (models.Notification.target_level == student_level)
+
+
+def _increment_counter(db: Session, target_level: int) -> None:
+    counter_table = models.NotificationCounter.__table__
+    updated = db.execute(
+        update(counter_table).where(counter_table.c.target_level == target_level).values(total=counter_table.c.total + 1)
+    ).rowcount
+    if not updated:
+        db.add(models.NotificationCounter(target_level=target_level, total=1))
+
+
+def ensure_notification_counters(db: Session) -> None:
+    """Seeds the per-level counters from the notifications table if they have never been filled (e.g. after an upgrade)."""
+    if db.query(models.NotificationCounter).first() is not None:
+        return
+    totals = db.query(models.Notification.target_level, func.count(models.Notification.id)).group_by(models.Notification.target_level).all()
+    if not totals:
+        return
+    db.add_all([models.NotificationCounter(target_level=level, total=total) for level, total in totals])
+    db.commit()
+    logger.info(f"Seeded notification counters: {dict(totals)}")
+
+
+def _relevant_total(db: Session, student_level: int) -> int:
+    levels = {0, student_level}
+    total = db.query(func.sum(models.NotificationCounter.total)).filter(models.NotificationCounter.target_level.in_(levels)).scalar()
+    return int(total or 0)
+
+
+def _count_seen(db: Session, user_id: int, student_level: int, last_seen_id: int) -> int:
+    """Recounts seen notifications from scratch (only needed after a level change or migration)."""
+    below = db.query(func.count(models.Notification.id)).filter(
+        _relevant_to_level(student_level), models.Notification.id <= last_seen_id
+    ).scalar()
+    above = db.query(func.count(models.NotificationReadException.notification_id)).join(
+        models.Notification, models.Notification.id == models.NotificationReadException.notification_id
+    ).filter(
+        models.NotificationReadException.user_id == user_id,
+        models.NotificationReadException.notification_id > last_seen_id,
+        _relevant_to_level(student_level)
+    ).scalar()
+    return int(below or 0) + int(above or 0)
+
+
+def _get_read_state(db: Session, user_id: int, student_level: int, create: bool = False) -> Optional[models.NotificationReadState]:
+    """
+    Loads the user's read state (creating it if asked). If the user's level changed since it was
+    written, seen_count is recomputed for the new level; notifications below the watermark stay read.
+    Flushes but does not commit.
+    """
+    state = db.get(models.NotificationReadState, user_id)
+    if state is None:
+        if not create:
+            return None
+        state = models.NotificationReadState(user_id=user_id, last_seen_id=0, student_level=student_level, seen_count=0)
+        db.add(state)
+        db.flush()
+    elif state.student_level != student_level:
+        state.seen_count = _count_seen(db, user_id, student_level, state.last_seen_id)
+        state.student_level = student_level
+        db.flush()
+    return state
+
+
+@profiling.profiled("notifications_list")
 def get_notifications_for_student(
     db: Session,
     user_id: int,
@@ -56,28 +160,30 @@ def get_notifications_for_student(
     - target_level matching student_level.
     - By default, only returns unseen notifications unless fetch_seen is True.
     """
-    relevant_notifications_query = db.query(
-        models.Notification,
-        models.UserNotificationStatus.is_seen
-    ).outerjoin(
-        models.UserNotificationStatus,
-        (models.Notification.id == models.UserNotificationStatus.notification_id) &
-        (models.UserNotificationStatus.user_id == user_id)
-    ).filter(
-        (models.Notification.target_level == 0) | # For all students
-        (models.Notification.target_level == student_level)
+    state = db.get(models.NotificationReadState, user_id)
+    last_seen_id = state.last_seen_id if state else 0
+    exceptions_query = select(models.NotificationReadException.notification_id).where(
+        models.NotificationReadException.user_id == user_id,
+        models.NotificationReadException.notification_id > last_seen_id
+    )
+
+    relevant_notifications_query = db.query(models.Notification).filter(
+        _relevant_to_level(student_level)
     ).order_by(models.Notification.timestamp.desc())
 
-    if not fetch_seen:
+    if fetch_seen:
+        seen_above_watermark = set(db.execute(exceptions_query).scalars().all())
+    else:
+        seen_above_watermark = set()
         relevant_notifications_query = relevant_notifications_query.filter(
-            (models.UserNotificationStatus.is_seen == False) |
-            (models.UserNotificationStatus.is_seen == None)
+            models.Notification.id > last_seen_id,
+            ~models.Notification.id.in_(exceptions_query)
         )
     
     results = relevant_notifications_query.all()
 
     notifications_display = []
-    for notification, is_seen_status in results:
+    for notification in results:
         notifications_display.append(
             schemas.NotificationDisplay(
                 id=notification.id,
@@ -85,49 +191,169 @@ def get_notifications_for_student(
                 target_level=notification.target_level,
                 document_internal_id=notification.document_internal_id,
                 timestamp=notification.timestamp,
-                is_seen=is_seen_status if is_seen_status is not None else False
+                is_seen=notification.id <= last_seen_id or notification.id in seen_above_watermark
             )
         )
     logger.info(f"Fetched {len(notifications_display)} notifications for student ID {user_id} (Level {student_level}), fetch_seen={fetch_seen}.")
     return notifications_display
 
 
+@profiling.profiled("notifications_unread_count")
+def get_unread_count(db: Session, user_id: int, student_level: int) -> int:
+    """Number of unseen notifications for the user: two primary-key lookups, independent of history size."""
+    state = db.get(models.NotificationReadState, user_id)
+    if state is not None and state.student_level != student_level:
+        state = _get_read_state(db, user_id, student_level) # Recounts for the new level
+        db.commit()
+    return max(0, _relevant_total(db, student_level) - (state.seen_count if state else 0))
+
+
+def _insert_exceptions(db: Session, user_id: int, notification_filter, last_seen_id: int) -> int:
+    """
+    Records every relevant notification above the watermark that matches notification_filter and is
+    not yet seen, in one INSERT ... SELECT. Returns the number of newly seen notifications.
+    """
+    exception_table = models.NotificationReadException.__table__
+    now = literal(datetime.now(timezone.utc), DateTime(timezone=True))
+    source = select(literal(user_id), models.Notification.id, now).where(
+        notification_filter,
+        models.Notification.id > last_seen_id,
+        ~exists().where(and_(exception_table.c.user_id == user_id, exception_table.c.notification_id == models.Notification.id))
+    )
+    statement_insert = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}.get(db.get_bind().dialect.name)
+    if statement_insert is not None:
+        statement = statement_insert(exception_table).from_select(["user_id", "notification_id", "seen_at"], source).on_conflict_do_nothing()
+    else:
+        statement = insert(exception_table).from_select(["user_id", "notification_id", "seen_at"], source)
+    return db.execute(statement).rowcount
+
+
+def _advance_watermark(db: Session, state: models.NotificationReadState) -> None:
+    """Moves the watermark up to just below the oldest unseen relevant notification and drops the exceptions it covers."""
+    exception_table = models.NotificationReadException.__table__
+    oldest_unseen = db.query(func.min(models.Notification.id)).filter(
+        _relevant_to_level(state.student_level),
+        models.Notification.id > state.last_seen_id,
+        ~exists().where(and_(exception_table.c.user_id == state.user_id, exception_table.c.notification_id == models.Notification.id))
+    ).scalar()
+    if oldest_unseen is not None:
+        watermark = oldest_unseen - 1
+    else:
+        watermark = db.query(func.max(models.Notification.id)).scalar() or 0
+    if watermark <= state.last_seen_id:
+        return
+    state.last_seen_id = watermark
+    db.query(models.NotificationReadException).filter(
+        models.NotificationReadException.user_id == state.user_id,
+        models.NotificationReadException.notification_id <= watermark
+    ).delete(synchronize_session=False)
+
+
+@profiling.profiled("notifications_mark_seen")
 def mark_notifications_as_seen(
     db: Session,
     user_id: int,
-    notification_ids: List[int]
+    notification_ids: List[int],
+    student_level: int
 ) -> bool:
     """
     Marks a list of notifications as seen for a specific user.
-    Creates or updates UserNotificationStatus records.
+    Uses a constant number of statements; IDs not relevant to the student level are ignored.
     Returns True if successful, False otherwise.
     """
     if not notification_ids:
         return True 
 
     try:
-        for notification_id in notification_ids:
-            status_record = db.query(models.UserNotificationStatus).filter(
-                models.UserNotificationStatus.user_id == user_id,
-                models.UserNotificationStatus.notification_id == notification_id
-            ).first()
-
-            if status_record:
-                if not status_record.is_seen:
-                    status_record.is_seen = True
-                    status_record.seen_at = datetime.now(timezone.utc) # timezone.utc is now defined
-            else:
-                new_status = models.UserNotificationStatus(
-                    user_id=user_id,
-                    notification_id=notification_id,
-                    is_seen=True,
-                    seen_at=datetime.now(timezone.utc) # timezone.utc is now defined
-                )
-                db.add(new_status)
+        state = _get_read_state(db, user_id, student_level, create=True)
+        newly_seen = _insert_exceptions(
+            db, user_id, _relevant_to_level(student_level) & models.Notification.id.in_(set(notification_ids)), state.last_seen_id
+        )
+        state.seen_count += newly_seen
+        _advance_watermark(db, state)
+        state.updated_at = datetime.now(timezone.utc)
         db.commit()
-        logger.info(f"Marked {len(notification_ids)} notifications as seen for user ID {user_id}.")
+        logger.info(f"Marked {len(notification_ids)} notifications as seen for user ID {user_id} ({newly_seen} newly seen, watermark {state.last_seen_id}).")
         return True
     except Exception as e:
         db.rollback()
         logger.exception(f"Error marking notifications as seen for user ID {user_id}: {e}")
         return False
+
+
+@profiling.profiled("notifications_mark_all_seen")
+def mark_all_notifications_as_seen(
+    db: Session,
+    user_id: int,
+    student_level: int
+) -> Optional[int]:
+    """
+    Marks every notification relevant to the student level as seen for the user by moving the
+    watermark to the newest notification. Returns the number of notifications newly marked, or None on error.
+    """
+    try:
+        state = _get_read_state(db, user_id, student_level, create=True)
+        # One statement reads the newest ID and counts relevant notifications up to it, so a notification
+        # created concurrently is either below the watermark and counted, or above it and still unread.
+        newest_id = db.query(func.max(models.Notification.id)).scalar_subquery()
+        relevant_seen, watermark = db.query(func.count(models.Notification.id), newest_id).filter(
+            _relevant_to_level(student_level), models.Notification.id <= newest_id
+        ).one()
+        newly_seen = max(0, relevant_seen - state.seen_count)
+        state.last_seen_id = max(state.last_seen_id, watermark or 0)
+        state.seen_count = relevant_seen
+        state.updated_at = datetime.now(timezone.utc)
+        db.query(models.NotificationReadException).filter(
+            models.NotificationReadException.user_id == user_id
+        ).delete(synchronize_session=False)
+        db.commit()
+        logger.info(f"Marked all notifications as seen for user ID {user_id} (Level {student_level}): {newly_seen} newly seen.")
+        return newly_seen
+    except Exception as e:
+        db.rollback()
+        logger.exception(f"Error marking all notifications as seen for user ID {user_id}: {e}")
+        return None
+
+
+def migrate_legacy_read_status(db: Session) -> int:
+    """
+    Converts seen rows of the legacy user_notification_status table into watermarks and exceptions.
+    Users that already have a read state are skipped, so this is safe to run more than once; when none
+    are left (every startup after the first) it returns after a single EXISTS query.
+    Returns the number of users migrated.
+    """
+    legacy_status = models.UserNotificationStatus
+    read_state_table = models.NotificationReadState.__table__
+    unmigrated = and_(
+        legacy_status.is_seen == True,
+        ~exists().where(read_state_table.c.user_id == legacy_status.user_id)
+    )
+    if not db.query(exists().where(unmigrated)).scalar():
+        return 0
+    ensure_notification_counters(db)
+    seen_by_user = {}
+    for user_id, notification_id in db.query(legacy_status.user_id, legacy_status.notification_id).filter(unmigrated):
+        seen_by_user.setdefault(user_id, set()).add(notification_id)
+
+    newest_id = db.query(func.max(models.Notification.id)).scalar() or 0
+    relevant_ids_by_level = {}
+    now = datetime.now(timezone.utc)
+    for user in db.query(models.User).filter(models.User.id.in_(list(seen_by_user))):
+        level = user.level if user.role == "student" and user.level is not None else 0
+        if level not in relevant_ids_by_level:
+            relevant_ids_by_level[level] = [row[0] for row in db.query(models.Notification.id).filter(_relevant_to_level(level)).order_by(models.Notification.id)]
+        relevant_ids = relevant_ids_by_level[level]
+        seen = seen_by_user[user.id]
+        oldest_unseen = next((notification_id for notification_id in relevant_ids if notification_id not in seen), None)
+        watermark = newest_id if oldest_unseen is None else oldest_unseen - 1
+        seen_relevant = [notification_id for notification_id in relevant_ids if notification_id in seen]
+        db.add(models.NotificationReadState(
+            user_id=user.id, last_seen_id=watermark, student_level=level, seen_count=len(seen_relevant), updated_at=now
+        ))
+        db.add_all([
+            models.NotificationReadException(user_id=user.id, notification_id=notification_id, seen_at=now)
+            for notification_id in seen_relevant if notification_id > watermark
+        ])
+    db.commit()
+    logger.info(f"Migrated notification read status of {len(seen_by_user)} users to read watermarks.")
+    return len(seen_by_user)
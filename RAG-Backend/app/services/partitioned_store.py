@@ -0,0 +1,238 @@
+# app/services/partitioned_store.py
+import logging
+import re
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from langchain_chroma import Chroma
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+logger = logging.getLogger(__name__)
+
+ACCESS_TARGET_KEY = "doc_access_target"
+_PARTITION_REFRESH_S = 5.0 # How often to look for partitions created by other processes
+
+
+def partition_name(base_name: str, doc_access_target: str) -> str:
+    """Chroma collection name for one access target, e.g. rag_docs__level_2."""
+    return f"{base_name}__{re.sub(r'[^A-Za-z0-9_-]', '_', doc_access_target)}"
+
+
+def stored_collection_names(client: Any, base_name: str) -> List[str]:
+    """Names of the single collection and/or its access-target partitions that exist in a Chroma client."""
+    names = [c if isinstance(c, str) else c.name for c in client.list_collections()]
+    return sorted(name for name in names if name == base_name or name.startswith(f"{base_name}__"))
+
+
+def _targets_from_filter(search_filter: Optional[Dict[str, Any]]) -> Tuple[Optional[List[str]], Optional[Dict[str, Any]]]:
+    """
+    Splits a metadata filter into (access targets to route to, remaining per-partition filter).
+    Targets are None when the filter does not restrict doc_access_target (search every partition).
+    """
+    if not search_filter:
+        return None, None
+    if list(search_filter) == [ACCESS_TARGET_KEY]:
+        condition = search_filter[ACCESS_TARGET_KEY]
+        if isinstance(condition, dict) and list(condition) == ["$in"]:
+            return list(condition["$in"]), None
+        if isinstance(condition, str):
+            return [condition], None
+    if list(search_filter) == ["$and"]:
+        remaining = [clause for clause in search_filter["$and"] if list(clause) != [ACCESS_TARGET_KEY]]
+        routed = [clause[ACCESS_TARGET_KEY] for clause in search_filter["$and"] if list(clause) == [ACCESS_TARGET_KEY]]
+        if len(routed) == 1 and isinstance(routed[0], str):
+            rest = remaining[0] if len(remaining) == 1 else ({"$and": remaining} if remaining else None)
+            return [routed[0]], rest
+    return None, search_filter
+
+
+class PartitionedVectorStore(VectorStore):
+    """
+    One Chroma collection per doc_access_target instead of one collection filtered with `$in`.
+    Writes are routed by each chunk's doc_access_target; searches fan out in parallel to the
+    allowed partitions (or all of them when unfiltered) and merge the per-partition top-k by distance.
+    All partitions share one embedding function and distance space, so distances are comparable.
+    """
+
+    def __init__(self, base_name: str, embedding_function: Embeddings, persist_directory: str, max_workers: int = 8):
+        import chromadb
+        self.base_name = base_name
+        self._embedding_function = embedding_function
+        self._client = chromadb.PersistentClient(path=persist_directory)
+        self._partitions: Dict[str, Chroma] = {}
+        self._known_names: set = set()
+        self._lock = threading.Lock()
+        self._last_refresh = 0.0
+        self._executor = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="chroma-partition")
+        self._refresh_partitions(force=True)
+
+    @property
+    def embeddings(self) -> Optional[Embeddings]:
+        return self._embedding_function
+
+    # --- Partition bookkeeping ---
+    def _open_partition(self, doc_access_target: str) -> Chroma:
+        return Chroma(
+            client=self._client,
+            collection_name=partition_name(self.base_name, doc_access_target),
+            embedding_function=self._embedding_function
+        )
+
+    def _refresh_partitions(self, force: bool = False) -> None:
+        now = time.monotonic()
+        if not force and now - self._last_refresh < _PARTITION_REFRESH_S:
+            return
+        prefix = f"{self.base_name}__"
+        with self._lock:
+            self._last_refresh = now
+            for collection in self._client.list_collections():
+                name = collection if isinstance(collection, str) else collection.name
+                if not name.startswith(prefix) or name in self._known_names:
+                    continue
+                # Recover the target from any stored chunk; names are sanitized and may not round-trip.
+                sample = self._client.get_collection(name, embedding_function=None).get(limit=1, include=["metadatas"])
+                metadatas = sample.get("metadatas") or []
+                target = (metadatas[0] or {}).get(ACCESS_TARGET_KEY) if metadatas else None
+                if target:
+                    self._known_names.add(name)
+                    if target not in self._partitions:
+                        self._partitions[target] = self._open_partition(target)
+                elif metadatas:
+                    # Chunks without a target (e.g. an older migration's __unassigned partition): register the
+                    # collection under its name suffix, which no user's allowed targets include, so only the
+                    # unfiltered admin search reaches it.
+                    self._known_names.add(name)
+                    self._partitions.setdefault(name[len(prefix):], Chroma(
+                        client=self._client, collection_name=name, embedding_function=self._embedding_function
+                    ))
+
+    def partition(self, doc_access_target: str, create: bool = True) -> Optional[Chroma]:
+        with self._lock:
+            store = self._partitions.get(doc_access_target)
+            if store is None and create:
+                store = self._partitions[doc_access_target] = self._open_partition(doc_access_target)
+                self._known_names.add(partition_name(self.base_name, doc_access_target))
+                logger.info(f"Created vector store partition '{partition_name(self.base_name, doc_access_target)}'.")
+        return store
+
+    def partitions(self, doc_access_targets: Optional[Iterable[str]] = None) -> Dict[str, Chroma]:
+        self._refresh_partitions()
+        with self._lock:
+            if doc_access_targets is None:
+                return dict(self._partitions)
+            return {target: self._partitions[target] for target in doc_access_targets if target in self._partitions}
+
+    # --- Writes ---
+    def upsert_embeddings(self, ids: List[str], texts: List[str], metadatas: List[Dict[str, Any]], embeddings: List[List[float]]) -> None:
+        """Writes pre-computed embeddings, routing each chunk to its access target's partition."""
+        grouped: Dict[str, List[int]] = {}
+        for i, metadata in enumerate(metadatas):
+            grouped.setdefault(metadata[ACCESS_TARGET_KEY], []).append(i)
+        for target, idx in grouped.items():
+            self.partition(target)._collection.upsert(
+                ids=[ids[i] for i in idx],
+                embeddings=[embeddings[i] for i in idx],
+                metadatas=[metadatas[i] for i in idx],
+                documents=[texts[i] for i in idx]
+            )
+
+    def add_texts(self, texts: Iterable[str], metadatas: Optional[List[dict]] = None, ids: Optional[List[str]] = None, **kwargs: Any) -> List[str]:
+        texts = list(texts)
+        if not metadatas or not ids:
+            raise ValueError("PartitionedVectorStore.add_texts needs ids and metadatas with doc_access_target.")
+        self.upsert_embeddings(ids, texts, metadatas, self._embedding_function.embed_documents(texts))
+        return ids
+
+    def delete(self, ids: Optional[List[str]] = None, **kwargs: Any) -> None:
+        for store in self.partitions().values():
+            store.delete(ids=ids, **kwargs)
+
+    # --- Reads ---
+    def get(self, ids: Optional[List[str]] = None, where: Optional[Dict[str, Any]] = None, limit: Optional[int] = None,
+            offset: Optional[int] = None, where_document: Optional[Dict[str, Any]] = None,
+            include: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Same shape as Chroma.get, merged across the partitions the where clause can match. Partitions are
+        read in target order and offset/limit are consumed across them, so paging walks the merged result.
+        """
+        targets, remaining = _targets_from_filter(where)
+        merged: Dict[str, List[Any]] = {"ids": [], "embeddings": [], "documents": [], "metadatas": []}
+        to_skip = offset or 0
+        for _, store in sorted(self.partitions(targets).items()):
+            wanted = None if limit is None else limit - len(merged["ids"])
+            if wanted is not None and wanted <= 0:
+                break
+            result = store.get(ids=ids, where=remaining, limit=wanted, offset=to_skip or None, where_document=where_document, include=include)
+            if to_skip:
+                if result["ids"]:
+                    to_skip = 0 # Rows past the offset exist here, so it was used up in this partition
+                else: # The whole partition was skipped; carry the rest of the offset to the next one
+                    to_skip -= len(store.get(ids=ids, where=remaining, where_document=where_document, include=[])["ids"])
+                    to_skip = max(to_skip, 0)
+                    continue
+            for key in merged:
+                values = result.get(key)
+                if values is not None:
+                    merged[key].extend(values.tolist() if hasattr(values, "tolist") else values)
+        return {key: values if values or key == "ids" else None for key, values in merged.items()}
+
+    def count(self) -> int:
+        return sum(store._collection.count() for store in self.partitions().values())
+
+    def peek(self, limit: int = 10) -> Dict[str, Any]:
+        for store in self.partitions().values():
+            sample = store._collection.peek(limit=limit)
+            if sample.get("ids"):
+                return sample
+        return {"ids": [], "embeddings": None}
+
+    def similarity_search_by_vector_with_score(self, embedding: List[float], k: int = 4,
+                                               filter: Optional[Dict[str, Any]] = None) -> List[Tuple[Document, float]]:
+        """Searches each allowed partition in parallel and returns the global top-k as (doc, distance), nearest first."""
+        targets, remaining = _targets_from_filter(filter)
+        stores = list(self.partitions(targets).values())
+        if not stores:
+            return []
+
+        def search(store: Chroma) -> List[Tuple[Document, float]]:
+            if store._collection.count() == 0:
+                return []
+            return store.similarity_search_by_vector_with_relevance_scores(embedding, k=k, filter=remaining)
+
+        if len(stores) == 1:
+            results = search(stores[0])
+        else:
+            results = [hit for hits in self._executor.map(search, stores) for hit in hits]
+        return sorted(results, key=lambda hit: hit[1])[:k]
+
+    def similarity_search_with_score(self, query: str, k: int = 4, filter: Optional[Dict[str, Any]] = None,
+                                     **kwargs: Any) -> List[Tuple[Document, float]]:
+        return self.similarity_search_by_vector_with_score(self._embedding_function.embed_query(query), k=k, filter=filter)
+
+    def similarity_search(self, query: str, k: int = 4, filter: Optional[Dict[str, Any]] = None, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k=k, filter=filter)]
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4, filter: Optional[Dict[str, Any]] = None,
+                                    **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_by_vector_with_score(embedding, k=k, filter=filter)]
+
+    @classmethod
+    def from_texts(cls, texts: List[str], embedding: Embeddings, metadatas: Optional[List[dict]] = None,
+                   ids: Optional[List[str]] = None, collection_name: Optional[str] = None,
+                   persist_directory: Optional[str] = None, **kwargs: Any) -> "PartitionedVectorStore":
+        """
+        Builds a store in collection_name/persist_directory (Chroma.from_texts keywords) and routes the
+        texts through add_texts. Every metadata dict needs a doc_access_target; missing ids become UUIDs.
+        """
+        if not collection_name or not persist_directory:
+            raise ValueError("PartitionedVectorStore.from_texts needs collection_name and persist_directory.")
+        store = cls(collection_name, embedding, persist_directory, **kwargs)
+        texts = list(texts)
+        if texts:
+            store.add_texts(texts, metadatas=metadatas, ids=ids or [str(uuid.uuid4()) for _ in texts])
+        return store
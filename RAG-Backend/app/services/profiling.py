@@ -0,0 +1,235 @@
+# app/services/profiling.py
+"""
+Opt-in per-request profiling (PROFILING_ENABLED, admin requests with an X-Profile header).
+A RequestProfile collects stage durations for one request, which the middleware in main.py
+returns as a Server-Timing header. In "flame" mode, a sampling thread also records the
+stacks of the threads working on the request, in collapsed-stack format
+("frame;frame;frame count"), which flamegraph.pl, speedscope and inferno can read.
+Finished profiles are kept in a small in-memory store served by /admin/profiles.
+
+When no profile is active, each hook costs one ContextVar lookup.
+"""
+import asyncio
+import contextvars
+import functools
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from ..core.config import settings
+
+MODE_TIMING = "timing"
+MODE_FLAME = "flame"
+
+_current: contextvars.ContextVar[Optional["RequestProfile"]] = contextvars.ContextVar("request_profile", default=None)
+_reports: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+_reports_lock = threading.Lock()
+_deferred: Dict[str, str] = {} # Work queued by a profiled request (e.g. ingestion jobs) -> mode
+_deferred_lock = threading.Lock()
+
+
+class _Sampler(threading.Thread):
+    """Samples the stacks of the profile's active threads every interval_s."""
+
+    def __init__(self, profile: "RequestProfile", interval_s: float):
+        super().__init__(name=f"profiler-{profile.id[:8]}", daemon=True)
+        self.profile = profile
+        self.interval_s = interval_s
+        self.stacks: Dict[str, int] = {}
+        self.samples = 0
+        self._stop_event = threading.Event()
+
+    def run(self) -> None:
+        while not self._stop_event.wait(self.interval_s):
+            frames = sys._current_frames()
+            for thread_id, thread_name in self.profile.active_threads():
+                frame = frames.get(thread_id)
+                if frame is None:
+                    continue
+                stack: List[str] = []
+                while frame is not None:
+                    stack.append(f"{os.path.basename(frame.f_code.co_filename)}:{frame.f_code.co_name}")
+                    frame = frame.f_back
+                key = ";".join([thread_name] + stack[::-1])
+                self.stacks[key] = self.stacks.get(key, 0) + 1
+                self.samples += 1
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        self.join(timeout=1.0)
+
+    def collapsed(self) -> str:
+        return "\n".join(f"{stack} {count}" for stack, count in sorted(self.stacks.items()))
+
+
+class RequestProfile:
+    def __init__(self, mode: str, label: str, profile_id: Optional[str] = None):
+        self.id = profile_id or uuid.uuid4().hex
+        self.mode = mode
+        self.label = label
+        self.started = time.perf_counter()
+        self.elapsed_s: Optional[float] = None
+        self.stages: Dict[str, List[float]] = {} # name -> [total seconds, count]
+        self._threads: Dict[int, List[Any]] = {} # thread id -> [name, active span depth]
+        self._lock = threading.Lock()
+        self._sampler: Optional[_Sampler] = None
+
+    def record(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            totals = self.stages.setdefault(stage, [0.0, 0])
+            totals[0] += seconds
+            totals[1] += 1
+
+    def enter_thread(self) -> None:
+        thread = threading.current_thread()
+        with self._lock:
+            entry = self._threads.setdefault(thread.ident, [thread.name, 0])
+            entry[1] += 1
+
+    def exit_thread(self) -> None:
+        with self._lock:
+            entry = self._threads.get(threading.get_ident())
+            if entry is not None:
+                entry[1] -= 1
+
+    def active_threads(self) -> List[tuple]:
+        with self._lock:
+            return [(thread_id, name) for thread_id, (name, depth) in self._threads.items() if depth > 0]
+
+    def server_timing(self) -> str:
+        """Server-Timing header value, e.g. 'embedding;dur=4.1;desc="2 calls", llm;dur=812.0, request;dur=830.2'."""
+        with self._lock:
+            stages = sorted(self.stages.items(), key=lambda item: item[1][0], reverse=True)
+        parts = []
+        for name, (seconds, count) in stages:
+            part = f"{name};dur={seconds * 1000:.1f}"
+            parts.append(part + (f';desc="{count} calls"' if count > 1 else ""))
+        elapsed = self.elapsed_s if self.elapsed_s is not None else time.perf_counter() - self.started
+        parts.append(f"request;dur={elapsed * 1000:.1f}")
+        return ", ".join(parts)
+
+    def report(self) -> Dict[str, Any]:
+        with self._lock:
+            stages = {name: {"ms": round(seconds * 1000, 3), "count": count} for name, (seconds, count) in self.stages.items()}
+        return {
+            "id": self.id,
+            "label": self.label,
+            "mode": self.mode,
+            "total_ms": round((self.elapsed_s or 0.0) * 1000, 3),
+            "stages": stages,
+            "samples": self._sampler.samples if self._sampler else 0,
+            "sample_interval_ms": settings.PROFILING_SAMPLE_INTERVAL_MS if self._sampler else None,
+            "flamegraph": self._sampler.collapsed() if self._sampler else None,
+        }
+
+
+def current() -> Optional[RequestProfile]:
+    return _current.get()
+
+
+def start(mode: str, label: str, profile_id: Optional[str] = None) -> RequestProfile:
+    """Makes a new profile current for this context (and tasks/threads that copy it) and registers the calling thread."""
+    profile = RequestProfile(mode, label, profile_id)
+    profile._token = _current.set(profile)
+    profile.enter_thread()
+    if mode == MODE_FLAME:
+        profile._sampler = _Sampler(profile, max(0.001, settings.PROFILING_SAMPLE_INTERVAL_MS / 1000))
+        profile._sampler.start()
+    return profile
+
+
+def finish(profile: RequestProfile) -> Dict[str, Any]:
+    """Stops sampling, stores the report and returns it. Safe to call from another context than start()."""
+    if profile.elapsed_s is None:
+        profile.elapsed_s = time.perf_counter() - profile.started
+    profile.exit_thread()
+    if profile._sampler is not None:
+        profile._sampler.stop()
+    try:
+        _current.reset(profile._token)
+    except ValueError:
+        pass # Finished from a different context (e.g. after a streamed body); nothing to reset here
+    report = profile.report()
+    with _reports_lock:
+        _reports[profile.id] = report
+        while len(_reports) > max(1, settings.PROFILING_MAX_REPORTS):
+            _reports.popitem(last=False)
+    return report
+
+
+def get_report(profile_id: str) -> Optional[Dict[str, Any]]:
+    with _reports_lock:
+        return _reports.get(profile_id)
+
+
+def list_reports() -> List[Dict[str, Any]]:
+    with _reports_lock:
+        return [{"id": r["id"], "label": r["label"], "mode": r["mode"], "total_ms": r["total_ms"]} for r in reversed(_reports.values())]
+
+
+def record(stage: str, seconds: float) -> None:
+    """Adds a stage duration to the current profile, if any. Called from metrics.observe_*."""
+    profile = _current.get()
+    if profile is not None:
+        profile.record(stage, seconds)
+
+
+def defer(key: str) -> Optional[str]:
+    """
+    Marks background work queued by the current (profiled) request, e.g. an ingestion job, to be
+    profiled when it runs. Returns the report id it will be stored under, or None if not profiling.
+    """
+    profile = _current.get()
+    if profile is None:
+        return None
+    with _deferred_lock:
+        _deferred[key] = profile.mode
+    return key
+
+
+def take_deferred(key: str) -> Optional[str]:
+    with _deferred_lock:
+        return _deferred.pop(key, None)
+
+
+@contextmanager
+def span(name: Optional[str] = None) -> Iterator[None]:
+    """
+    Times a block as a stage of the current profile and samples the calling thread while inside it.
+    Without a name, only marks the thread as working on the request (for blocks timed elsewhere).
+    """
+    profile = _current.get()
+    if profile is None:
+        yield
+        return
+    profile.enter_thread()
+    start_time = time.perf_counter()
+    try:
+        yield
+    finally:
+        if name is not None:
+            profile.record(name, time.perf_counter() - start_time)
+        profile.exit_thread()
+
+
+def profiled(name: str) -> Callable:
+    """Decorator form of span() for sync and async functions."""
+    def decorator(func: Callable) -> Callable:
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
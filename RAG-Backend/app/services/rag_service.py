@@ -1,16 +1,30 @@
 # app/services/rag_service.py
+import asyncio
+import contextvars
 import logging
-from typing import Dict, List, Any, Tuple, Optional
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import AsyncIterator, Dict, List, Any, Tuple, Optional
 
 from langchain.chains import RetrievalQA
 # --- NEW: Import PromptTemplate ---
 from langchain.prompts import PromptTemplate
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.documents import Document
 from langchain_core.retrievers import BaseRetriever
 
 from ..core.config import settings
-from .file_processor import vector_store, embedding_function
+from . import file_processor
+from . import answer_cache as answer_cache_module
+from . import model_lifecycle
+from . import metrics
+from . import profiling
+from .instrumentation import InstrumentedRetriever, llm_metrics_callback
+from .hybrid_retriever import HybridRetriever
+from . import lexical_index as lexical_index_module
+from . import reranker as reranker_module
+from .reranker import RerankingRetriever
 from ..db import schemas
 from ..dependencies import UserQueryContext
 
@@ -18,21 +32,47 @@ from ..dependencies import UserQueryContext
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# --- LLM Initialization (Keep as is) ---
+# --- Components ---
+# Bound by model_lifecycle once the background load at startup finishes (see bind_components).
+vector_store = file_processor.vector_store
+embedding_function = file_processor.embedding_function
+reranker = reranker_module.reranker
+lexical_index = lexical_index_module.lexical_index
 llm = None
-if settings.GOOGLE_API_KEY:
-    try:
-        llm = ChatGoogleGenerativeAI(
-            model=settings.GEMINI_CHAT_MODEL, # Ensure this uses "gemini-1.5-flash" or similar
-            google_api_key=settings.GOOGLE_API_KEY,
-            temperature=0.2, # Low temperature for more factual RAG answers
-            convert_system_message_to_human=True
-        )
-        logger.info(f"RAG Service: Initialized ChatGoogleGenerativeAI with model: {settings.GEMINI_CHAT_MODEL}")
-    except Exception as e:
-        logger.exception(f"RAG Service: Failed to initialize Google Gemini LLM: {e}")
-else:
-    logger.warning("RAG Service: GOOGLE_API_KEY not set. Google Gemini LLM cannot be initialized.")
+
+def init_llm() -> Any:
+    """Builds the Gemini chat client. Raises if GOOGLE_API_KEY is missing or the client cannot be created."""
+    global llm
+    if not settings.GOOGLE_API_KEY:
+        raise RuntimeError("GOOGLE_API_KEY not set; Google Gemini LLM cannot be initialized")
+    from langchain_google_genai import ChatGoogleGenerativeAI
+    llm = ChatGoogleGenerativeAI(
+        model=settings.GEMINI_CHAT_MODEL, # Ensure this uses "gemini-1.5-flash" or similar
+        google_api_key=settings.GOOGLE_API_KEY,
+        temperature=0.2, # Low temperature for more factual RAG answers
+        convert_system_message_to_human=True
+    )
+    logger.info(f"RAG Service: Initialized ChatGoogleGenerativeAI with model: {settings.GEMINI_CHAT_MODEL}")
+    return llm
+
+def bind_components() -> None:
+    """Picks up the embeddings, vector store, lexical index and reranker loaded into their modules; the registry rebuilds on next use."""
+    global vector_store, embedding_function, reranker, lexical_index
+    vector_store = file_processor.vector_store
+    embedding_function = file_processor.embedding_function
+    reranker = reranker_module.reranker
+    lexical_index = lexical_index_module.lexical_index
+
+# --- Bounded executor for RAG chains and streaming retrieval ---
+# Keeps blocking embedding/Chroma/LLM calls off the event loop without letting
+# a burst of queries spawn an unbounded number of threads.
+rag_executor = ThreadPoolExecutor(
+    max_workers=max(1, settings.RAG_EXECUTOR_MAX_WORKERS),
+    thread_name_prefix="rag-query"
+)
+
+# Passed to every chain / LLM invocation so LLM calls are timed and counted as in flight.
+_CHAIN_CONFIG = {"callbacks": [llm_metrics_callback]}
 
 # --- NEW: Define Custom Prompt Template ---
 # This template instructs the LLM on how to behave.
@@ -53,23 +93,34 @@ Helpful Answer:"""
 QA_CHAIN_PROMPT = PromptTemplate.from_template(custom_prompt_template_str)
 
 
+# --- Access Scope Resolution ---
+def get_allowed_access_targets(user_context: UserQueryContext) -> Optional[List[str]]:
+    """
+    Returns the doc_access_target values the user may read, or None if unrestricted (admin).
+    """
+    if user_context.role == "admin":
+        return None
+    allowed_access_targets = ["public"]
+    if user_context.role == "student":
+        allowed_access_targets.append("all_students")
+        if user_context.level:
+            allowed_access_targets.append(f"level_{user_context.level}")
+    return allowed_access_targets
+
 # --- Contextual Retriever Function (Keep as is) ---
 def get_contextual_retriever(user_context: UserQueryContext) -> Optional[BaseRetriever]:
     if not vector_store:
         logger.error("RAG Service: Vector store is not initialized. Cannot create retriever.")
         return None
-    search_kwargs = {"k": 5}
-    allowed_access_targets = []
-    if user_context.role == "admin":
+    # With reranking on, over-fetch candidates; the reranker keeps the best RERANK_TOP_N.
+    k = max(settings.RERANK_CANDIDATES, settings.RETRIEVAL_K) if reranker is not None else settings.RETRIEVAL_K
+    search_kwargs = {"k": k}
+    allowed_access_targets = get_allowed_access_targets(user_context)
+    if allowed_access_targets is None:
         logger.info("RAG Service: Admin user, retriever will not filter by doc_access_target.")
     elif user_context.role == "student":
-        allowed_access_targets.append("public")
-        allowed_access_targets.append("all_students")
-        if user_context.level:
-            allowed_access_targets.append(f"level_{user_context.level}")
         logger.info(f"RAG Service: Student (Level: {user_context.level}), allowed targets: {allowed_access_targets}")
     else: # Guest user
-        allowed_access_targets.append("public")
         logger.info(f"RAG Service: Guest user, allowed targets: {allowed_access_targets}")
 
     if allowed_access_targets:
@@ -77,17 +128,39 @@ def get_contextual_retriever(user_context: UserQueryContext) -> Optional[BaseRet
         search_kwargs["filter"] = metadata_filter
         logger.info(f"RAG Service: Applying metadata filter to retriever: {metadata_filter}")
     
+    if settings.RETRIEVAL_MODE == "hybrid" and lexical_index is not None:
+        retriever = HybridRetriever(
+            vector_store=vector_store,
+            lexical_index=lexical_index,
+            allowed_access_targets=allowed_access_targets,
+            k=k,
+            fetch_k=max(settings.HYBRID_CANDIDATES, k),
+            rrf_k=settings.HYBRID_RRF_K
+        )
+        logger.info(f"RAG Service: Hybrid (BM25 + vector) retriever configured with k={k}")
+        return _with_reranking(InstrumentedRetriever(base_retriever=retriever))
+
     try:
         retriever = vector_store.as_retriever(
             search_type="similarity",
             search_kwargs=search_kwargs
         )
         logger.info(f"RAG Service: Retriever configured with search_kwargs: {search_kwargs}")
-        return retriever
+        return _with_reranking(InstrumentedRetriever(base_retriever=retriever))
     except Exception as e:
         logger.exception(f"RAG Service: Failed to create retriever: {e}")
         return None
 
+def _with_reranking(retriever: BaseRetriever) -> BaseRetriever:
+    if reranker is None:
+        return retriever
+    return RerankingRetriever(
+        base_retriever=retriever,
+        reranker=reranker,
+        top_n=settings.RERANK_TOP_N,
+        fallback_k=settings.RETRIEVAL_K
+    )
+
 # --- Source Document Processing (Keep as is) ---
 def process_source_documents(source_docs: List[Document]) -> List[schemas.SourceDocumentInfo]:
     processed_sources = []
@@ -106,44 +179,250 @@ def process_source_documents(source_docs: List[Document]) -> List[schemas.Source
             seen_sources.add(source_key)
     return processed_sources
 
-# --- RAG Query Function (Modified to use the custom prompt) ---
-def get_rag_answer(query: str, user_context: UserQueryContext) -> Tuple[str, List[schemas.SourceDocumentInfo]]:
+# --- Retriever / Chain Registry ---
+# There are only a few effective access scopes (guest, admin, students per level), so each scope's
+# retriever and RetrievalQA chain is built once and shared by later requests. An entry remembers the
+# components it was built from and is rebuilt if vector_store, embedding_function, llm or reranker
+# has since been replaced.
+_registry_lock = threading.Lock()
+_scope_registry: Dict[answer_cache_module.AccessScope, Dict[str, Any]] = {}
+
+def _current_components() -> Tuple[Any, ...]:
+    return (vector_store, embedding_function, llm, reranker)
+
+def _registry_entry(user_context: UserQueryContext) -> Dict[str, Any]:
+    scope = answer_cache_module.make_access_scope(get_allowed_access_targets(user_context))
+    components = _current_components()
+    with _registry_lock:
+        entry = _scope_registry.get(scope)
+        if entry is not None and all(a is b for a, b in zip(entry["components"], components)):
+            return entry
+        entry = {"components": components, "retriever": None, "chain": None}
+        _scope_registry[scope] = entry
+        return entry
+
+def clear_registry() -> None:
+    """Drops all cached retrievers and chains (e.g. after changing retrieval settings at runtime)."""
+    with _registry_lock:
+        _scope_registry.clear()
+
+# --- RAG Chain Construction ---
+def _prepare_retriever(user_context: UserQueryContext) -> Tuple[Optional[BaseRetriever], Optional[str]]:
+    """
+    Checks that the LLM and embeddings are available and builds the access-filtered retriever.
+    Returns (retriever, None) on success, or (None, error_message) if a component is unavailable.
+    """
+    if model_lifecycle.is_loading():
+        logger.warning("RAG Service: Query received while models are still loading.")
+        return None, "Error: The question answering system is still starting up. Please try again shortly."
     if not llm:
         logger.error("RAG Service: LLM is not available.")
-        return "Error: The question answering system's LLM is not available.", []
+        return None, "Error: The question answering system's LLM is not available."
     if not embedding_function:
         logger.error("RAG Service: Embedding function is not available.")
-        return "Error: The question answering system's embedding function is not available.", []
+        return None, "Error: The question answering system's embedding function is not available."
 
-    contextual_retriever = get_contextual_retriever(user_context)
+    entry = _registry_entry(user_context)
+    contextual_retriever = entry["retriever"]
+    if contextual_retriever is None:
+        # Built outside the lock; a concurrent first request for the same scope may build a duplicate, which is harmless.
+        contextual_retriever = entry["retriever"] = get_contextual_retriever(user_context)
     if not contextual_retriever:
         logger.error("RAG Service: Failed to obtain a contextual retriever.")
-        return "Error: Could not configure document access for your request.", []
+        return None, "Error: Could not configure document access for your request."
+    return contextual_retriever, None
 
-    try:
-        # --- MODIFIED: Pass the custom prompt to the chain ---
-        rag_chain = RetrievalQA.from_chain_type(
-            llm=llm,
-            chain_type="stuff", # "stuff" chain type is suitable for using a custom prompt for the context and question
-            retriever=contextual_retriever,
-            return_source_documents=True,
-            chain_type_kwargs={"prompt": QA_CHAIN_PROMPT} # Pass the custom prompt here
-        )
-        logger.info(f"RAG Service: Dynamically created RAG chain with custom prompt for user context: Role='{user_context.role}', Level='{user_context.level}'")
-        
-        logger.info(f"RAG Service: Processing query: '{query}'")
-        result: Dict[str, Any] = rag_chain.invoke({"query": query}) # 'query' is the default input key for this chain
+def _build_rag_chain(user_context: UserQueryContext) -> Tuple[Optional[RetrievalQA], Optional[str]]:
+    """
+    Builds the RetrievalQA chain for the given user context.
+    Returns (chain, None) on success, or (None, error_message) if a component is unavailable.
+    """
+    contextual_retriever, error = _prepare_retriever(user_context)
+    if error:
+        return None, error
 
-        answer = result.get('result', "Sorry, I couldn't find an answer in the accessible documents.") # Default if 'result' key is missing
-        source_docs = result.get('source_documents', [])
+    entry = _registry_entry(user_context)
+    if entry["chain"] is not None and entry["retriever"] is contextual_retriever:
+        return entry["chain"], None
 
-        logger.info(f"RAG Service: Generated answer preview: '{answer[:100]}...'")
-        logger.info(f"RAG Service: Retrieved {len(source_docs)} source document chunks with applied filters.")
+    rag_chain = RetrievalQA.from_chain_type(
+        llm=llm,
+        chain_type="stuff", # "stuff" chain type is suitable for using a custom prompt for the context and question
+        retriever=contextual_retriever,
+        return_source_documents=True,
+        chain_type_kwargs={"prompt": QA_CHAIN_PROMPT} # Pass the custom prompt here
+    )
+    if entry["retriever"] is contextual_retriever:
+        entry["chain"] = rag_chain
+    logger.info(f"RAG Service: Created RAG chain with custom prompt for user context: Role='{user_context.role}', Level='{user_context.level}'")
+    return rag_chain, None
+
+def _format_rag_result(result: Dict[str, Any]) -> Tuple[str, List[schemas.SourceDocumentInfo]]:
+    answer = result.get('result', "Sorry, I couldn't find an answer in the accessible documents.") # Default if 'result' key is missing
+    source_docs = result.get('source_documents', [])
 
+    logger.info(f"RAG Service: Generated answer preview: '{answer[:100]}...'")
+    logger.info(f"RAG Service: Retrieved {len(source_docs)} source document chunks with applied filters.")
+
+    with metrics.rag_stage("postprocess"):
         processed_sources = process_source_documents(source_docs)
+    return answer, processed_sources
+
+# --- Semantic Answer Cache Helpers ---
+def _get_cache_scope(user_context: UserQueryContext) -> answer_cache_module.AccessScope:
+    return answer_cache_module.make_access_scope(get_allowed_access_targets(user_context))
+
+def _lookup_cached_answer(scope: answer_cache_module.AccessScope, query_vector: Optional[List[float]]) -> Optional[Tuple[str, List[schemas.SourceDocumentInfo]]]:
+    cache = answer_cache_module.answer_cache
+    if cache is None or query_vector is None:
+        return None
+    return cache.lookup(scope, query_vector)
+
+def _store_cached_answer(scope: answer_cache_module.AccessScope, query: str, query_vector: Optional[List[float]],
+                         answer: str, sources: List[schemas.SourceDocumentInfo]) -> None:
+    cache = answer_cache_module.answer_cache
+    if cache is None or query_vector is None:
+        return
+    cache.store(scope, query, query_vector, answer, sources)
+
+def _embed_query_for_cache(query: str) -> Optional[List[float]]:
+    if answer_cache_module.answer_cache is None:
+        return None
+    try:
+        return embedding_function.embed_query(query)
+    except Exception as e:
+        logger.error(f"RAG Service: Failed to embed query for answer cache lookup, bypassing cache: {e}")
+        return None
+
+async def _aembed_query_for_cache(query: str) -> Optional[List[float]]:
+    if answer_cache_module.answer_cache is None:
+        return None
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(rag_executor, contextvars.copy_context().run, _embed_query_for_cache, query)
+
+# --- RAG Query Function (Modified to use the custom prompt) ---
+@profiling.profiled("rag_answer")
+def get_rag_answer(query: str, user_context: UserQueryContext) -> Tuple[str, List[schemas.SourceDocumentInfo]]:
+    started = time.perf_counter()
+    try:
+        rag_chain, error = _build_rag_chain(user_context)
+        if error:
+            metrics.record_query(user_context.role, "unavailable", started)
+            return error, []
+
+        cache_scope = _get_cache_scope(user_context)
+        query_vector = _embed_query_for_cache(query)
+        cached = _lookup_cached_answer(cache_scope, query_vector)
+        if cached:
+            metrics.record_query(user_context.role, "cached", started)
+            return cached
+
+        logger.info(f"RAG Service: Processing query: '{query}'")
+        result: Dict[str, Any] = rag_chain.invoke({"query": query}, config=_CHAIN_CONFIG) # 'query' is the default input key for this chain
+        answer, processed_sources = _format_rag_result(result)
+        _store_cached_answer(cache_scope, query, query_vector, answer, processed_sources)
+        metrics.record_query(user_context.role, "answered", started)
         return answer, processed_sources
 
     except Exception as e:
         logger.exception(f"RAG Service: Error during RAG chain execution for query '{query}': {e}")
+        metrics.record_query(user_context.role, "error", started)
         return "An error occurred while processing your question. Please try again later.", []
 
+# --- Async RAG Query Function ---
+@profiling.profiled("rag_answer")
+async def aget_rag_answer(query: str, user_context: UserQueryContext) -> Tuple[str, List[schemas.SourceDocumentInfo]]:
+    """
+    Async counterpart of get_rag_answer for use from async route handlers.
+    The retriever, Chroma and the embedding model have no native async path, so the chain
+    runs on the bounded rag_executor: the event loop stays free and RAG_EXECUTOR_MAX_WORKERS
+    caps how many queries execute at once.
+    """
+    started = time.perf_counter()
+    try:
+        rag_chain, error = _build_rag_chain(user_context)
+        if error:
+            metrics.record_query(user_context.role, "unavailable", started)
+            return error, []
+
+        cache_scope = _get_cache_scope(user_context)
+        query_vector = await _aembed_query_for_cache(query)
+        cached = _lookup_cached_answer(cache_scope, query_vector)
+        if cached:
+            metrics.record_query(user_context.role, "cached", started)
+            return cached
+
+        logger.info(f"RAG Service: Processing query (async): '{query}'")
+        loop = asyncio.get_running_loop()
+        result: Dict[str, Any] = await loop.run_in_executor(
+            rag_executor, contextvars.copy_context().run, partial(rag_chain.invoke, {"query": query}, config=_CHAIN_CONFIG)
+        )
+        answer, processed_sources = _format_rag_result(result)
+        _store_cached_answer(cache_scope, query, query_vector, answer, processed_sources)
+        metrics.record_query(user_context.role, "answered", started)
+        return answer, processed_sources
+
+    except Exception as e:
+        logger.exception(f"RAG Service: Error during async RAG chain execution for query '{query}': {e}")
+        metrics.record_query(user_context.role, "error", started)
+        return "An error occurred while processing your question. Please try again later.", []
+
+# --- Streaming RAG Query Function ---
+async def astream_rag_answer(query: str, user_context: UserQueryContext) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Streams a RAG answer as a sequence of events:
+    - {"event": "sources", "data": [...]} once retrieval completes (before generation starts)
+    - {"event": "token", "data": "..."} for each chunk produced by the LLM
+    - {"event": "done", "data": {}} at the end, or {"event": "error", "data": "..."} on failure
+    Applies the same access filtering as get_rag_answer via get_contextual_retriever.
+    """
+    started = time.perf_counter()
+    try:
+        contextual_retriever, error = _prepare_retriever(user_context)
+        if error:
+            metrics.record_query(user_context.role, "unavailable", started)
+            yield {"event": "error", "data": error}
+            return
+
+        cache_scope = _get_cache_scope(user_context)
+        query_vector = await _aembed_query_for_cache(query)
+        cached = _lookup_cached_answer(cache_scope, query_vector)
+        if cached:
+            metrics.record_query(user_context.role, "cached", started)
+            cached_answer, cached_sources = cached
+            yield {"event": "sources", "data": [source.model_dump() for source in cached_sources]}
+            yield {"event": "token", "data": cached_answer}
+            yield {"event": "done", "data": {"cached": True}}
+            return
+
+        logger.info(f"RAG Service: Processing query (stream): '{query}'")
+        loop = asyncio.get_running_loop()
+        # Retrieval is blocking (embedding + Chroma); the LLM below streams natively.
+        source_docs: List[Document] = await loop.run_in_executor(rag_executor, contextvars.copy_context().run, contextual_retriever.invoke, query)
+        logger.info(f"RAG Service: Retrieved {len(source_docs)} source document chunks with applied filters.")
+        with metrics.rag_stage("postprocess"):
+            processed_sources = process_source_documents(source_docs)
+        yield {"event": "sources", "data": [source.model_dump() for source in processed_sources]}
+
+        # Same prompt the "stuff" chain builds: chunks joined by blank lines.
+        context = "\n\n".join(doc.page_content for doc in source_docs)
+        prompt_text = QA_CHAIN_PROMPT.format(context=context, question=query)
+
+        answer_parts: List[str] = []
+        async for chunk in llm.astream(prompt_text, config=_CHAIN_CONFIG):
+            token = getattr(chunk, "content", chunk) # Chat models yield message chunks, plain LLMs yield str
+            if token:
+                answer_parts.append(token)
+                yield {"event": "token", "data": token}
+        _store_cached_answer(cache_scope, query, query_vector, "".join(answer_parts), processed_sources)
+        metrics.record_query(user_context.role, "answered", started)
+        yield {"event": "done", "data": {}}
+
+    except Exception as e:
+        logger.exception(f"RAG Service: Error during streaming RAG execution for query '{query}': {e}")
+        metrics.record_query(user_context.role, "error", started)
+        yield {"event": "error", "data": "An error occurred while processing your question. Please try again later."}
+
+def shutdown_executor() -> None:
+    """Releases the RAG executor threads. Called from the application shutdown hook."""
+    rag_executor.shutdown(wait=False, cancel_futures=True)
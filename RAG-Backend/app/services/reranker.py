@@ -0,0 +1,130 @@
+# app/services/reranker.py
+import logging
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+from ..core.config import settings
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class CrossEncoderReranker:
+    """
+    Scores (query, chunk) pairs with a small cross-encoder on CPU, in mini-batches, within a time budget.
+    Keeps an EWMA of per-pair cost so a request whose predicted cost exceeds its remaining budget is
+    skipped up front rather than abandoned half-way.
+    """
+
+    def __init__(self, model: Any, batch_size: int = 8, budget_ms: float = 150.0):
+        self.model = model # Anything with predict(pairs, batch_size=...) -> scores, e.g. sentence_transformers.CrossEncoder
+        self.batch_size = max(1, batch_size)
+        self.budget_s = budget_ms / 1000.0
+        self._lock = threading.Lock()
+        self._pair_cost_s: Optional[float] = None # EWMA, learned from completed batches
+        self.calls = 0
+        self.reranked = 0
+        self.fallbacks = 0
+        self._total_s = 0.0
+        self._max_s = 0.0
+        self.pairs_scored = 0
+
+    def _record(self, elapsed: float, reranked: bool, pairs: int) -> None:
+        with self._lock:
+            self.calls += 1
+            self.reranked += int(reranked)
+            self.fallbacks += int(not reranked)
+            self.pairs_scored += pairs
+            self._total_s += elapsed
+            self._max_s = max(self._max_s, elapsed)
+
+    def _update_cost(self, batch_s: float, pairs: int) -> None:
+        per_pair = batch_s / max(1, pairs)
+        with self._lock:
+            self._pair_cost_s = per_pair if self._pair_cost_s is None else 0.8 * self._pair_cost_s + 0.2 * per_pair
+
+    def score(self, query: str, docs: List[Document], budget_s: Optional[float] = None) -> Optional[List[float]]:
+        """Returns one score per doc, or None if scoring would not (or did not) finish within the budget."""
+        budget_s = self.budget_s if budget_s is None else budget_s
+        start = time.perf_counter()
+        pairs = [(query, doc.page_content) for doc in docs]
+        scores: List[float] = []
+        for batch_start in range(0, len(pairs), self.batch_size):
+            remaining = budget_s - (time.perf_counter() - start)
+            batch = pairs[batch_start:batch_start + self.batch_size]
+            predicted = (self._pair_cost_s or 0.0) * (len(pairs) - batch_start)
+            if remaining <= 0 or predicted > remaining:
+                if batch_start == 0 and self._pair_cost_s is not None:
+                    with self._lock: # Skipped without measuring; let the estimate decay so we try again once load drops
+                        self._pair_cost_s *= 0.9
+                self._record(time.perf_counter() - start, False, len(scores))
+                return None
+            t0 = time.perf_counter()
+            scores.extend(float(s) for s in self.model.predict(batch, batch_size=len(batch), show_progress_bar=False))
+            self._update_cost(time.perf_counter() - t0, len(batch))
+        self._record(time.perf_counter() - start, True, len(scores))
+        return scores
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "reranked": self.reranked,
+                "budget_fallbacks": self.fallbacks,
+                "pairs_scored": self.pairs_scored,
+                "avg_ms": round(self._total_s / self.calls * 1000, 3) if self.calls else 0.0,
+                "max_ms": round(self._max_s * 1000, 3),
+                "est_pair_ms": round((self._pair_cost_s or 0.0) * 1000, 3),
+                "budget_ms": self.budget_s * 1000,
+            }
+
+
+class RerankingRetriever(BaseRetriever):
+    """
+    Over-fetches candidates from base_retriever, reorders them by cross-encoder score and keeps top_n.
+    If scoring would exceed the reranker's budget, returns the first fallback_k candidates in the
+    base retriever's order (what the plain retriever would have returned).
+    """
+    base_retriever: BaseRetriever
+    reranker: Any
+    top_n: int = 3
+    fallback_k: int = 5
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        candidates = self.base_retriever.invoke(query, config={"callbacks": run_manager.get_child()})
+        if len(candidates) <= 1:
+            return candidates
+        try:
+            with metrics.rag_stage("rerank"):
+                scores = self.reranker.score(query, candidates)
+        except Exception as e:
+            logger.error(f"Reranker failed, using retriever order: {e}")
+            metrics.RERANK_OUTCOMES.labels("error").inc()
+            return candidates[:self.fallback_k]
+        if scores is None:
+            metrics.RERANK_OUTCOMES.labels("budget_fallback").inc()
+            return candidates[:self.fallback_k]
+        metrics.RERANK_OUTCOMES.labels("reranked").inc()
+        ranked = sorted(zip(scores, range(len(candidates))), key=lambda pair: pair[0], reverse=True)
+        return [candidates[i] for _, i in ranked[:self.top_n]]
+
+
+# Loaded by model_lifecycle at startup when RERANK_ENABLED.
+reranker: Optional[CrossEncoderReranker] = None
+
+def init_reranker() -> CrossEncoderReranker:
+    """Loads the cross-encoder. Raises on failure; retrieval is then not reranked."""
+    global reranker
+    from sentence_transformers import CrossEncoder
+    reranker = CrossEncoderReranker(
+        CrossEncoder(settings.RERANK_MODEL_NAME, device="cpu", max_length=512),
+        batch_size=settings.RERANK_BATCH_SIZE,
+        budget_ms=settings.RERANK_BUDGET_MS
+    )
+    logger.info(f"Initialized cross-encoder reranker: {settings.RERANK_MODEL_NAME} (budget {settings.RERANK_BUDGET_MS}ms)")
+    return reranker
@@ -0,0 +1,218 @@
+# benchmarks/_fakes.py
+"""
+Offline stand-ins for the LLM and retriever so benchmarks run without
+network access or a Gemini API key.
+"""
+import asyncio
+import hashlib
+import io
+import math
+import random
+import threading
+import time
+import zipfile
+from typing import Any, AsyncIterator, Iterator, List, Optional
+
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.llms import LLM
+from langchain_core.outputs import GenerationChunk
+from langchain_core.retrievers import BaseRetriever
+
+
+class FakeLLM(LLM):
+    """LLM that takes a fixed latency to return a canned answer; streaming spreads it across tokens."""
+    latency_s: float = 0.5
+    answer: str = "This is a canned answer from the fake LLM."
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-latency-llm"
+
+    def _call(self, prompt: str, stop: Optional[List[str]] = None,
+              run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs: Any) -> str:
+        time.sleep(self.latency_s)
+        return self.answer
+
+    async def _acall(self, prompt: str, stop: Optional[List[str]] = None,
+                     run_manager: Optional[AsyncCallbackManagerForLLMRun] = None, **kwargs: Any) -> str:
+        await asyncio.sleep(self.latency_s)
+        return self.answer
+
+    def _stream(self, prompt: str, stop: Optional[List[str]] = None,
+                run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs: Any) -> Iterator[GenerationChunk]:
+        tokens = self.answer.split(" ")
+        per_token = self.latency_s / max(1, len(tokens))
+        for i, token in enumerate(tokens):
+            time.sleep(per_token)
+            yield GenerationChunk(text=token if i == 0 else f" {token}")
+
+    async def _astream(self, prompt: str, stop: Optional[List[str]] = None,
+                       run_manager: Optional[AsyncCallbackManagerForLLMRun] = None, **kwargs: Any) -> AsyncIterator[GenerationChunk]:
+        tokens = self.answer.split(" ")
+        per_token = self.latency_s / max(1, len(tokens))
+        for i, token in enumerate(tokens):
+            await asyncio.sleep(per_token)
+            yield GenerationChunk(text=token if i == 0 else f" {token}")
+
+
+class StubRetriever(BaseRetriever):
+    """Retriever that always returns the same small set of documents."""
+    docs: List[Document] = []
+
+    def _get_relevant_documents(self, query: str, *, run_manager=None) -> List[Document]:
+        return list(self.docs)
+
+
+def sample_documents(n: int = 3) -> List[Document]:
+    return [
+        Document(
+            page_content=f"Sample chunk {i} about the course syllabus.",
+            metadata={"source_filename": "syllabus.pdf", "page_number": i, "doc_access_target": "public"}
+        )
+        for i in range(n)
+    ]
+
+
+class HashingEmbeddings(Embeddings):
+    """
+    Deterministic bag-of-words hashing embedder (normalized), so similar texts get similar vectors.
+    per_token_s simulates a padded forward pass: each embed call costs
+    per_token_s * len(batch) * longest_text_in_batch, like a transformer batch padded to its longest row,
+    plus per_call_s of fixed overhead. Calls are serialized, like one model sharing the CPU.
+    """
+
+    def __init__(self, dim: int = 64, per_token_s: float = 0.0, per_call_s: float = 0.0):
+        self.dim = dim
+        self.per_token_s = per_token_s
+        self.per_call_s = per_call_s
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def _vector(self, text: str) -> List[float]:
+        vec = [0.0] * self.dim
+        for token in text.lower().split():
+            digest = hashlib.md5(token.encode("utf-8")).digest()
+            vec[int.from_bytes(digest[:4], "little") % self.dim] += 1.0 if digest[4] % 2 else -1.0
+        norm = math.sqrt(sum(v * v for v in vec)) or 1.0
+        return [v / norm for v in vec]
+
+    def _simulate_cost(self, texts: List[str]) -> None:
+        with self._lock:
+            self.calls += 1
+            cost = self.per_call_s
+            if self.per_token_s and texts:
+                longest = max(len(t.split()) for t in texts)
+                cost += self.per_token_s * len(texts) * longest
+            if cost:
+                time.sleep(cost)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self._simulate_cost(texts)
+        return [self._vector(t) for t in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        self._simulate_cost([text])
+        return self._vector(text)
+
+
+class FakeCrossEncoder:
+    """
+    Cross-encoder stand-in: scores a (query, text) pair by word overlap and sleeps
+    per_pair_s per pair plus per_call_s per predict() call, like a CPU forward pass.
+    """
+
+    def __init__(self, per_pair_s: float = 0.004, per_call_s: float = 0.002):
+        self.per_pair_s = per_pair_s
+        self.per_call_s = per_call_s
+
+    def predict(self, pairs, batch_size: int = 32, show_progress_bar: bool = False) -> List[float]:
+        time.sleep(self.per_call_s + self.per_pair_s * len(pairs))
+        scores = []
+        for query, text in pairs:
+            query_words = set(query.lower().split())
+            scores.append(len(query_words & set(text.lower().split())) / (len(query_words) or 1))
+        return scores
+
+
+_WORDS = ("course syllabus lecture exam room schedule level student assignment grade "
+          "deadline project lab midterm final office hours professor credit module").split()
+
+
+def synthetic_chunks(n: int, min_words: int = 10, max_words: int = 160, seed: int = 7) -> List[str]:
+    """Chunks with a skewed length distribution, like a real split document (many short, some long)."""
+    rng = random.Random(seed)
+    chunks = []
+    for _ in range(n):
+        length = int(min_words + (max_words - min_words) * rng.random() ** 2)
+        chunks.append(" ".join(rng.choice(_WORDS) for _ in range(length)))
+    return chunks
+
+
+def make_text_pdf(num_pages: int, lines_per_page: int = 40, seed: int = 11) -> bytes:
+    """Builds a minimal multi-page PDF with extractable Helvetica text (no extra dependencies)."""
+    rng = random.Random(seed)
+    objects: List[bytes] = []
+
+    def add(obj: bytes) -> int:
+        objects.append(obj)
+        return len(objects)
+
+    font_id = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+    pages_id = add(b"") # Placeholder, filled once page IDs are known
+    page_ids = []
+    for page_no in range(num_pages):
+        lines = [f"Page {page_no + 1} line {i}: " + " ".join(rng.choice(_WORDS) for _ in range(12)) for i in range(lines_per_page)]
+        text_ops = "BT /F1 9 Tf 40 800 Td 11 TL " + " ".join(f"({line}) '" for line in lines) + " ET"
+        stream = text_ops.encode("latin-1")
+        content_id = add(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        page_ids.append(add(
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 595 842] /Resources << /Font << /F1 %d 0 R >> >> /Contents %d 0 R >>"
+            % (pages_id, font_id, content_id)
+        ))
+    kids = b" ".join(b"%d 0 R" % pid for pid in page_ids)
+    objects[pages_id - 1] = b"<< /Type /Pages /Kids [" + kids + b"] /Count %d >>" % num_pages
+    catalog_id = add(b"<< /Type /Catalog /Pages %d 0 R >>" % pages_id)
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for obj_id, obj in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % obj_id + obj + b"\nendobj\n"
+    xref_at = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, catalog_id, xref_at)
+    return bytes(out)
+
+
+def make_text(num_words: int, seed: int = 13) -> str:
+    """Plain text in short paragraphs built from the same vocabulary as the other fixtures."""
+    rng = random.Random(seed)
+    words = [rng.choice(_WORDS) for _ in range(num_words)]
+    return "\n\n".join(" ".join(words[i:i + 60]) + "." for i in range(0, num_words, 60))
+
+
+def make_docx(num_paragraphs: int, words_per_paragraph: int = 60, seed: int = 17) -> bytes:
+    """Builds a minimal .docx (WordprocessingML in a zip) that docx2txt can read."""
+    rng = random.Random(seed)
+    paragraphs = "".join(
+        "<w:p><w:r><w:t>" + " ".join(rng.choice(_WORDS) for _ in range(words_per_paragraph)) + "</w:t></w:r></w:p>"
+        for _ in range(num_paragraphs)
+    )
+    out = io.BytesIO()
+    with zipfile.ZipFile(out, "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("[Content_Types].xml",
+                         '<?xml version="1.0" encoding="UTF-8"?><Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+                         '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+                         '<Default Extension="xml" ContentType="application/xml"/>'
+                         '<Override PartName="/word/document.xml" ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/></Types>')
+        archive.writestr("_rels/.rels",
+                         '<?xml version="1.0" encoding="UTF-8"?><Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+                         '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="word/document.xml"/></Relationships>')
+        archive.writestr("word/document.xml",
+                         '<?xml version="1.0" encoding="UTF-8"?><w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+                         f"<w:body>{paragraphs}</w:body></w:document>")
+    return out.getvalue()
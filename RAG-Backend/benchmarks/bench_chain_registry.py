@@ -0,0 +1,77 @@
+# benchmarks/bench_chain_registry.py
+"""
+Per-request setup overhead of the RAG path (retriever + RetrievalQA chain
+construction, no retrieval or LLM call): building both for every request, as
+before, versus reusing the per-access-scope registry in rag_service. Also checks
+that replacing the LLM makes the registry rebuild.
+
+Run from RAG-Backend/:  python -m benchmarks.bench_chain_registry --requests 2000
+"""
+import argparse
+import statistics
+import time
+
+from langchain.chains import RetrievalQA
+from langchain_chroma import Chroma
+
+from app.dependencies import UserQueryContext
+from app.services import rag_service
+
+from ._fakes import FakeLLM, HashingEmbeddings
+
+CONTEXTS = [
+    UserQueryContext(role="guest"),
+    UserQueryContext(role="student", level=1),
+    UserQueryContext(role="student", level=2),
+    UserQueryContext(role="admin"),
+]
+
+
+def _per_request_build(user_context: UserQueryContext):
+    # Mirrors the previous _build_rag_chain: everything constructed per request.
+    return RetrievalQA.from_chain_type(
+        llm=rag_service.llm,
+        chain_type="stuff",
+        retriever=rag_service.get_contextual_retriever(user_context),
+        return_source_documents=True,
+        chain_type_kwargs={"prompt": rag_service.QA_CHAIN_PROMPT}
+    )
+
+
+def _time(label: str, build, requests: int) -> float:
+    latencies = []
+    for i in range(requests):
+        t0 = time.perf_counter()
+        build(CONTEXTS[i % len(CONTEXTS)])
+        latencies.append(time.perf_counter() - t0)
+    latencies.sort()
+    p50 = statistics.median(latencies) * 1e6
+    print(f"{label:<22} p50 {p50:8.1f} us   p99 {latencies[int(0.99 * (len(latencies) - 1))] * 1e6:8.1f} us")
+    return p50
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+
+    embeddings = HashingEmbeddings(dim=64)
+    rag_service.embedding_function = embeddings
+    rag_service.vector_store = Chroma(collection_name="bench_chain_registry", embedding_function=embeddings)
+    rag_service.llm = FakeLLM(latency_s=0)
+    rag_service.clear_registry()
+
+    before = _time("per-request build", _per_request_build, args.requests)
+    after = _time("registry", lambda ctx: rag_service._build_rag_chain(ctx)[0], args.requests)
+    print(f"setup overhead reduced {before / max(after, 1e-9):.0f}x")
+
+    chain, _ = rag_service._build_rag_chain(CONTEXTS[0])
+    rag_service.llm = FakeLLM(latency_s=0)
+    rebuilt, _ = rag_service._build_rag_chain(CONTEXTS[0])
+    if rebuilt is chain or rebuilt.combine_documents_chain.llm_chain.llm is not rag_service.llm:
+        raise SystemExit("FAIL: registry did not rebuild after the LLM was replaced")
+    print("registry rebuilt after LLM replacement: ok")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+# benchmarks/bench_concurrent_queries.py
+"""
+Shows that N parallel RAG queries on the async path overlap on the bounded rag_executor,
+while the old blocking path runs them one after another, and checks that no more than
+RAG_EXECUTOR_MAX_WORKERS chains ever execute at once.
+
+Run from RAG-Backend/:  python -m benchmarks.bench_concurrent_queries --n 8 --latency 0.5
+"""
+import argparse
+import asyncio
+import math
+import threading
+import time
+
+from app.core.config import settings
+from app.dependencies import UserQueryContext
+from app.services import rag_service
+
+from ._fakes import FakeLLM, StubRetriever, sample_documents
+
+
+class _ConcurrencyProbe:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.active = 0
+        self.peak = 0
+
+    def __enter__(self):
+        with self._lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+
+    def __exit__(self, *exc):
+        with self._lock:
+            self.active -= 1
+
+
+probe = _ConcurrencyProbe()
+
+
+class CountingLLM(FakeLLM):
+    """FakeLLM whose blocking call records how many run at the same time."""
+
+    def _call(self, *args, **kwargs) -> str:
+        with probe:
+            return super()._call(*args, **kwargs)
+
+
+async def _run_blocking(n: int, ctx: UserQueryContext) -> float:
+    # Mirrors the previous handler: a sync call inside an async function.
+    async def handler(i: int):
+        return rag_service.get_rag_answer(f"question {i}", ctx)
+    start = time.perf_counter()
+    await asyncio.gather(*(handler(i) for i in range(n)))
+    return time.perf_counter() - start
+
+
+async def _run_async(n: int, ctx: UserQueryContext) -> float:
+    start = time.perf_counter()
+    results = await asyncio.gather(*(rag_service.aget_rag_answer(f"question {i}", ctx) for i in range(n)))
+    elapsed = time.perf_counter() - start
+    for answer, _ in results:
+        assert not answer.startswith(("Error:", "An error occurred")), answer
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--n", type=int, default=8, help="Number of parallel queries")
+    parser.add_argument("--latency", type=float, default=0.5, help="Fake LLM latency in seconds")
+    args = parser.parse_args()
+
+    workers = max(1, settings.RAG_EXECUTOR_MAX_WORKERS)
+    rag_service.llm = CountingLLM(latency_s=args.latency)
+    rag_service.embedding_function = rag_service.embedding_function or object()
+    retriever = StubRetriever(docs=sample_documents())
+    rag_service.get_contextual_retriever = lambda user_context: retriever
+
+    ctx = UserQueryContext(role="guest")
+    blocking_s = asyncio.run(_run_blocking(args.n, ctx))
+    probe.peak = 0
+    async_s = asyncio.run(_run_async(args.n, ctx))
+    expected_s = math.ceil(args.n / workers) * args.latency
+
+    print(f"queries={args.n} llm_latency={args.latency:.2f}s RAG_EXECUTOR_MAX_WORKERS={workers}")
+    print(f"blocking path: {blocking_s:.2f}s ({blocking_s / args.latency:.1f}x latency)")
+    print(f"async path:    {async_s:.2f}s ({async_s / args.latency:.1f}x latency, expected ~{expected_s:.2f}s)")
+    print(f"peak concurrent chains: {probe.peak}")
+    if probe.peak > workers:
+        raise SystemExit(f"FAIL: {probe.peak} chains ran at once, above RAG_EXECUTOR_MAX_WORKERS={workers}")
+    if probe.peak < min(args.n, workers):
+        raise SystemExit(f"FAIL: only {probe.peak} chains overlapped; expected {min(args.n, workers)}")
+    if async_s > expected_s + args.latency:
+        raise SystemExit("FAIL: async path did not overlap chains on the executor")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+# benchmarks/bench_embedding_backends.py
+"""
+Compares the embedding backends (app.services.embedding_backends) against the
+fp32 torch baseline: load time, query latency, document throughput, peak RSS,
+and retrieval agreement (top-k overlap and per-text cosine with fp32 vectors).
+
+Each backend runs in its own subprocess so RSS is measured in isolation.
+Needs the real model stack (torch / sentence-transformers / onnxruntime) and
+the model weights, unlike the other benchmarks.
+
+Run from RAG-Backend/:
+    python -m benchmarks.bench_embedding_backends --backends torch torch-int8 onnx --corpus-dir ./docs
+"""
+import argparse
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import List
+
+import numpy as np
+
+from ._fakes import synthetic_chunks
+
+_DEFAULT_QUERIES = [
+    "When is the final exam for level 2?",
+    "What is the deadline for the lab project?",
+    "Which professor teaches the midterm module?",
+    "Where are the office hours held?",
+    "How many credit hours is the course?",
+    "What is on the syllabus for the first lecture?",
+    "How is the final grade computed?",
+    "Is the assignment submitted online?",
+]
+
+
+def _load_corpus(corpus_dir: str, limit: int) -> List[str]:
+    if not corpus_dir:
+        return synthetic_chunks(limit)
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+    splitter = RecursiveCharacterTextSplitter(chunk_size=800, chunk_overlap=150) # Same as file_processor
+    chunks: List[str] = []
+    for name in sorted(os.listdir(corpus_dir)):
+        path = os.path.join(corpus_dir, name)
+        if os.path.isfile(path) and name.lower().endswith((".txt", ".md")):
+            with open(path, encoding="utf-8", errors="ignore") as f:
+                chunks.extend(splitter.split_text(f.read()))
+    return chunks[:limit]
+
+
+def _worker(backend: str, data_path: str, out_path: str) -> None:
+    from app.services import embedding_backends
+
+    with open(data_path) as f:
+        data = json.load(f)
+    start = time.perf_counter()
+    embeddings = embedding_backends.create_embeddings(backend)
+    load_s = time.perf_counter() - start
+
+    embeddings.embed_query("warm up") # First call pays lazy init / graph optimization
+    query_latencies = []
+    query_vectors = []
+    for query in data["queries"]:
+        t0 = time.perf_counter()
+        query_vectors.append(embeddings.embed_query(query))
+        query_latencies.append(time.perf_counter() - t0)
+
+    t0 = time.perf_counter()
+    doc_vectors = embeddings.embed_documents(data["corpus"])
+    docs_s = time.perf_counter() - t0
+
+    np.savez(out_path, queries=np.asarray(query_vectors, dtype=np.float32), docs=np.asarray(doc_vectors, dtype=np.float32))
+    print(json.dumps({
+        "backend": backend,
+        "load_s": round(load_s, 2),
+        "query_p50_ms": round(statistics.median(query_latencies) * 1000, 2),
+        "query_max_ms": round(max(query_latencies) * 1000, 2),
+        "docs_per_s": round(len(data["corpus"]) / docs_s, 1) if docs_s > 0 else 0.0,
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1), # KiB on Linux
+    }))
+
+
+def _top_k(queries: np.ndarray, docs: np.ndarray, k: int) -> np.ndarray:
+    return np.argsort(-(queries @ docs.T), axis=1)[:, :k]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", nargs="+", default=["torch", "torch-int8", "onnx"])
+    parser.add_argument("--corpus-dir", default="", help="Directory of .txt/.md files; synthetic chunks if omitted")
+    parser.add_argument("--max-chunks", type=int, default=500)
+    parser.add_argument("--k", type=int, default=5, help="Top-k used for retrieval agreement (the retriever uses 5)")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    parser.add_argument("--data", help=argparse.SUPPRESS)
+    parser.add_argument("--out", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        _worker(args.worker, args.data, args.out)
+        return
+
+    backends = list(dict.fromkeys(["torch"] + args.backends)) # fp32 is always the reference
+    with tempfile.TemporaryDirectory() as tmp:
+        data_path = os.path.join(tmp, "data.json")
+        with open(data_path, "w") as f:
+            json.dump({"corpus": _load_corpus(args.corpus_dir, args.max_chunks), "queries": _DEFAULT_QUERIES}, f)
+
+        reports, vectors = {}, {}
+        for backend in backends:
+            out_path = os.path.join(tmp, f"{backend}.npz")
+            proc = subprocess.run(
+                [sys.executable, "-m", "benchmarks.bench_embedding_backends", "--worker", backend, "--data", data_path, "--out", out_path],
+                capture_output=True, text=True
+            )
+            if proc.returncode != 0:
+                print(f"{backend}: FAILED\n{proc.stderr.strip()[-2000:]}")
+                continue
+            reports[backend] = json.loads(proc.stdout.strip().splitlines()[-1])
+            vectors[backend] = np.load(out_path)
+
+    if "torch" not in vectors:
+        raise SystemExit("fp32 baseline failed; cannot compute agreement")
+    base = vectors["torch"]
+    base_top = _top_k(base["queries"], base["docs"], args.k)
+
+    print(f"{'backend':<12}{'load s':>8}{'q p50 ms':>10}{'docs/s':>9}{'RSS MB':>9}{'cos mean':>10}{'cos min':>9}{f'top{args.k} overlap':>14}{'norm err':>10}")
+    for backend, report in reports.items():
+        v = vectors[backend]
+        cosines = np.sum(v["docs"] * base["docs"], axis=1) # Both sides are unit vectors
+        top = _top_k(v["queries"], v["docs"], args.k)
+        overlap = np.mean([len(set(a) & set(b)) / args.k for a, b in zip(top, base_top)])
+        norm_err = float(np.max(np.abs(np.linalg.norm(np.concatenate([v["docs"], v["queries"]]), axis=1) - 1.0)))
+        print(f"{backend:<12}{report['load_s']:>8}{report['query_p50_ms']:>10}{report['docs_per_s']:>9}{report['peak_rss_mb']:>9}"
+              f"{cosines.mean():>10.4f}{cosines.min():>9.4f}{overlap:>14.3f}{norm_err:>10.1e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+# benchmarks/bench_embedding_microbatch.py
+"""
+Load test for query embedding micro-batching: C client threads each issue
+unique embed_query calls against a stub embedder whose forward pass has a
+fixed per-call overhead plus a per-token cost, once calling the model directly
+and once through MicroBatchingEmbeddings. Reports throughput and p50/p99 latency.
+
+Run from RAG-Backend/:  python -m benchmarks.bench_embedding_microbatch --clients 32 --requests 20
+"""
+import argparse
+import statistics
+import threading
+import time
+from typing import List
+
+from app.services.embedding_batcher import MicroBatchingEmbeddings
+
+from ._fakes import HashingEmbeddings
+
+
+def _percentile(samples: List[float], pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))]
+
+
+def _load(embeddings, clients: int, requests_per_client: int):
+    latencies: List[float] = []
+    lock = threading.Lock()
+
+    def client(c: int) -> None:
+        local = []
+        for r in range(requests_per_client):
+            t0 = time.perf_counter()
+            embeddings.embed_query(f"when is the level {c % 4 + 1} exam for course {c} question {r}")
+            local.append(time.perf_counter() - t0)
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=client, args=(c,)) for c in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start, latencies
+
+
+def _report(label: str, elapsed: float, latencies: List[float]) -> float:
+    rps = len(latencies) / elapsed
+    print(f"{label:<14} {rps:9.1f} req/s   p50 {statistics.median(latencies) * 1000:7.1f} ms   "
+          f"p99 {_percentile(latencies, 99) * 1000:7.1f} ms")
+    return rps
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--clients", type=int, default=32, help="Concurrent client threads")
+    parser.add_argument("--requests", type=int, default=20, help="Queries per client")
+    parser.add_argument("--per-call-ms", type=float, default=8.0, help="Fixed cost of one forward pass")
+    parser.add_argument("--per-token-ms", type=float, default=0.05, help="Cost per (padded) token in a batch")
+    parser.add_argument("--window-ms", type=float, default=5.0)
+    parser.add_argument("--max-batch", type=int, default=32)
+    args = parser.parse_args()
+
+    def model():
+        return HashingEmbeddings(per_call_s=args.per_call_ms / 1000.0, per_token_s=args.per_token_ms / 1000.0)
+
+    print(f"clients={args.clients} requests/client={args.requests} window={args.window_ms}ms max_batch={args.max_batch}")
+    direct_rps = _report("unbatched", *_load(model(), args.clients, args.requests))
+    batcher = MicroBatchingEmbeddings(model(), window_ms=args.window_ms, max_batch_size=args.max_batch)
+    batched_rps = _report("micro-batched", *_load(batcher, args.clients, args.requests))
+    print(f"batcher stats: {batcher.stats()}")
+    print(f"throughput gain: {batched_rps / direct_rps:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
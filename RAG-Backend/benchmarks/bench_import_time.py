@@ -0,0 +1,84 @@
+# benchmarks/bench_import_time.py
+"""
+Cold-start import budget for the API. Imports app.main in fresh interpreters under
+`python -X importtime`, reports the median cumulative import time and the slowest
+top-level packages, and exits non-zero if the median exceeds the budget or if any
+heavy ML / loader package (which should load only on the RAG or ingestion path)
+was imported.
+
+Run from RAG-Backend/:  python -m benchmarks.bench_import_time --budget-ms 1500 --runs 5
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from typing import Dict, Set, Tuple
+
+DEFAULT_BUDGET_MS = float(os.getenv("IMPORT_TIME_BUDGET_MS", "1500"))
+
+# Must not be imported by `import app.main`.
+HEAVY_PACKAGES = (
+    "torch", "transformers", "sentence_transformers", "onnxruntime",
+    "langchain", "langchain_community", "langchain_chroma", "langchain_huggingface",
+    "langchain_google_genai", "chromadb", "pypdf",
+)
+
+
+def _import_once(module: str) -> Tuple[float, Dict[str, float], Set[str]]:
+    """Returns (cumulative ms for `module`, cumulative ms of its direct imports, every package root imported)."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    )
+    if result.returncode != 0:
+        raise SystemExit(f"FAIL: 'import {module}' exited with {result.returncode}:\n{result.stderr[-2000:]}")
+    total_ms, children, roots = 0.0, {}, set()
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if not cumulative.strip().isdigit():
+            continue # Header line
+        ms = int(cumulative) / 1000
+        depth = (len(name) - len(name.lstrip()) - 1) // 2 # importtime indents nested imports by two spaces
+        name = name.strip()
+        roots.add(name.split(".")[0])
+        if name == module:
+            total_ms = ms
+        elif depth == 1:
+            children[name] = ms # Direct imports are printed just before their parent
+    return total_ms, children, roots
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS, help="Default: IMPORT_TIME_BUDGET_MS or 1500")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    totals, children, roots = [], {}, set()
+    for _ in range(args.runs):
+        total_ms, children, roots = _import_once(args.module)
+        totals.append(total_ms)
+    median_ms = statistics.median(totals)
+    print(f"import {args.module}: median {median_ms:.0f} ms over {args.runs} runs (min {min(totals):.0f}, max {max(totals):.0f}), budget {args.budget_ms:.0f} ms")
+    print(f"slowest direct imports of {args.module} (last run):")
+    for name, ms in sorted(children.items(), key=lambda item: item[1], reverse=True)[:args.top]:
+        print(f"  {name:<28} {ms:8.1f} ms")
+
+    failures = []
+    heavy = sorted(roots & set(HEAVY_PACKAGES))
+    if heavy:
+        failures.append(f"heavy packages imported at startup: {', '.join(heavy)}")
+    if median_ms > args.budget_ms:
+        failures.append(f"median import time {median_ms:.0f} ms exceeds the {args.budget_ms:.0f} ms budget")
+    if failures:
+        raise SystemExit("FAIL: " + "; ".join(failures))
+    print("ok")
+
+
+if __name__ == "__main__":
+    main()
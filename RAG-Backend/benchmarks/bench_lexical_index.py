@@ -0,0 +1,64 @@
+# benchmarks/bench_lexical_index.py
+"""
+Measures the BM25 lexical index (app.services.lexical_index): incremental indexing
+throughput and access-filtered search latency, plus how often an exact course code
+or room number query ranks its chunk first.
+
+Run from RAG-Backend/:  python -m benchmarks.bench_lexical_index --chunks 50000
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from app.services.lexical_index import LexicalIndex
+
+from ._fakes import synthetic_chunks
+
+_TARGETS = ["public", "all_students", "level_1", "level_2", "level_3", "level_4"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--chunks", type=int, default=50000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--doc-size", type=int, default=40, help="Chunks per simulated upload")
+    parser.add_argument("--prune-max-df-ratio", type=float, default=0.0,
+                        help="Opt-in common-term pruning (LEXICAL_PRUNE_MAX_DF_RATIO); 0 lets bm25() weight every term")
+    args = parser.parse_args()
+
+    rng = random.Random(3)
+    texts = synthetic_chunks(args.chunks, max_words=120)
+    codes = [f"CS{1000 + i}" for i in range(args.chunks)] # One unique code + room per chunk
+    texts = [f"{text} course {code} room B{i % 900 + 100}" for i, (text, code) in enumerate(zip(texts, codes))]
+    metadatas = [{"doc_internal_id": f"doc_{i // args.doc_size}", "doc_access_target": _TARGETS[(i // args.doc_size) % len(_TARGETS)],
+                  "chunk_index": i % args.doc_size} for i in range(args.chunks)]
+    ids = [f"{m['doc_internal_id']}_chunk_{m['chunk_index']}" for m in metadatas]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        index = LexicalIndex(os.path.join(tmp, "lexical.sqlite3"), prune_max_df_ratio=args.prune_max_df_ratio)
+        start = time.perf_counter()
+        for s in range(0, args.chunks, args.doc_size): # One add per document, as ingestion does
+            index.add_chunks(ids[s:s + args.doc_size], texts[s:s + args.doc_size], metadatas[s:s + args.doc_size])
+        build_s = time.perf_counter() - start
+        size_mb = os.path.getsize(index.path) / 1e6
+
+        latencies, top1 = [], 0
+        for _ in range(args.queries):
+            i = rng.randrange(args.chunks)
+            allowed = ["public", "all_students", metadatas[i]["doc_access_target"]]
+            t0 = time.perf_counter()
+            hits = index.search(f"which room is {codes[i]} in?", allowed, 20)
+            latencies.append(time.perf_counter() - t0)
+            top1 += bool(hits) and hits[0][0] == ids[i]
+
+    latencies.sort()
+    print(f"chunks={args.chunks} prune_max_df_ratio={args.prune_max_df_ratio} index={size_mb:.1f} MB built in {build_s:.2f}s ({args.chunks / build_s:.0f} chunks/s)")
+    print(f"search p50 {statistics.median(latencies) * 1000:.2f} ms   p99 {latencies[int(0.99 * (len(latencies) - 1))] * 1000:.2f} ms")
+    print(f"exact-code top-1 hit rate: {top1 / args.queries:.3f}")
+
+
+if __name__ == "__main__":
+    main()
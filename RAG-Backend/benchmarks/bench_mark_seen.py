@@ -0,0 +1,92 @@
+# benchmarks/bench_mark_seen.py
+"""
+Compares marking notifications as seen one ID at a time (a SELECT then an INSERT/UPDATE
+per notification into user_notification_status, as mark_notifications_as_seen used to)
+against the watermark read model in app.services.notification_service, and times
+mark_all_notifications_as_seen and the unread count (legacy outer-join count vs the
+counter-based get_unread_count). Reports wall time and SQL statements per call against
+a throwaway SQLite database.
+
+Run from RAG-Backend/:  python -m benchmarks.bench_mark_seen --notifications 5000
+"""
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime, timezone
+
+
+def _per_id_mark_seen(db, models, user_id, notification_ids):
+    for notification_id in notification_ids:
+        status_record = db.query(models.UserNotificationStatus).filter(
+            models.UserNotificationStatus.user_id == user_id,
+            models.UserNotificationStatus.notification_id == notification_id
+        ).first()
+        if status_record:
+            if not status_record.is_seen:
+                status_record.is_seen = True
+                status_record.seen_at = datetime.now(timezone.utc)
+        else:
+            db.add(models.UserNotificationStatus(user_id=user_id, notification_id=notification_id, is_seen=True, seen_at=datetime.now(timezone.utc)))
+    db.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--notifications", type=int, default=5000)
+    parser.add_argument("--batch", type=int, default=200, help="IDs per mark-as-seen request")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_URL"] = f"sqlite:///{tmp}/bench.db" # Before app.core.config is imported
+        from sqlalchemy import event, func
+        from app.db import database, models
+        from app.services import notification_service
+
+        database.Base.metadata.create_all(bind=database.engine)
+        statements = {"count": 0}
+        event.listen(database.engine, "before_cursor_execute", lambda *a: statements.__setitem__("count", statements["count"] + 1))
+
+        db = database.SessionLocal()
+        db.add_all([models.User(id=i, username=f"student{i}", hashed_password="x", role="student", level=2) for i in (1, 2, 3, 4)])
+        db.add_all([models.Notification(message=f"n{i}", target_level=(0, 2, 3)[i % 3]) for i in range(args.notifications)])
+        db.commit()
+        notification_service.ensure_notification_counters(db) # Seeded rows bypassed create_notification
+        ids = [row[0] for row in db.query(models.Notification.id).all()]
+        batches = [ids[s:s + args.batch] for s in range(0, len(ids), args.batch)]
+        print(f"notifications={len(ids)} batch={args.batch} ({len(batches)} requests per pass)")
+
+        def run(label, call, requests):
+            statements["count"] = 0
+            t0 = time.perf_counter()
+            for item in requests:
+                call(item)
+            elapsed = time.perf_counter() - t0
+            print(f"{label:<40} {elapsed * 1000:9.1f} ms total  {elapsed * 1000 / len(requests):8.2f} ms/request"
+                  f"  {statements['count'] / len(requests):8.1f} statements/request")
+
+        for pass_label in ("first pass (inserts)", "second pass (already seen)"):
+            print(pass_label)
+            run("  per-id (previous)", lambda batch: _per_id_mark_seen(db, models, 1, batch), batches)
+            run("  watermark mark_notifications_as_seen", lambda batch: notification_service.mark_notifications_as_seen(db, 2, batch, 2), batches)
+
+        run("mark_all_notifications_as_seen", lambda _: notification_service.mark_all_notifications_as_seen(db, 3, 2), [None])
+
+        # Unread counts for a fresh student: the legacy outer join vs counters and read state.
+        def legacy_unread_count(user_id):
+            return db.query(func.count(models.Notification.id)).outerjoin(
+                models.UserNotificationStatus,
+                (models.Notification.id == models.UserNotificationStatus.notification_id) & (models.UserNotificationStatus.user_id == user_id)
+            ).filter(
+                (models.Notification.target_level == 0) | (models.Notification.target_level == 2),
+                (models.UserNotificationStatus.is_seen == False) | (models.UserNotificationStatus.is_seen == None)
+            ).scalar()
+        run("unread count: legacy outer join", lambda _: legacy_unread_count(4), [None] * 200)
+        run("unread count: get_unread_count", lambda _: notification_service.get_unread_count(db, 4, 2), [None] * 200)
+        print(f"unread: legacy user 1 {legacy_unread_count(1)}, user 4 {legacy_unread_count(4)}; "
+              f"watermark users 2-4 {[notification_service.get_unread_count(db, user_id, 2) for user_id in (2, 3, 4)]}")
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+# benchmarks/bench_matryoshka_dims.py
+"""
+Builds a persistent Chroma collection at each Matryoshka dimension and reports
+on-disk index size, query latency (p50/p95) and recall@k against the full dimension.
+
+By default the vectors are synthetic, with variance decaying across dimensions the
+way Matryoshka-trained models concentrate signal in the leading components, so
+recall here only shows the trend. Pass --from-collection to use the real vectors
+of an existing collection under CHROMA_DB_PATH (read-only).
+
+Run from RAG-Backend/:  python -m benchmarks.bench_matryoshka_dims --dims 1024 512 256 128 64
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+import chromadb
+import numpy as np
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    return vectors / np.clip(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12, None)
+
+
+def _synthetic(n: int, dim: int, seed: int = 7) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    scale = 1.0 / np.sqrt(1.0 + np.arange(dim) / 16.0) # Leading dimensions carry more variance
+    return _normalize(rng.standard_normal((n, dim)).astype(np.float32) * scale)
+
+
+def _from_collection(name: str, limit: int) -> np.ndarray:
+    from app.core.config import settings
+    client = chromadb.PersistentClient(path=settings.CHROMA_DB_PATH)
+    page = client.get_collection(name, embedding_function=None).get(limit=limit, include=["embeddings"])
+    return _normalize(np.asarray(page["embeddings"], dtype=np.float32))
+
+
+def _dir_size_mb(path: str) -> float:
+    total = 0
+    for root, _, files in os.walk(path):
+        total += sum(os.path.getsize(os.path.join(root, f)) for f in files)
+    return total / 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dims", type=int, nargs="+", default=[1024, 512, 256, 128, 64])
+    parser.add_argument("--chunks", type=int, default=20000, help="Synthetic corpus size")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--from-collection", default="", help="Read vectors from this collection instead of synthesizing")
+    args = parser.parse_args()
+
+    full = _from_collection(args.from_collection, args.chunks) if args.from_collection else _synthetic(args.chunks, max(args.dims))
+    full_dim = full.shape[1]
+    dims = sorted({d for d in args.dims if d <= full_dim} | {full_dim}, reverse=True)
+    rng = np.random.default_rng(11)
+    # Queries are noisy copies of corpus vectors, so each has a meaningful neighbourhood.
+    picks = rng.choice(len(full), size=min(args.queries, len(full)), replace=False)
+    queries_full = _normalize(full[picks] + 0.05 * rng.standard_normal((len(picks), full_dim)).astype(np.float32))
+    truth = np.argsort(-(queries_full @ full.T), axis=1)[:, :args.k]
+
+    print(f"chunks={len(full)} full_dim={full_dim} queries={len(picks)} k={args.k}")
+    print(f"{'dim':>6}{'disk MB':>10}{'build s':>9}{'p50 ms':>9}{'p95 ms':>9}{f'recall@{args.k}':>11}")
+    ids = [str(i) for i in range(len(full))]
+    for dim in dims:
+        corpus = _normalize(full[:, :dim])
+        queries = _normalize(queries_full[:, :dim])
+        with tempfile.TemporaryDirectory() as path:
+            client = chromadb.PersistentClient(path=path)
+            collection = client.create_collection("bench", embedding_function=None)
+            t0 = time.perf_counter()
+            for start in range(0, len(ids), 1000):
+                collection.add(ids=ids[start:start + 1000], embeddings=corpus[start:start + 1000].tolist())
+            build_s = time.perf_counter() - t0
+
+            latencies, hits = [], 0
+            for q, expected in zip(queries, truth):
+                t0 = time.perf_counter()
+                found = collection.query(query_embeddings=[q.tolist()], n_results=args.k, include=[])["ids"][0]
+                latencies.append(time.perf_counter() - t0)
+                hits += len({int(i) for i in found} & set(expected.tolist()))
+            size_mb = _dir_size_mb(path)
+            del collection, client
+
+        p95 = sorted(latencies)[int(0.95 * (len(latencies) - 1))]
+        print(f"{dim:>6}{size_mb:>10.1f}{build_s:>9.1f}{statistics.median(latencies) * 1000:>9.2f}{p95 * 1000:>9.2f}"
+              f"{hits / (len(truth) * args.k):>11.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+# benchmarks/bench_partitioned_layout.py
+"""
+Compares the single collection with a `$in` doc_access_target filter against the
+partitioned layout (one collection per access target, parallel fan-out, merged
+top-k) for a level-2 student query: latency p50/p95 and recall@k against exact
+brute-force search over the chunks the student may read.
+
+Run from RAG-Backend/:  python -m benchmarks.bench_partitioned_layout --chunks 30000 --restricted-share 0.8
+"""
+import argparse
+import statistics
+import tempfile
+import time
+
+import chromadb
+import numpy as np
+
+from app.services.partitioned_store import PartitionedVectorStore
+
+from ._fakes import HashingEmbeddings
+
+ALLOWED = ["public", "all_students", "level_2"] # What get_allowed_access_targets returns for a level-2 student
+RESTRICTED = ["level_1", "level_3", "level_4", "admin_only"]
+
+
+def _report(label: str, latencies, recall: float) -> None:
+    latencies = sorted(latencies)
+    print(f"{label:<22} p50 {statistics.median(latencies) * 1000:7.2f} ms   p95 {latencies[int(0.95 * (len(latencies) - 1))] * 1000:7.2f} ms"
+          f"   recall@k {recall:.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--chunks", type=int, default=30000)
+    parser.add_argument("--dim", type=int, default=128)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--restricted-share", type=float, default=0.8, help="Share of chunks a level-2 student may not read")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(5)
+    vectors = rng.standard_normal((args.chunks, args.dim)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    restricted = rng.random(args.chunks) < args.restricted_share
+    targets = [RESTRICTED[i % len(RESTRICTED)] if restricted[i] else ALLOWED[i % len(ALLOWED)] for i in range(args.chunks)]
+    ids = [f"doc_{i}_chunk_0" for i in range(args.chunks)]
+    metadatas = [{"doc_access_target": t, "source_filename": f"f{i}.pdf"} for i, t in enumerate(targets)]
+    queries = rng.standard_normal((args.queries, args.dim)).astype(np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+
+    allowed_idx = np.array([i for i, t in enumerate(targets) if t in ALLOWED])
+    truth = [set(allowed_idx[np.argsort(-(vectors[allowed_idx] @ q))[:args.k]].tolist()) for q in queries]
+    search_filter = {"doc_access_target": {"$in": ALLOWED}}
+    print(f"chunks={args.chunks} dim={args.dim} readable by level-2 student={len(allowed_idx)} k={args.k}")
+
+    with tempfile.TemporaryDirectory() as single_dir, tempfile.TemporaryDirectory() as part_dir:
+        single = chromadb.PersistentClient(path=single_dir).create_collection("rag_docs", embedding_function=None)
+        partitioned = PartitionedVectorStore("rag_docs", HashingEmbeddings(dim=args.dim), part_dir)
+        for s in range(0, args.chunks, 2000):
+            batch = dict(ids=ids[s:s + 2000], embeddings=vectors[s:s + 2000].tolist(),
+                         metadatas=metadatas[s:s + 2000], documents=ids[s:s + 2000])
+            single.add(**batch)
+            partitioned.upsert_embeddings(ids=batch["ids"], texts=batch["documents"], metadatas=batch["metadatas"], embeddings=batch["embeddings"])
+
+        latencies, hits = [], 0
+        for q, expected in zip(queries, truth):
+            t0 = time.perf_counter()
+            found = single.query(query_embeddings=[q.tolist()], n_results=args.k, where=search_filter, include=[])["ids"][0]
+            latencies.append(time.perf_counter() - t0)
+            hits += len({int(x.split("_")[1]) for x in found} & expected)
+        _report("single + $in filter", latencies, hits / (len(truth) * args.k))
+
+        latencies, hits = [], 0
+        for q, expected in zip(queries, truth):
+            t0 = time.perf_counter()
+            found = partitioned.similarity_search_by_vector_with_score(q.tolist(), k=args.k, filter=search_filter)
+            latencies.append(time.perf_counter() - t0)
+            hits += len({int(doc.id.split("_")[1]) for doc, _ in found} & expected)
+        _report("partitioned fan-out", latencies, hits / (len(truth) * args.k))
+
+
+if __name__ == "__main__":
+    main()
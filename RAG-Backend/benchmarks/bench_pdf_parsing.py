@@ -0,0 +1,67 @@
+# benchmarks/bench_pdf_parsing.py
+"""
+Parses a generated multi-hundred-page PDF three ways:
+  1. the previous path: temp file + PyPDFLoader + split_documents
+  2. in-memory, in-process (PDF_PARSE_WORKERS=1)
+  3. in-memory, process pool, splitting pages as they arrive
+
+Run from RAG-Backend/:  python -m benchmarks.bench_pdf_parsing --pages 400 --workers 4
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from ._fakes import make_text_pdf
+
+
+def _time(label, fn):
+    start = time.perf_counter()
+    chunks = fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<36} {elapsed:7.2f}s  ({len(chunks)} chunks)")
+    return elapsed, len(chunks)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pages", type=int, default=400)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    # Imported here so spawned parser processes, which re-import this module, don't load the embedding model.
+    from langchain_community.document_loaders import PyPDFLoader
+    from app.core.config import settings
+    from app.services import document_parser, file_processor
+
+    pdf_bytes = make_text_pdf(args.pages)
+    print(f"fixture: {args.pages} pages, {len(pdf_bytes) / 1e6:.1f} MB")
+
+    def temp_file_loader():
+        with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as f_out:
+            f_out.write(pdf_bytes)
+        try:
+            return file_processor.split_documents(PyPDFLoader(f_out.name).load())
+        finally:
+            os.remove(f_out.name)
+
+    def in_memory(workers):
+        def run():
+            settings.PDF_PARSE_WORKERS = workers
+            settings.PDF_PARALLEL_MIN_PAGES = 1
+            return file_processor.load_and_split_document(pdf_bytes, "application/pdf", "fixture.pdf")
+        return run
+
+    baseline_s, baseline_n = _time("temp file + PyPDFLoader", temp_file_loader)
+    serial_s, serial_n = _time("in-memory, single process", in_memory(1))
+    settings.PDF_PARSE_WORKERS = args.workers
+    list(document_parser._get_pdf_pool().map(abs, range(args.workers))) # Spawn workers before timing
+    pool_s, pool_n = _time(f"in-memory, {args.workers} processes, streamed", in_memory(args.workers))
+    document_parser.shutdown_pool()
+
+    assert serial_n == pool_n, "parallel parsing produced a different number of chunks"
+    print(f"speedup vs temp-file loader: {baseline_s / pool_s:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
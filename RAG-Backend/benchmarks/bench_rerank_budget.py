@@ -0,0 +1,68 @@
+# benchmarks/bench_rerank_budget.py
+"""
+Shows what the reranking stage (app.services.reranker) does to prompt size and
+latency: the plain top-k stuffs every chunk into the prompt, while the reranker
+over-fetches, keeps the best top_n, and falls back to retriever order when a
+slow cross-encoder would blow the per-request budget.
+
+Run from RAG-Backend/:  python -m benchmarks.bench_rerank_budget --candidates 20 --top-n 3 --budget-ms 150
+"""
+import argparse
+import statistics
+import time
+
+from langchain_core.documents import Document
+
+from app.services.reranker import CrossEncoderReranker, RerankingRetriever
+
+from ._fakes import FakeCrossEncoder, StubRetriever, synthetic_chunks
+
+QUERY = "when is the cs4471 lab exam and in which room"
+
+
+def _candidates(n: int, relevant_rank: int):
+    docs = [Document(page_content=text, metadata={"source_filename": f"doc{i}.pdf"}) for i, text in enumerate(synthetic_chunks(n, seed=5))]
+    docs[relevant_rank] = Document(page_content="The cs4471 lab exam is held in room B214 on Tuesday at 10am.",
+                                   metadata={"source_filename": "relevant.pdf"})
+    return docs
+
+
+def _run(label, retriever, repeats: int, relevant: str):
+    latencies, docs = [], []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        docs = retriever.invoke(QUERY)
+        latencies.append(time.perf_counter() - t0)
+    words = sum(len(d.page_content.split()) for d in docs)
+    found = any(d.metadata["source_filename"] == relevant for d in docs)
+    print(f"{label:<26} chunks={len(docs):<3} context words={words:<5} relevant kept={str(found):<5} "
+          f"p50 {statistics.median(latencies) * 1000:7.1f} ms   max {max(latencies) * 1000:7.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--candidates", type=int, default=20)
+    parser.add_argument("--k", type=int, default=5, help="Plain retriever k (RETRIEVAL_K)")
+    parser.add_argument("--top-n", type=int, default=3)
+    parser.add_argument("--budget-ms", type=float, default=150.0)
+    parser.add_argument("--relevant-rank", type=int, default=8, help="Position of the relevant chunk in vector order")
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+
+    candidates = _candidates(args.candidates, args.relevant_rank)
+    plain = StubRetriever(docs=candidates[:args.k])
+    over_fetch = StubRetriever(docs=candidates)
+
+    _run(f"plain top-{args.k}", plain, args.repeats, "relevant.pdf")
+    fast = CrossEncoderReranker(FakeCrossEncoder(per_pair_s=0.003), batch_size=8, budget_ms=args.budget_ms)
+    _run("reranked (fast encoder)", RerankingRetriever(base_retriever=over_fetch, reranker=fast, top_n=args.top_n, fallback_k=args.k),
+         args.repeats, "relevant.pdf")
+    print(f"  stats: {fast.stats()}")
+    slow = CrossEncoderReranker(FakeCrossEncoder(per_pair_s=0.03), batch_size=8, budget_ms=args.budget_ms)
+    _run("reranked (slow encoder)", RerankingRetriever(base_retriever=over_fetch, reranker=slow, top_n=args.top_n, fallback_k=args.k),
+         args.repeats, "relevant.pdf")
+    print(f"  stats: {slow.stats()}")
+
+
+if __name__ == "__main__":
+    main()
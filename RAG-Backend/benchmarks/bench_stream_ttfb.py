@@ -0,0 +1,65 @@
+# benchmarks/bench_stream_ttfb.py
+"""
+Compares time-to-first-byte of POST /query/stream against the full-answer
+latency of POST /query/, using an offline fake streaming LLM.
+
+Run from RAG-Backend/:  python -m benchmarks.bench_stream_ttfb --latency 2.0
+"""
+import argparse
+import json
+import time
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services import rag_service
+
+from ._fakes import FakeLLM, StubRetriever, sample_documents
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--latency", type=float, default=2.0, help="Fake LLM total generation time in seconds")
+    args = parser.parse_args()
+
+    rag_service.llm = FakeLLM(
+        latency_s=args.latency,
+        answer="Lectures for CS101 are held in room B12 on Mondays and Wednesdays at ten."
+    )
+    rag_service.embedding_function = rag_service.embedding_function or object()
+    retriever = StubRetriever(docs=sample_documents())
+    rag_service.get_contextual_retriever = lambda user_context: retriever
+
+    client = TestClient(app)
+
+    start = time.perf_counter()
+    full = client.post("/query/", json={"query": "Where is CS101?"})
+    full_s = time.perf_counter() - start
+    assert full.status_code == 200, full.text
+
+    start = time.perf_counter()
+    first_token_s = None
+    events = []
+    with client.stream("POST", "/query/stream", json={"query": "Where is CS101?"}) as response:
+        assert response.status_code == 200
+        event_name = None
+        for line in response.iter_lines():
+            if line.startswith("event: "):
+                event_name = line[len("event: "):]
+            elif line.startswith("data: "):
+                events.append((event_name, json.loads(line[len("data: "):])))
+                if event_name == "token" and first_token_s is None:
+                    first_token_s = time.perf_counter() - start
+    stream_s = time.perf_counter() - start
+
+    assert events[0][0] == "sources", events[0]
+    assert events[-1][0] == "done", events[-1]
+    streamed_answer = "".join(data for name, data in events if name == "token")
+    assert streamed_answer == full.json()["answer"], streamed_answer
+
+    print(f"/query/        full answer:  {full_s:.2f}s")
+    print(f"/query/stream  first token:  {first_token_s:.2f}s, complete: {stream_s:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+# benchmarks/compare.py
+"""
+Compares two benchmarks.suite result files metric by metric. Latency metrics (*_ms, us_per_call)
+are better when lower, throughput metrics (rps, *_per_s) when higher; counts are listed for
+context only. Changes beyond --threshold percent are flagged.
+
+Run from RAG-Backend/:  python -m benchmarks.compare baseline.json candidate.json --threshold 10 --fail-on-regression
+"""
+import argparse
+import json
+from typing import Any, Dict, Optional
+
+
+def _flatten(results: Dict[str, Any], prefix: str = "") -> Dict[str, float]:
+    flat = {}
+    for key, value in results.items():
+        path = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            flat.update(_flatten(value, path))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[path] = float(value)
+    return flat
+
+
+def _direction(metric: str) -> Optional[int]:
+    """+1 if higher is better, -1 if lower is better, None for counts."""
+    name = metric.rsplit(".", 1)[-1]
+    if name.endswith("_ms") or "_ms_" in name or name == "us_per_call":
+        return -1
+    if name == "rps" or name.endswith("_per_s"):
+        return 1
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Percent change to flag")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args()
+
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    with open(args.candidate, encoding="utf-8") as f:
+        candidate = json.load(f)
+    if baseline.get("schema") != candidate.get("schema"):
+        raise SystemExit(f"Schema mismatch: {baseline.get('schema')} vs {candidate.get('schema')}")
+    if baseline["meta"].get("args") != candidate["meta"].get("args"):
+        print("warning: the runs used different arguments; numbers may not be comparable")
+
+    base, cand = _flatten(baseline["results"]), _flatten(candidate["results"])
+    print(f"baseline {baseline['meta'].get('git_revision')}  vs  candidate {candidate['meta'].get('git_revision')}")
+    regressions = 0
+    for metric in sorted(base.keys() | cand.keys()):
+        old, new = base.get(metric), cand.get(metric)
+        if old is None or new is None:
+            print(f"  {metric:<48} {'-' if old is None else f'{old:.3f}':>12} {'-' if new is None else f'{new:.3f}':>12}")
+            continue
+        change = (new - old) / old * 100 if old else 0.0
+        direction = _direction(metric)
+        flag = ""
+        if direction is not None and abs(change) >= args.threshold:
+            improved = change * direction > 0
+            flag = "improved" if improved else "REGRESSED"
+            regressions += 0 if improved else 1
+        print(f"  {metric:<48} {old:12.3f} {new:12.3f} {change:+8.1f}%  {flag}")
+    print(f"{regressions} regression(s) beyond {args.threshold:.0f}%")
+    if regressions and args.fail_on_regression:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,293 @@
+# benchmarks/suite.py
+"""
+Offline end-to-end benchmark suite. Runs the real app (FastAPI routes, rag_service,
+file_processor, Chroma, SQLite) in-process against a throwaway database and vector
+store, with a deterministic fake LLM and a small hashing embedding model in place of
+Gemini and jina-v3. Measures:
+
+  query          POST /query/ at several concurrency levels: p50/p95/p99 latency, RPS
+  ingestion      file_processor.ingest_document per file type: files/s, chunks/s, MB/s
+  notifications  create_notification writes, GET /notifications/ reads, POST /notifications/mark-as-seen
+  auth           decode_access_token calls/s and GET /auth/me under concurrency
+
+Results are written as JSON; compare two runs with benchmarks.compare.
+
+Run from RAG-Backend/:  python -m benchmarks.suite --out bench-results.json
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Awaitable, Callable, Dict, List
+
+from ._fakes import FakeLLM, HashingEmbeddings, make_docx, make_text, make_text_pdf
+
+SCHEMA_VERSION = 1
+STUDENT_LEVELS = (1, 2, 3, 4)
+FILE_TYPES = {
+    "txt": "text/plain",
+    "pdf": "application/pdf",
+    "docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+}
+
+
+def _latency_summary(latencies_s: List[float], wall_s: float, errors: int = 0) -> Dict[str, float]:
+    ordered = sorted(latencies_s)
+
+    def pct(q: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000, 3)
+
+    return {
+        "requests": len(ordered),
+        "errors": errors,
+        "p50_ms": pct(0.50),
+        "p95_ms": pct(0.95),
+        "p99_ms": pct(0.99),
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 3),
+        "rps": round(len(ordered) / wall_s, 2) if wall_s else 0.0,
+    }
+
+
+async def _load(n: int, concurrency: int, call: Callable[[int], Awaitable[bool]]) -> Dict[str, float]:
+    """Runs call(0..n-1) with at most `concurrency` in flight; call returns False on an error response."""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    errors = 0
+
+    async def one(i: int) -> None:
+        nonlocal errors
+        async with semaphore:
+            t0 = time.perf_counter()
+            ok = await call(i)
+            latencies.append(time.perf_counter() - t0)
+            errors += 0 if ok else 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(n)))
+    return _latency_summary(latencies, time.perf_counter() - start, errors)
+
+
+def _configure_environment(workdir: str, args: argparse.Namespace) -> None:
+    # Must happen before anything imports app.core.config.
+    os.environ.update({
+        "DATABASE_URL": f"sqlite:///{workdir}/bench.db",
+        "CHROMA_DB_PATH": f"{workdir}/chroma",
+        "LEXICAL_INDEX_PATH": f"{workdir}/lexical.sqlite3",
+        "VECTOR_DB_COLLECTION_NAME": "bench_docs",
+        "GOOGLE_API_KEY": "",
+        "EMBEDDING_DIMENSION": "0",
+        "ANSWER_CACHE_ENABLED": "true" if args.answer_cache else "false",
+        "RERANK_ENABLED": "false",
+        "PDF_PARSE_WORKERS": "0",
+    })
+
+
+def _install_fakes(args: argparse.Namespace) -> None:
+    """Swaps the model loaders for offline fakes; everything else runs unmodified."""
+    from app.services import embedding_backends, rag_service
+    embedding_backends.create_embeddings = lambda **kwargs: HashingEmbeddings(dim=args.dim, per_call_s=args.embed_ms / 1000)
+    rag_service.init_llm = lambda: setattr(rag_service, "llm", FakeLLM(latency_s=args.llm_ms / 1000, answer=args.answer))
+
+
+def _seed_documents(file_processor: Any, docs_per_target: int) -> int:
+    chunks = 0
+    targets = ["public", "all_students", "admin_only"] + [f"level_{level}" for level in STUDENT_LEVELS]
+    for t_idx, target in enumerate(targets):
+        for d in range(docs_per_target):
+            content = make_text(1500, seed=1000 + t_idx * 100 + d).encode("utf-8")
+            result = file_processor.ingest_document(content, "text/plain", f"{target}_{d}.txt", target)
+            chunks += result["chunks"] if result else 0
+    return chunks
+
+
+def bench_ingestion(file_processor: Any, files_per_type: int, size_kb: int) -> Dict[str, Any]:
+    results = {}
+    for type_idx, (label, content_type) in enumerate(FILE_TYPES.items()):
+        payloads = []
+        for i in range(files_per_type):
+            seed = 5000 + type_idx * 1000 + i
+            words = size_kb * 1024 // 7 # ~7 bytes per word with separator
+            if label == "pdf":
+                payloads.append(make_text_pdf(num_pages=max(1, words // 480), seed=seed))
+            elif label == "docx":
+                payloads.append(make_docx(num_paragraphs=max(1, words // 60), seed=seed))
+            else:
+                payloads.append(make_text(words, seed=seed).encode("utf-8"))
+        per_file, chunks, embedded = [], 0, 0
+        start = time.perf_counter()
+        for i, payload in enumerate(payloads):
+            t0 = time.perf_counter()
+            result = file_processor.ingest_document(payload, content_type, f"bench_{label}_{i}.{label}", "public")
+            per_file.append(time.perf_counter() - t0)
+            if result:
+                chunks += result["chunks"]
+                embedded += result["chunks_embedded"]
+        wall = time.perf_counter() - start
+        total_mb = sum(len(p) for p in payloads) / 1e6
+        results[label] = {
+            "files": len(payloads),
+            "chunks": chunks,
+            "chunks_embedded": embedded,
+            "p50_ms_per_file": round(statistics.median(per_file) * 1000, 3),
+            "files_per_s": round(len(payloads) / wall, 2),
+            "chunks_per_s": round(chunks / wall, 1),
+            "mb_per_s": round(total_mb / wall, 3),
+        }
+    return results
+
+
+async def _run_http_benchmarks(app: Any, args: argparse.Namespace) -> Dict[str, Any]:
+    import httpx
+    from app.db.database import SessionLocal
+    from app.services import auth_service, notification_service
+
+    results: Dict[str, Any] = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        # --- Users and tokens ---
+        await client.post("/auth/register", json={"username": "bench_admin", "password": "pw", "role": "admin"})
+        students = []
+        for i in range(args.students):
+            level = STUDENT_LEVELS[i % len(STUDENT_LEVELS)]
+            username = f"bench_student_{i}"
+            await client.post("/auth/register", json={"username": username, "password": "pw", "role": "student", "level": level})
+            login = await client.post("/auth/login", data={"username": username, "password": "pw"})
+            students.append({"Authorization": f"Bearer {login.json()['access_token']}"})
+        headers = [None] + students # Guests and students
+
+        # --- Query ---
+        results["query"] = {}
+        for concurrency in args.concurrency:
+            async def query(i: int, concurrency=concurrency) -> bool:
+                # Distinct questions so neither cache turns the run into a cache benchmark.
+                body = {"query": f"when is the exam for module {concurrency}-{i} and in which room"}
+                response = await client.post("/query/", json=body, headers=headers[i % len(headers)])
+                return response.status_code == 200
+            results["query"][f"c{concurrency}"] = await _load(args.query_requests, concurrency, query)
+
+        # --- Notifications ---
+        db = SessionLocal()
+        try:
+            write_latencies = []
+            start = time.perf_counter()
+            for i in range(args.notifications):
+                t0 = time.perf_counter()
+                notification_service.create_notification(db, f"Bench notification {i}", (i % (len(STUDENT_LEVELS) + 1)))
+                write_latencies.append(time.perf_counter() - t0)
+            write = _latency_summary(write_latencies, time.perf_counter() - start)
+        finally:
+            db.close()
+
+        async def read(i: int) -> bool:
+            response = await client.get("/notifications/", params={"fetch_all": "true"}, headers=students[i % len(students)])
+            return response.status_code == 200
+        read_summary = await _load(args.http_requests, args.http_concurrency, read)
+
+        unseen_ids = []
+        for student in students:
+            response = await client.get("/notifications/", headers=student)
+            unseen_ids.append([n["id"] for n in response.json()])
+
+        async def mark(i: int) -> bool:
+            response = await client.post("/notifications/mark-as-seen", json={"notification_ids": unseen_ids[i]}, headers=students[i])
+            return response.status_code == 204
+        mark_summary = await _load(len(students), args.http_concurrency, mark)
+        results["notifications"] = {
+            "create": write,
+            "list": read_summary,
+            "mark_as_seen": {**mark_summary, "avg_ids_per_request": round(statistics.fmean(len(ids) for ids in unseen_ids), 1)},
+        }
+
+        # --- Auth ---
+        token = students[0]["Authorization"].split(" ", 1)[1]
+        n = 2000
+        start = time.perf_counter()
+        for _ in range(n):
+            auth_service.decode_access_token(token)
+        decode_s = time.perf_counter() - start
+
+        async def me(i: int) -> bool:
+            response = await client.get("/auth/me", headers=students[i % len(students)])
+            return response.status_code == 200
+        results["auth"] = {
+            "decode_access_token": {"calls": n, "us_per_call": round(decode_s / n * 1e6, 2), "calls_per_s": round(n / decode_s, 1)},
+            "me": await _load(args.http_requests, args.http_concurrency, me),
+        }
+    return results
+
+
+def _git_revision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return "unknown"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--out", default="bench-results.json")
+    parser.add_argument("--concurrency", type=lambda v: [int(x) for x in v.split(",")], default=[1, 8, 32])
+    parser.add_argument("--query-requests", type=int, default=200, help="Per concurrency level")
+    parser.add_argument("--llm-ms", type=float, default=50.0, help="Fake LLM latency")
+    parser.add_argument("--answer", default="The exam is in room B214 on Tuesday at 10am.")
+    parser.add_argument("--embed-ms", type=float, default=1.0, help="Fake embedding cost per call")
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--answer-cache", action="store_true", help="Leave the semantic answer cache on")
+    parser.add_argument("--seed-docs", type=int, default=5, help="Documents per access target before querying")
+    parser.add_argument("--ingest-files", type=int, default=5, help="Files per type")
+    parser.add_argument("--ingest-kb", type=int, default=64, help="Approximate text size per file")
+    parser.add_argument("--students", type=int, default=20)
+    parser.add_argument("--notifications", type=int, default=200)
+    parser.add_argument("--http-requests", type=int, default=500)
+    # Keep below the SQLAlchemy pool (5 + 10 overflow): the notification and auth handlers are async
+    # but query the database synchronously, so more in-flight requests than connections stall the loop.
+    parser.add_argument("--http-concurrency", type=int, default=8)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="rag-bench-") as workdir:
+        _configure_environment(workdir, args)
+        from app.main import app
+        from app.db import database
+        from app.services import file_processor, model_lifecycle
+        logging.disable(logging.INFO) # Per-request INFO logging would dominate the measurements
+
+        _install_fakes(args)
+        database.Base.metadata.create_all(bind=database.engine)
+        if not model_lifecycle.ensure_loaded():
+            raise SystemExit(f"FAIL: components did not load: {model_lifecycle.snapshot()}")
+
+        started = time.perf_counter()
+        seeded_chunks = _seed_documents(file_processor, args.seed_docs)
+        results = {"ingestion": bench_ingestion(file_processor, args.ingest_files, args.ingest_kb)}
+        results.update(asyncio.run(_run_http_benchmarks(app, args)))
+
+    report = {
+        "schema": SCHEMA_VERSION,
+        "meta": {
+            "git_revision": _git_revision(),
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "seeded_chunks": seeded_chunks,
+            "duration_s": round(time.perf_counter() - started, 1),
+            "args": {key: value for key, value in vars(args).items() if key != "out"},
+        },
+        "results": results,
+    }
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(json.dumps(report["results"], indent=2))
+    print(f"Wrote {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -125,9 +125,11 @@ export type AdminUploadRequestType = {
 export type AdminUploadResponseType = {
     filename: string
     message: string
-    doc_internal_id: string
+    doc_internal_id: string | null
     error: string | null
     notification_sent: boolean
+    job_id: string | null
+    status: 'queued' | 'running' | 'succeeded' | 'failed' | null
 }
 
 /* ------- ENDPOINT: POST /admin/broadcast ------- */